@@ -1,5 +1,17 @@
+import heapq
+import json
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
 from django.utils.deprecation import MiddlewareMixin
 
+logger = logging.getLogger("churn_saas.requests")
+
+
 class TenantMiddleware(MiddlewareMixin):
     """
     Adds request.tenant = user.tenant for authenticated users.
@@ -10,3 +22,102 @@ class TenantMiddleware(MiddlewareMixin):
             request.tenant = request.user.tenant
         else:
             request.tenant = None
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised when a view runs more SQL queries than its configured budget."""
+
+
+class QueryRecorder:
+    """
+    Database execute wrapper that counts queries, sums their time and keeps
+    the N slowest statements.
+    """
+
+    def __init__(self, keep_slowest=3):
+        self.keep_slowest = keep_slowest
+        self.count = 0
+        self.duration = 0.0
+        self.slowest = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.count += 1
+            self.duration += duration
+            entry = (duration, self.count, sql)
+            if len(self.slowest) < self.keep_slowest:
+                heapq.heappush(self.slowest, entry)
+            elif self.keep_slowest:
+                heapq.heappushpop(self.slowest, entry)
+
+    def slowest_queries(self):
+        return [
+            {"ms": round(duration * 1000, 2), "sql": sql}
+            for duration, _, sql in sorted(self.slowest, reverse=True)
+        ]
+
+
+class QueryInstrumentationMiddleware:
+    """
+    Opt-in per-request instrumentation (settings.REQUEST_INSTRUMENTATION).
+    Records SQL query count, DB time, the slowest queries and total view time,
+    returns them in a Server-Timing header and logs one JSON line per request
+    tagged with tenant and URL name.
+
+    QUERY_BUDGETS maps URL names to a maximum query count; going over it is
+    logged as a warning, or raises QueryBudgetExceeded when RAISE_ON_BUDGET is
+    set (as it is under `manage.py test`), so N+1 regressions fail the suite.
+    """
+
+    def __init__(self, get_response):
+        config = getattr(settings, "REQUEST_INSTRUMENTATION", {})
+        if not config.get("ENABLED"):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.slow_queries = config.get("SLOW_QUERIES", 3)
+        self.budgets = config.get("QUERY_BUDGETS", {})
+        self.raise_on_budget = config.get("RAISE_ON_BUDGET", False)
+
+    def __call__(self, request):
+        recorder = QueryRecorder(keep_slowest=self.slow_queries)
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        view_time = time.perf_counter() - start
+
+        match = getattr(request, "resolver_match", None)
+        url_name = match.view_name if match else None
+        tenant = getattr(request, "tenant", None)
+
+        response["Server-Timing"] = ", ".join([
+            f'db;dur={recorder.duration * 1000:.1f};desc="{recorder.count} queries"',
+            f"view;dur={view_time * 1000:.1f}",
+        ])
+
+        record = {
+            "method": request.method,
+            "path": request.path,
+            "url_name": url_name,
+            "tenant": tenant.slug if tenant else None,
+            "status": response.status_code,
+            "queries": recorder.count,
+            "db_ms": round(recorder.duration * 1000, 2),
+            "view_ms": round(view_time * 1000, 2),
+            "slowest": recorder.slowest_queries(),
+        }
+        logger.info(json.dumps(record), extra={"request_metrics": record})
+
+        budget = self.budgets.get(url_name)
+        if budget is not None and recorder.count > budget:
+            message = f"{url_name} ran {recorder.count} queries (budget {budget})"
+            if self.raise_on_budget:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message, extra={"request_metrics": record})
+
+        return response
@@ -26,6 +26,10 @@ class Tenant(models.Model):
         default=PLAN_FREE,
     )
 
+    # Bumped whenever the tenant's customers or predictions change;
+    # keys the tenant's cached pages (see customers.caching).
+    data_version = models.PositiveIntegerField(default=0)
+
     def __str__(self):
         return self.name
 
@@ -1,3 +1,70 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.urls import reverse
 
-# Create your tests here.
+from accounts.middleware import QueryBudgetExceeded
+from accounts.models import Tenant, User
+from customers.models import Customer
+from customers.scoring import generate_churn_predictions
+
+
+def instrumentation(**overrides):
+    return override_settings(REQUEST_INSTRUMENTATION={"ENABLED": True, "RAISE_ON_BUDGET": True, **overrides})
+
+
+class QueryInstrumentationMiddlewareTests(TestCase):
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="Acme", slug="acme")
+        self.user = User.objects.create_user("owner", password="x", tenant=self.tenant)
+        self.client.force_login(self.user)
+
+    def make_customers(self, start, stop):
+        Customer.objects.bulk_create(
+            Customer(tenant=self.tenant, external_id=f"c{i}", monthly_spend=i, feature_usage_score=i % 10)
+            for i in range(start, stop)
+        )
+        generate_churn_predictions(self.tenant)
+
+    @instrumentation()
+    def test_server_timing_header_and_log_line(self):
+        with self.assertLogs("churn_saas.requests", level="INFO") as logs:
+            response = self.client.get(reverse("churn_dashboard"))
+
+        self.assertIn("db;dur=", response["Server-Timing"])
+        self.assertIn("view;dur=", response["Server-Timing"])
+        metrics = logs.records[0].request_metrics
+        self.assertEqual(metrics["url_name"], "churn_dashboard")
+        self.assertEqual(metrics["tenant"], "acme")
+        self.assertGreater(metrics["queries"], 0)
+        self.assertLessEqual(len(metrics["slowest"]), 3)
+
+    @instrumentation(QUERY_BUDGETS={"churn_dashboard": 1})
+    def test_exceeding_budget_raises(self):
+        with self.assertLogs("churn_saas.requests", level="INFO"):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get(reverse("churn_dashboard"))
+
+    @instrumentation(QUERY_BUDGETS={"churn_dashboard": 1}, RAISE_ON_BUDGET=False)
+    def test_exceeding_budget_only_warns_outside_tests(self):
+        with self.assertLogs("churn_saas.requests", level="WARNING") as logs:
+            response = self.client.get(reverse("churn_dashboard"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("budget 1", logs.output[0])
+
+    def test_dashboard_query_count_does_not_grow_with_customers(self):
+        self.make_customers(0, 5)
+        with self.assertLogs("churn_saas.requests", level="INFO") as logs:
+            self.client.get(reverse("churn_dashboard"))
+        small = logs.records[0].request_metrics["queries"]
+
+        self.make_customers(5, 60)
+        with self.assertLogs("churn_saas.requests", level="INFO") as logs:
+            self.client.get(reverse("churn_dashboard"))
+
+        self.assertEqual(logs.records[0].request_metrics["queries"], small)
+
+    @override_settings(REQUEST_INSTRUMENTATION={"ENABLED": False})
+    def test_disabled_by_default(self):
+        response = self.client.get(reverse("churn_dashboard"))
+
+        self.assertNotIn("Server-Timing", response)
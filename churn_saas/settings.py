@@ -12,6 +12,8 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os 
+import sys
+
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -44,6 +46,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "accounts.middleware.QueryInstrumentationMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -124,6 +127,106 @@ USE_TZ = True
 
 STATIC_URL = "static/"
 
+# plotly.js is served once as a static file (static/plotly/plotly.min.js)
+# instead of being inlined into every chart fragment. PlotlyJSFinder exposes
+# only that file from the plotly package.
+STATICFILES_FINDERS = [
+    "django.contrib.staticfiles.finders.FileSystemFinder",
+    "django.contrib.staticfiles.finders.AppDirectoriesFinder",
+    "customers.staticfiles.PlotlyJSFinder",
+]
+
+# Uploaded files (customer imports waiting for the job worker)
+
+MEDIA_URL = "media/"
+MEDIA_ROOT = BASE_DIR / "media"
+
+# Largest part accepted by the resumable upload endpoint (customers.chunked_uploads).
+# Each part is streamed to disk, so this bounds request time, not memory.
+# Uploads idle for CHUNKED_UPLOAD_EXPIRY_HOURS are removed, with their files,
+# by `manage.py prune_chunked_uploads` (run it from cron).
+
+CHUNKED_UPLOAD_MAX_PART_SIZE = 64 * 1024 * 1024
+CHUNKED_UPLOAD_EXPIRY_HOURS = 24
+
+# Background jobs (`manage.py run_worker`). Running jobs record progress
+# after every import or scoring chunk; one not updated for JOB_TIMEOUT_MINUTES
+# is assumed to have lost its worker and is run again. Keep it above the
+# longest gap between updates (including SCORING_LOCK_WAIT, 10 minutes).
+
+JOB_TIMEOUT_MINUTES = 30
+
+# ChurnPrediction history retention (see `manage.py prune_churn_predictions`).
+# Predictions newer than DETAIL_DAYS are kept as-is; older history is rolled
+# up into one snapshot per customer per ROLLUP period ("daily" or "weekly").
+
+CHURN_PREDICTION_RETENTION = {
+    "DETAIL_DAYS": 90,
+    "ROLLUP": "weekly",
+    "BATCH_SIZE": 1000,
+}
+
+# Per-request SQL/timing instrumentation (accounts.middleware.QueryInstrumentationMiddleware).
+# Opt in with REQUEST_INSTRUMENTATION=1; always on under `manage.py test`, where
+# a view running more queries than its QUERY_BUDGETS entry fails the test.
+
+TESTING = sys.argv[1:2] == ["test"]
+
+REQUEST_INSTRUMENTATION = {
+    "ENABLED": TESTING or os.environ.get("REQUEST_INSTRUMENTATION") == "1",
+    "RAISE_ON_BUDGET": TESTING,
+    "SLOW_QUERIES": 3,
+    # Maximum SQL queries per request, by URL name. These pages must not
+    # grow with the number of customers or predictions.
+    "QUERY_BUDGETS": {
+        "home": 6,
+        "churn_dashboard": 10,
+        "churn_dashboard_async": 10,
+        "high_risk_focus": 8,
+        "high_risk_focus_async": 8,
+        "customer_list": 8,
+        "customer_list_async": 8,
+        "customer_upload": 8,
+        "chunked_upload_start": 6,
+        "chunked_upload_detail": 10,
+        "chunked_upload_complete": 10,
+        "run_churn_scoring": 8,
+        "job_status": 6,
+        "job_progress": 6,
+    },
+}
+
+# Scoring engine: "python" (NumPy, customers.scoring) or "sql" (rules compiled
+# to SQL and run as one INSERT ... SELECT, customers.sql_scoring).
+
+CHURN_SCORING_ENGINE = os.environ.get("CHURN_SCORING_ENGINE", "python")
+
+# Cache for tenant-versioned pages and query results (customers.caching).
+# CHURN_CACHE=locmem (default, per process) or file (shared by all processes
+# on the host, under CHURN_CACHE_DIR). Tests run with a dummy cache unless
+# they override it.
+
+CHURN_CACHE = os.environ.get("CHURN_CACHE", "locmem")
+
+if TESTING:
+    CACHES = {"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}}
+elif CHURN_CACHE == "file":
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.environ.get("CHURN_CACHE_DIR", BASE_DIR / "cache"),
+            "TIMEOUT": 60 * 60 * 24,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "TIMEOUT": 60 * 60 * 24,
+            "OPTIONS": {"MAX_ENTRIES": 5000},
+        }
+    }
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
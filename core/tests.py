@@ -1,3 +1,50 @@
+from datetime import date, timedelta
+
 from django.test import TestCase
+from django.urls import reverse
+
+from accounts.models import Tenant, User
+from customers.models import Customer, TenantDailyMetrics
+from customers.scoring import generate_churn_predictions
+
+
+class HomeDashboardTests(TestCase):
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="Acme", slug="acme")
+        self.client.force_login(User.objects.create_user("owner", password="x", tenant=self.tenant))
+
+    def test_dashboard_reads_daily_metrics(self):
+        today = date.today()
+        for days_ago, at_risk, new_risks in ((20, 12, 4), (8, 9, 2), (2, 7, 3), (0, 5, 1)):
+            TenantDailyMetrics.objects.create(
+                tenant=self.tenant,
+                date=today - timedelta(days=days_ago),
+                customers_at_risk=at_risk,
+                revenue_at_risk=1234.5,
+                new_risks=new_risks,
+                resolved_risks=1,
+            )
+        Customer.objects.create(tenant=self.tenant, external_id="big", monthly_spend=900)
+        Customer.objects.create(tenant=self.tenant, external_id="small", monthly_spend=0)
+        generate_churn_predictions(self.tenant)
+
+        response = self.client.get(reverse("home"))
+
+        metrics = response.context["metrics"]
+        self.assertEqual(metrics["customers_at_risk"], 2)
+        # Today's row now holds the scoring run above on top of the seeded one.
+        self.assertEqual(metrics["new_risks"], 3 + 1 + 2)
+        self.assertEqual(metrics["resolved_risks"], 2)
+        self.assertEqual(
+            [point["value"] for point in response.context["trend_points"]], [12, 9, 2]
+        )
+        self.assertEqual(
+            [customer["name"] for customer in response.context["focus_customers"]], ["big", "small"]
+        )
+
+    def test_dashboard_without_scoring_runs(self):
+        response = self.client.get(reverse("home"))
 
-# Create your tests here.
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["trend_points"], [])
+        self.assertEqual(response.context["metrics"]["customers_at_risk"], 0)
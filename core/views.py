@@ -1,77 +1,110 @@
+from datetime import date, timedelta
+
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
+from django.views.decorators.cache import never_cache
 
+from customers.daily_metrics import AT_RISK_LEVELS, recent_daily_metrics
+from customers.models import TenantDailyMetrics
+from customers.predictions import current_predictions
 
-@login_required
-def churn_dashboard_view(request):
-    metrics = {
-        "customers_at_risk": 24,
-        "revenue_at_risk": "$82,500",
-        "new_risks": 5,
-        "resolved_risks": 3,
-    }
 
-    focus_customers = [
-        {
-            "id": 101,
-            "name": "Acme Health",
-            "risk_level": "High",
-            "risk_score": 82,
-            "mrr": "$12,400",
-            "reason": "Usage dropped 35% vs last month",
-        },
-        {
-            "id": 102,
-            "name": "OrbitSoft",
-            "risk_level": "High",
-            "risk_score": 76,
-            "mrr": "$9,800",
-            "reason": "NPS fell to 4 — waiting on support fix",
-        },
-        {
-            "id": 103,
-            "name": "BrightBank",
-            "risk_level": "Medium",
-            "risk_score": 61,
-            "mrr": "$7,200",
-            "reason": "Executive sponsor left the account",
-        },
-        {
-            "id": 104,
-            "name": "Northwind Retail",
-            "risk_level": "Medium",
-            "risk_score": 58,
-            "mrr": "$6,450",
-            "reason": "Churn risk model flagged late invoices",
-        },
+TREND_WEEKS = 4
+
+FOCUS_CUSTOMERS = 5
+
+# Height in pixels of the tallest bar in the weekly trend chart.
+TREND_BAR_HEIGHT = 150
+
+
+def weekly_trend(history, today):
+    """
+    Customers at risk at the end of each of the last TREND_WEEKS weeks
+    (weeks without a scoring run are left out).
+    """
+    points = []
+    for week in reversed(range(TREND_WEEKS)):
+        end = today - timedelta(days=7 * week)
+        rows = [row for row in history if end - timedelta(days=7) < row.date <= end]
+        if rows:
+            points.append({"label": f"{end:%b %d}", "value": rows[-1].customers_at_risk})
+
+    peak = max((point["value"] for point in points), default=0)
+    for point in points:
+        point["height"] = round(TREND_BAR_HEIGHT * point["value"] / peak) if peak else 0
+    return points
+
+
+def focus_customers(tenant):
+    """
+    The at-risk customers with the most revenue at risk.
+    """
+    predictions = (
+        current_predictions(tenant)
+        .filter(risk_level__in=AT_RISK_LEVELS)
+        .select_related("customer")
+        .order_by("-revenue_at_risk")[:FOCUS_CUSTOMERS]
+    )
+    return [
         {
-            "id": 105,
-            "name": "Pioneer Labs",
-            "risk_level": "Medium",
-            "risk_score": 54,
-            "mrr": "$5,900",
-            "reason": "Support tickets trending up week-over-week",
-        },
+            "id": prediction.customer_id,
+            "name": prediction.customer.email or prediction.customer.external_id,
+            "risk_level": prediction.risk_level.capitalize(),
+            "risk_score": round(prediction.risk_score * 100),
+            "mrr": f"${prediction.customer.monthly_spend or 0:,.0f}",
+            "reason": ", ".join(prediction.reasons) or "—",
+        }
+        for prediction in predictions
     ]
 
-    trend_points = [
-        {"label": "Week 1", "value": 18},
-        {"label": "Week 2", "value": 21},
-        {"label": "Week 3", "value": 19},
-        {"label": "Week 4", "value": 17},
-    ]
 
-    weekly_summary = (
-        "Great momentum this week: churn risk volume is trending down, "
-        "and resolved cases outpaced new risks. Keep the focus on the top five accounts "
-        "to lock in renewals."
+def summarize_week(latest, new_risks, resolved_risks):
+    if latest is None:
+        return "No scoring runs yet. Upload your customers and run churn scoring to fill this dashboard."
+
+    summary = (
+        f"{new_risks} new risks and {resolved_risks} resolved this week; "
+        f"{latest.customers_at_risk} customers (${latest.revenue_at_risk:,.0f}) are currently at risk."
     )
+    if resolved_risks > new_risks:
+        summary += " Resolved cases outpaced new risks."
+    elif new_risks > resolved_risks:
+        summary += " New risks outpaced resolved cases; focus on the accounts below."
+    return summary
+
+
+@never_cache
+@login_required
+def churn_dashboard_view(request):
+    today = date.today()
+    history = recent_daily_metrics(request.tenant, days=7 * TREND_WEEKS, today=today)
+    if history:
+        latest = history[-1]
+    else:
+        latest = (
+            TenantDailyMetrics.objects
+            .filter(tenant=request.tenant)
+            .order_by("-date")
+            .first()
+        )
+
+    this_week = [row for row in history if row.date > today - timedelta(days=7)]
+    new_risks = sum(row.new_risks for row in this_week)
+    resolved_risks = sum(row.resolved_risks for row in this_week)
+
+    metrics = {
+        "customers_at_risk": latest.customers_at_risk if latest else 0,
+        "revenue_at_risk": f"${latest.revenue_at_risk if latest else 0:,.0f}",
+        "new_risks": new_risks,
+        "resolved_risks": resolved_risks,
+    }
 
     context = {
         "metrics": metrics,
-        "focus_customers": focus_customers[:5],
-        "trend_points": trend_points,
-        "weekly_summary": weekly_summary,
+        "last_updated": latest.updated_at if latest else None,
+        "focus_customers": focus_customers(request.tenant),
+        "trend_points": weekly_trend(history, today),
+        "weekly_summary": summarize_week(latest, new_risks, resolved_risks),
     }
 
     return render(request, "core/home.html", context)
@@ -1,11 +1,81 @@
 import plotly.graph_objs as go
+from django.db.models import Count, Q, Sum
 
+from .caching import atenant_cached, tenant_cached
+from .risk_engine import RISK_LEVELS
 
-def risk_level_distribution(predictions):
-    levels = {"low": 0, "medium": 0, "high": 0}
-    for p in predictions:
-        levels[p.risk_level] += 1
 
+RISK_TRENDS = ("new", "improving", "stable", "worsening")
+
+REVENUE_CHART_TOP_N = 10
+
+CHART_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def _summary_aggregates():
+    aggregates = {
+        "total": Count("id"),
+        "revenue_at_risk": Sum("revenue_at_risk"),
+        "early_warnings": Count("id", filter=Q(early_warning=True)),
+    }
+    for level in RISK_LEVELS:
+        aggregates[f"level_{level}"] = Count("id", filter=Q(risk_level=level))
+    for trend in RISK_TRENDS:
+        aggregates[f"trend_{trend}"] = Count("id", filter=Q(risk_trend=trend))
+    return aggregates
+
+
+def _summary(row):
+    return {
+        "total": row["total"],
+        "revenue_at_risk": row["revenue_at_risk"] or 0.0,
+        "has_early_warnings": row["early_warnings"] > 0,
+        "levels": {level: row[f"level_{level}"] for level in RISK_LEVELS},
+        "trends": {trend: row[f"trend_{trend}"] for trend in RISK_TRENDS},
+    }
+
+
+def summarize_predictions(predictions):
+    """
+    Dashboard numbers for a ChurnPrediction queryset in one aggregate query.
+    Returns: dict with total, levels, trends, revenue_at_risk and
+    has_early_warnings.
+    """
+    return _summary(predictions.order_by().aggregate(**_summary_aggregates()))
+
+
+async def asummarize_predictions(predictions):
+    """
+    Async version of summarize_predictions().
+    """
+    return _summary(await predictions.order_by().aaggregate(**_summary_aggregates()))
+
+
+def _top_revenue_query(predictions, limit):
+    return (
+        predictions
+        .filter(revenue_at_risk__gt=0)
+        .order_by("-revenue_at_risk")
+        .values_list("customer__external_id", "revenue_at_risk")[:limit]
+    )
+
+
+def top_revenue_at_risk(predictions, limit=REVENUE_CHART_TOP_N):
+    """
+    (external_id, revenue_at_risk) pairs for the customers with the most
+    revenue at risk, largest first.
+    """
+    return list(_top_revenue_query(predictions, limit))
+
+
+async def atop_revenue_at_risk(predictions, limit=REVENUE_CHART_TOP_N):
+    """
+    Async version of top_revenue_at_risk().
+    """
+    return [row async for row in _top_revenue_query(predictions, limit)]
+
+
+def risk_level_distribution(levels):
     fig = go.Figure(
         data=[
             go.Bar(
@@ -24,21 +94,25 @@ def risk_level_distribution(predictions):
         margin=dict(l=20, r=20, t=40, b=20),
     )
 
-    return fig.to_html(full_html=False)
-
+    return fig.to_html(full_html=False, include_plotlyjs=False)
 
-def revenue_at_risk_chart(predictions):
-    labels = []
-    values = []
 
-    for p in predictions:
-        if p.revenue_at_risk > 0:
-            labels.append(str(p.customer.external_id))
-            values.append(p.revenue_at_risk)
+def revenue_at_risk_chart(top_customers, total_revenue_at_risk):
+    """
+    Pie of the top customers by revenue at risk; the remainder of
+    total_revenue_at_risk is shown as one "Other customers" slice.
+    """
+    labels = [str(external_id) for external_id, _ in top_customers]
+    values = [revenue for _, revenue in top_customers]
 
     if not values:
         return None
 
+    other = total_revenue_at_risk - sum(values)
+    if other > 0.005:
+        labels.append("Other customers")
+        values.append(other)
+
     fig = go.Figure(
         data=[
             go.Pie(
@@ -55,15 +129,10 @@ def revenue_at_risk_chart(predictions):
         margin=dict(l=20, r=20, t=40, b=20),
     )
 
-    return fig.to_html(full_html=False)
+    return fig.to_html(full_html=False, include_plotlyjs=False)
 
 
-def trend_overview(predictions):
-    trends = {"new": 0, "improving": 0, "stable": 0, "worsening": 0}
-
-    for p in predictions:
-        trends[p.risk_trend] += 1
-
+def trend_overview(trends):
     fig = go.Figure(
         data=[
             go.Bar(
@@ -82,4 +151,39 @@ def trend_overview(predictions):
         margin=dict(l=20, r=20, t=40, b=20),
     )
 
-    return fig.to_html(full_html=False)
+    return fig.to_html(full_html=False, include_plotlyjs=False)
+
+
+def build_dashboard_charts(summary, top_customers):
+    return {
+        "risk_chart": risk_level_distribution(summary["levels"]),
+        "revenue_chart": revenue_at_risk_chart(top_customers, summary["revenue_at_risk"]),
+        "trend_chart": trend_overview(summary["trends"]),
+    }
+
+
+def dashboard_charts(tenant, version, predictions, summary):
+    """
+    Rendered chart fragments for the churn dashboard, cached per tenant
+    data version so they are only rebuilt after imports or scoring.
+    The page must load plotly.js itself (static/plotly/plotly.min.js).
+    """
+    return tenant_cached(
+        tenant,
+        "churn_charts",
+        lambda: build_dashboard_charts(summary, top_revenue_at_risk(predictions)),
+        version=version,
+        timeout=CHART_CACHE_TIMEOUT,
+    )
+
+
+async def adashboard_charts(tenant, version, predictions, summary):
+    """
+    Async version of dashboard_charts(), sharing its cache entries.
+    """
+    async def build():
+        return build_dashboard_charts(summary, await atop_revenue_at_risk(predictions))
+
+    return await atenant_cached(
+        tenant, "churn_charts", build, version=version, timeout=CHART_CACHE_TIMEOUT
+    )
@@ -0,0 +1,89 @@
+"""
+Async versions of the read-heavy churn pages, for serving under ASGI
+(churn_saas/asgi.py). They render the same templates and share the sync
+views' cache entries.
+
+Independent queries are awaited together with asyncio.gather. Django still
+runs ORM calls on one thread per request, so this overlaps the waiting
+rather than the database work; the gain is that a worker is free to serve
+other requests meanwhile instead of blocking a thread per request.
+"""
+import asyncio
+
+from django.contrib.auth.decorators import login_required
+from django.shortcuts import render
+from django.template.loader import render_to_string
+from django.views.decorators.cache import never_cache
+
+from .analytics import adashboard_charts, asummarize_predictions
+from .caching import atenant_cached, request_data_version
+from .pagination import apaginate_request
+from .predictions import current_predictions
+from .views import (
+    CUSTOMER_SORTS,
+    PREDICTION_SORTS,
+    high_risk_predictions,
+    render_churn_dashboard_content,
+    tenant_customers,
+)
+
+
+@never_cache
+@login_required
+async def churn_dashboard_async_view(request):
+    tenant = request.tenant
+    version = request_data_version(request)
+
+    async def build():
+        current = current_predictions(tenant)
+        predictions, summary = await asyncio.gather(
+            apaginate_request(
+                request,
+                current.select_related("customer"),
+                PREDICTION_SORTS,
+                default_sort="risk_score",
+            ),
+            asummarize_predictions(current),
+        )
+        charts = await adashboard_charts(tenant, version, current, summary)
+        return render_churn_dashboard_content(predictions, summary, charts)
+
+    content = await atenant_cached(
+        tenant, "churn_dashboard", build, params=request.GET.dict(), version=version
+    )
+    return render(request, "customers/churn_dashboard.html", {"content": content})
+
+
+@never_cache
+@login_required
+async def high_risk_focus_async_view(request):
+    async def build():
+        predictions = [p async for p in high_risk_predictions(request.tenant)]
+        return render_to_string("customers/_high_risk_list.html", {"predictions": predictions})
+
+    predictions = await atenant_cached(
+        request.tenant, "high_risk_focus", build, version=request_data_version(request)
+    )
+    return render(request, "customers/high_risk_focus.html", {"predictions": predictions})
+
+
+@never_cache
+@login_required
+async def customer_list_async_view(request):
+    async def build():
+        customers = await apaginate_request(
+            request,
+            tenant_customers(request.tenant),
+            CUSTOMER_SORTS,
+            default_sort="last_active",
+        )
+        return render_to_string("customers/_customer_table.html", {"customers": customers})
+
+    table = await atenant_cached(
+        request.tenant,
+        "customer_list",
+        build,
+        params=request.GET.dict(),
+        version=request_data_version(request),
+    )
+    return render(request, "customers/list.html", {"table": table})
@@ -0,0 +1,234 @@
+"""
+Benchmarks for the import, scoring, dashboard and Stripe mapping paths.
+Run them against a synthetic tenant (see `manage.py generate_synthetic_tenant`)
+with `manage.py run_benchmarks`; they write to that tenant's data.
+"""
+import asyncio
+import gc
+import platform
+import subprocess
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.db import connection, connections
+from django.test import AsyncClient, Client, RequestFactory, override_settings
+from django.urls import reverse
+
+from accounts.models import User
+from .importer import import_customers_csv
+from .models import Customer
+from .scoring import generate_churn_predictions
+from .stripe_fake import FakeStripeClient
+from .stripe_sync import fetch_stripe_customers_with_mrr, map_stripe_customers_to_internal
+from .synthetic import synthetic_csv
+from .views import churn_dashboard_view, high_risk_focus_view
+
+
+class QueryCounter:
+    """
+    Counts SQL statements without keeping them (unlike CaptureQueriesContext),
+    so it doesn't skew the memory numbers.
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def measure(name, func):
+    """
+    Run func once and return its wall time, peak Python memory and SQL
+    query count.
+    """
+    gc.collect()
+    counter = QueryCounter()
+    tracemalloc.start()
+    started = time.perf_counter()
+    with connection.execute_wrapper(counter):
+        func()
+    wall_time = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "name": name,
+        "wall_time_s": round(wall_time, 4),
+        "peak_memory_bytes": peak,
+        "queries": counter.count,
+    }
+
+
+def benchmark_cases(tenant):
+    customers = Customer.objects.filter(tenant=tenant).count()
+    user = User(username="benchmark", tenant=tenant)
+    factory = RequestFactory()
+
+    def call_view(view):
+        def run():
+            request = factory.get("/")
+            request.user = user
+            request.tenant = tenant
+            view(request)
+        return run
+
+    # Built once, outside the measured call, so only the import is timed.
+    csv_buffer = synthetic_csv(customers, seed=1)
+
+    def csv_import():
+        csv_buffer.seek(0)
+        import_customers_csv(tenant, csv_buffer)
+
+    stripe_client = FakeStripeClient.generate(customers=customers)
+
+    def stripe_mapping():
+        entries = fetch_stripe_customers_with_mrr(client=stripe_client)
+        map_stripe_customers_to_internal(entries, tenant)
+
+    return [
+        ("csv_import", csv_import),
+        ("generate_churn_predictions", lambda: generate_churn_predictions(tenant, engine="python")),
+        ("generate_churn_predictions_sql", lambda: generate_churn_predictions(tenant, engine="sql")),
+        ("churn_dashboard_view", call_view(churn_dashboard_view)),
+        ("high_risk_focus_view", call_view(high_risk_focus_view)),
+        ("stripe_mapping", stripe_mapping),
+    ]
+
+
+# Pages compared by the throughput benchmark: (sync URL name, async URL name).
+THROUGHPUT_PAGES = (
+    ("churn_dashboard", "churn_dashboard_async"),
+    ("high_risk_focus", "high_risk_focus_async"),
+)
+
+
+def benchmark_user(tenant):
+    user, _ = User.objects.get_or_create(
+        username=f"benchmark-{tenant.slug}", defaults={"tenant": tenant}
+    )
+    return user
+
+
+def split_requests(requests, concurrency):
+    return [requests // concurrency + (i < requests % concurrency) for i in range(concurrency)]
+
+
+def wsgi_throughput(url, user, requests, concurrency):
+    """
+    requests GETs of url through the WSGI handler from concurrency threads,
+    like a threaded WSGI server with that many workers. Returns seconds.
+    """
+    clients = []
+    for _ in range(concurrency):
+        client = Client()
+        client.force_login(user)
+        clients.append(client)
+
+    def worker(client, count):
+        try:
+            for _ in range(count):
+                client.get(url)
+        finally:
+            connections.close_all()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, clients, split_requests(requests, concurrency)))
+    return time.perf_counter() - started
+
+
+def asgi_throughput(url, user, requests, concurrency):
+    """
+    requests GETs of url through the ASGI handler from concurrency
+    concurrent tasks on one event loop, like one ASGI worker serving that
+    many connections. Returns seconds.
+    """
+    async def run():
+        clients = []
+        for _ in range(concurrency):
+            client = AsyncClient()
+            await client.aforce_login(user)
+            clients.append(client)
+
+        async def worker(client, count):
+            for _ in range(count):
+                await client.get(url)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            worker(client, count)
+            for client, count in zip(clients, split_requests(requests, concurrency))
+        ))
+        return time.perf_counter() - started
+
+    return asyncio.run(run())
+
+
+def throughput_benchmarks(tenant, requests=200, concurrency=8):
+    """
+    Requests per second of the sync pages under WSGI and their async
+    versions under ASGI, at the same concurrency.
+    """
+    user = benchmark_user(tenant)
+    results = []
+    # The test clients send Host: testserver.
+    with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+        for sync_name, async_name in THROUGHPUT_PAGES:
+            for name, server, measure_throughput in (
+                (sync_name, "wsgi", wsgi_throughput),
+                (async_name, "asgi", asgi_throughput),
+            ):
+                seconds = measure_throughput(reverse(name), user, requests, concurrency)
+                results.append({
+                    "name": f"{sync_name}_{server}",
+                    "requests": requests,
+                    "concurrency": concurrency,
+                    "wall_time_s": round(seconds, 4),
+                    "requests_per_s": round(requests / seconds, 1),
+                })
+    return results
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_benchmarks(tenant, only=None, repeat=1, throughput_requests=0, concurrency=8):
+    """
+    Run every benchmark (or those named in only) repeat times, plus the
+    WSGI/ASGI throughput comparison if throughput_requests is set.
+    Returns a JSON-serializable report.
+    """
+    results = []
+    for name, func in benchmark_cases(tenant):
+        if only and name not in only:
+            continue
+        for _ in range(repeat):
+            results.append(measure(name, func))
+
+    report = {
+        "commit": current_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "database": connection.vendor,
+        "tenant": tenant.slug,
+        "customers": Customer.objects.filter(tenant=tenant).count(),
+        "results": results,
+    }
+    if throughput_requests:
+        report["throughput"] = throughput_benchmarks(tenant, throughput_requests, concurrency)
+    return report
@@ -0,0 +1,93 @@
+"""
+Tenant-versioned cache for the read-heavy churn pages.
+
+Every tenant has a data_version counter that imports, scoring, Stripe
+apply and history pruning bump. Cached query results and rendered page
+sections are keyed by (tenant, version, name, params), so a bump makes all
+of a tenant's old entries unreachable and they simply expire.
+"""
+import hashlib
+
+from django.core.cache import cache
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.db.models import F
+
+from accounts.models import Tenant
+
+
+def _version_query(tenant):
+    return Tenant.objects.filter(pk=tenant.pk).values_list("data_version", flat=True)
+
+
+# The version itself is never cached: with a per-process cache (locmem) a
+# bump made by another process (the job worker, another web worker, a
+# management command) would never reach this one, and its pages would stay
+# stale. It is one primary key lookup, and views get it for free from the
+# tenant row loaded for the request (see request_data_version).
+
+def data_version(tenant):
+    """
+    Current data version of the tenant, read from the database.
+    """
+    return _version_query(tenant).first() or 0
+
+
+async def adata_version(tenant):
+    """
+    Async version of data_version().
+    """
+    return await _version_query(tenant).afirst() or 0
+
+
+def request_data_version(request):
+    """
+    Data version of the request's tenant. TenantMiddleware loads the tenant
+    from the database on every request, so this is current without another
+    query.
+    """
+    return request.tenant.data_version
+
+
+def bump_data_version(tenant):
+    """
+    Invalidate everything cached for the tenant. Call this inside the
+    transaction that changes its data; other processes see the new version
+    once it commits.
+    """
+    Tenant.objects.filter(pk=tenant.pk).update(data_version=F("data_version") + 1)
+
+
+def tenant_cache_key(tenant, version, name, params=None):
+    key = f"tenant_cache:{tenant.pk}:{version}:{name}"
+    if params:
+        encoded = "&".join(f"{k}={v}" for k, v in sorted(params.items()))
+        key += ":" + hashlib.md5(encoded.encode()).hexdigest()
+    return key
+
+
+def tenant_cached(tenant, name, compute, params=None, version=None, timeout=DEFAULT_TIMEOUT):
+    """
+    Return compute() cached under (tenant, data version, name, params).
+    """
+    if version is None:
+        version = data_version(tenant)
+    key = tenant_cache_key(tenant, version, name, params)
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value, timeout)
+    return value
+
+
+async def atenant_cached(tenant, name, compute, params=None, version=None, timeout=DEFAULT_TIMEOUT):
+    """
+    Async version of tenant_cached(); compute is a coroutine function.
+    """
+    if version is None:
+        version = await adata_version(tenant)
+    key = tenant_cache_key(tenant, version, name, params)
+    value = await cache.aget(key)
+    if value is None:
+        value = await compute()
+        await cache.aset(key, value, timeout)
+    return value
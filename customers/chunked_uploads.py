@@ -0,0 +1,161 @@
+"""
+Resumable uploads of very large customer files.
+
+The client creates an upload, then sends the file in parts, each tagged
+with the byte offset it starts at. Parts are streamed onto a file under
+MEDIA_ROOT in small blocks, so memory per request stays bounded whatever
+the part size. After a dropped connection the client asks for the current
+offset and carries on from there. Completing the upload queues the usual
+import job on the assembled file.
+"""
+import os
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils.timezone import now
+
+from .columnar import pa
+from .forms import UPLOAD_EXTENSIONS
+from .models import ChunkedUpload, Job
+
+
+# Parts are copied to disk in blocks of this many bytes.
+COPY_BLOCK_SIZE = 64 * 1024
+
+
+class ChunkedUploadError(ValueError):
+    """
+    Raised for a part or completion request that can't be applied;
+    `status` is the HTTP status to answer with.
+    """
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def start_upload(tenant, filename, total_size=None):
+    """
+    Create an empty upload for filename (which must have an upload extension).
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    if extension not in UPLOAD_EXTENSIONS:
+        raise ChunkedUploadError(
+            "Upload a CSV, Parquet or Arrow file (" + ", ".join(UPLOAD_EXTENSIONS) + ")."
+        )
+    if extension != ".csv" and pa is None:
+        raise ChunkedUploadError("Parquet and Arrow uploads are not enabled on this server.")
+    if total_size is not None and total_size < 0:
+        raise ChunkedUploadError("total_size must not be negative.")
+
+    name = default_storage.save(f"chunked/{uuid.uuid4().hex}{extension}", ContentFile(b""))
+    return ChunkedUpload.objects.create(
+        tenant=tenant,
+        filename=os.path.basename(filename)[:255],
+        file=name,
+        total_size=total_size,
+    )
+
+
+def append_part(upload, offset, stream, length):
+    """
+    Append length bytes read from stream at offset. offset must equal the
+    bytes received so far (409 otherwise, with the expected offset in
+    upload.received_bytes). Returns the updated upload.
+    """
+    max_part_size = settings.CHUNKED_UPLOAD_MAX_PART_SIZE
+    if length > max_part_size:
+        raise ChunkedUploadError(f"Parts may be at most {max_part_size} bytes.", status=413)
+
+    if upload.status != ChunkedUpload.STATUS_UPLOADING:
+        raise ChunkedUploadError("This upload is already complete.", status=409)
+    if offset != upload.received_bytes:
+        raise ChunkedUploadError(
+            f"Expected offset {upload.received_bytes}, got {offset}.", status=409
+        )
+    if upload.total_size is not None and offset + length > upload.total_size:
+        raise ChunkedUploadError("Part runs past the declared total_size.")
+
+    # The part is written outside any transaction: holding a row lock (on
+    # SQLite, a database-wide lock) while a slow client sends megabytes
+    # would block every other writer. Parts are appended in place, so this
+    # needs local file storage.
+    with open(upload.file.path, "r+b") as target:
+        # Drop whatever a previous, interrupted part left behind.
+        target.truncate(offset)
+        target.seek(offset)
+        remaining = length
+        while remaining:
+            block = stream.read(min(COPY_BLOCK_SIZE, remaining))
+            if not block:
+                break
+            target.write(block)
+            remaining -= len(block)
+
+    if remaining:
+        raise ChunkedUploadError("The part ended before Content-Length bytes arrived.")
+
+    # Only advance from the offset this part was written at; if another
+    # request got there first the client has to resume from the new offset.
+    advanced = (
+        ChunkedUpload.objects
+        .filter(pk=upload.pk, received_bytes=offset, status=ChunkedUpload.STATUS_UPLOADING)
+        .update(received_bytes=offset + length, updated_at=now())
+    )
+    if not advanced:
+        raise ChunkedUploadError("The upload was changed by another request.", status=409)
+
+    upload.received_bytes = offset + length
+    return upload
+
+
+def complete_upload(upload):
+    """
+    Queue the import of a fully received upload. Completing twice returns
+    the same job.
+    """
+    with transaction.atomic():
+        upload = ChunkedUpload.objects.select_for_update().get(pk=upload.pk)
+        if upload.status == ChunkedUpload.STATUS_COMPLETE:
+            return upload.job
+        if upload.total_size is not None and upload.received_bytes != upload.total_size:
+            raise ChunkedUploadError(
+                f"Received {upload.received_bytes} of {upload.total_size} bytes.", status=409
+            )
+
+        # The job takes over the assembled file and deletes it when done.
+        job = Job.objects.create(
+            tenant=upload.tenant,
+            kind=Job.KIND_IMPORT,
+            upload=upload.file.name,
+            message="Waiting for a worker",
+        )
+        upload.job = job
+        upload.status = ChunkedUpload.STATUS_COMPLETE
+        upload.file = ""
+        upload.save(update_fields=["job", "status", "file", "updated_at"])
+    return job
+
+
+def prune_stale_uploads(max_age_hours=None):
+    """
+    Delete uploads that haven't received a part for max_age_hours (default
+    settings.CHUNKED_UPLOAD_EXPIRY_HOURS), with their files. Completed
+    uploads are removed too; their file already belongs to the import job.
+    Returns the number of uploads deleted.
+    """
+    if max_age_hours is None:
+        max_age_hours = settings.CHUNKED_UPLOAD_EXPIRY_HOURS
+    stale = ChunkedUpload.objects.filter(updated_at__lt=now() - timedelta(hours=max_age_hours))
+
+    deleted = 0
+    for upload in stale.iterator():
+        if upload.file:
+            upload.file.delete(save=False)
+        upload.delete()
+        deleted += 1
+    return deleted
@@ -0,0 +1,215 @@
+"""
+Parquet and Arrow IPC customer imports (optional, needs pyarrow).
+
+Files are read in record batches, only the columns the import uses, and
+each column is converted in one vectorized step: strings are trimmed,
+dates parsed (or taken as-is from date/timestamp columns) and numbers cast
+by Arrow, not per row in Python. Local files are memory-mapped. The
+normalized rows go through the same upsert as CSV imports.
+"""
+import os
+
+from .importer import (
+    IMPORT_CHUNK_SIZE,
+    REQUIRED_COLUMNS,
+    CustomerImportError,
+    import_customer_values,
+    new_import_report,
+    normalize_csv_header,
+    safe_float,
+)
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # pragma: no cover - optional dependency
+    pa = pc = None
+
+
+COLUMNAR_BATCH_SIZE = 65536
+
+# Upload file extension -> format.
+COLUMNAR_FORMATS = {
+    ".parquet": "parquet",
+    ".arrow": "arrow",
+    ".feather": "arrow",
+    ".ipc": "arrow",
+}
+
+DATE_COLUMNS = ("signup_date", "last_active_date")
+FLOAT_COLUMNS = ("monthly_spend", "feature_usage_score")
+STRING_COLUMNS = ("email", "subscription_type")
+IMPORT_COLUMNS = ("external_id", *STRING_COLUMNS, *DATE_COLUMNS, *FLOAT_COLUMNS, "churned")
+
+TRUE_STRINGS = ("1", "true", "yes")
+
+
+def columnar_format(filename):
+    """
+    "parquet" or "arrow" for a columnar upload's file name, else None.
+    """
+    return COLUMNAR_FORMATS.get(os.path.splitext(filename or "")[1].lower())
+
+
+def require_pyarrow():
+    if pa is None:
+        raise CustomerImportError("Parquet and Arrow imports need the pyarrow package.")
+
+
+def _is_path(source):
+    return isinstance(source, (str, os.PathLike))
+
+
+def _column_map(names):
+    """
+    Import column -> file column, matching names like CSV headers.
+    """
+    columns = {}
+    for name in names:
+        columns.setdefault(normalize_csv_header(name), name)
+
+    missing = REQUIRED_COLUMNS - set(columns)
+    if missing:
+        raise CustomerImportError("Missing required columns: " + ", ".join(sorted(missing)))
+    return {column: columns[column] for column in IMPORT_COLUMNS if column in columns}
+
+
+def read_record_batches(source, fmt, batch_size=COLUMNAR_BATCH_SIZE, memory_map=True):
+    """
+    Open a Parquet or Arrow IPC (file or stream) source, a path or a binary
+    file object.
+    Returns: (column map, iterator of RecordBatches, handle to close() once
+    the batches are read, or None)
+    """
+    require_pyarrow()
+
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        # Closing a ParquetFile only closes files it opened itself.
+        parquet = pq.ParquetFile(source, memory_map=memory_map and _is_path(source))
+        try:
+            columns = _column_map(parquet.schema_arrow.names)
+        except CustomerImportError:
+            parquet.close()
+            raise
+        return columns, parquet.iter_batches(batch_size=batch_size, columns=list(columns.values())), parquet
+
+    import pyarrow.ipc as ipc
+
+    handle = None
+    if _is_path(source):
+        source = handle = pa.memory_map(os.fspath(source)) if memory_map else pa.OSFile(os.fspath(source))
+    try:
+        try:
+            reader = ipc.open_file(source)
+            batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+        except pa.ArrowInvalid:
+            source.seek(0)
+            reader = ipc.open_stream(source)
+            batches = iter(reader)
+        return _column_map(reader.schema.names), batches, handle
+    except BaseException:
+        if handle is not None:
+            handle.close()
+        raise
+
+
+def _strings(column):
+    if not pa.types.is_string(column.type):
+        column = pc.cast(column, pa.string())
+    return column
+
+
+def _dates(column):
+    if pa.types.is_date(column.type) or pa.types.is_timestamp(column.type):
+        return pc.cast(column, pa.date32())
+    if pa.types.is_null(column.type):
+        return column
+    parsed = pc.strptime(_strings(column), format="%Y-%m-%d", unit="s", error_is_null=True)
+    return pc.cast(parsed, pa.date32())
+
+
+def _floats(column):
+    try:
+        floats = pc.cast(column, pa.float64())
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        # Mixed junk in a string column: fall back to the CSV rules.
+        return pa.array([safe_float(value) for value in column.to_pylist()], pa.float64())
+    # NaN and infinity become missing values, like safe_float().
+    return pc.if_else(pc.is_finite(floats), floats, pa.scalar(None, pa.float64()))
+
+
+def _bools(column):
+    if pa.types.is_boolean(column.type):
+        flags = column
+    elif pa.types.is_integer(column.type) or pa.types.is_floating(column.type):
+        flags = pc.not_equal(column, 0)
+    else:
+        flags = pc.is_in(pc.utf8_lower(_strings(column)), value_set=pa.array(TRUE_STRINGS))
+    return pc.fill_null(flags, False)
+
+
+def batch_values(batch, columns):
+    """
+    Normalized Customer field values for one RecordBatch.
+    Returns: (values list, number of rows skipped for a missing external_id)
+    """
+    def column(name):
+        return batch.column(batch.schema.get_field_index(columns[name]))
+
+    external_ids = pc.utf8_trim_whitespace(_strings(column("external_id")))
+    keep = pc.fill_null(pc.not_equal(external_ids, ""), False)
+    skipped = batch.num_rows - pc.sum(keep).as_py() if batch.num_rows else 0
+
+    converted = {"external_id": pc.filter(external_ids, keep).to_pylist()}
+    for name, convert in [
+        *((name, _strings) for name in STRING_COLUMNS),
+        *((name, _dates) for name in DATE_COLUMNS),
+        *((name, _floats) for name in FLOAT_COLUMNS),
+        ("churned", _bools),
+    ]:
+        if name in columns:
+            converted[name] = pc.filter(convert(column(name)), keep).to_pylist()
+
+    count = len(converted["external_id"])
+    defaults = {"churned": False}
+    fields = {
+        name: converted.get(name) or [defaults.get(name)] * count
+        for name in IMPORT_COLUMNS
+    }
+    values = [dict(zip(fields, row)) for row in zip(*fields.values())]
+    return values, skipped
+
+
+def import_customers_columnar(tenant, source, fmt, chunk_size=IMPORT_CHUNK_SIZE, progress=None, memory_map=True, batch_size=COLUMNAR_BATCH_SIZE):
+    """
+    Import a Parquet or Arrow IPC file (path or binary file object) for
+    the tenant. Raises CustomerImportError if pyarrow is missing, the file
+    can't be read or required columns are missing.
+    Returns the same report as import_customers_csv().
+    """
+    try:
+        columns, batches, handle = read_record_batches(source, fmt, batch_size, memory_map)
+    except CustomerImportError:
+        raise
+    except (OSError, ValueError) as exc:
+        raise CustomerImportError(f"Could not read {fmt} file: {exc}") from exc
+
+    report = new_import_report()
+
+    def values():
+        try:
+            for batch in batches:
+                rows, skipped = batch_values(batch, columns)
+                report["skipped"] += skipped
+                yield from rows
+        except (pa.ArrowException, OSError) as exc:
+            # Corrupt data, or a column type that can't be converted.
+            raise CustomerImportError(f"Could not read {fmt} file: {exc}") from exc
+
+    try:
+        return import_customer_values(tenant, values(), chunk_size, progress, report)
+    finally:
+        if handle is not None:
+            handle.close()
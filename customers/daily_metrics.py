@@ -0,0 +1,89 @@
+"""
+Per-tenant daily metrics (TenantDailyMetrics), written at the end of every
+scoring run and read by the home dashboard.
+"""
+from datetime import date, timedelta
+
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.utils.timezone import now
+
+from .analytics import RISK_TRENDS, summarize_predictions
+from .models import ChurnPrediction, TenantDailyMetrics
+from .predictions import current_predictions
+from .risk_engine import RISK_LEVELS
+
+
+AT_RISK_LEVELS = ("medium", "high")
+
+
+def count_risk_transitions(customers):
+    """
+    New and resolved risks among a Customer queryset whose new predictions
+    are stored but whose latest_prediction still points at the previous
+    one, in one aggregate query.
+    Returns: (new_risks, resolved_risks)
+    """
+    newest_level = Subquery(
+        ChurnPrediction.objects
+        .filter(customer=OuterRef("pk"))
+        .order_by("-id")
+        .values("risk_level")[:1]
+    )
+    was_at_risk = Q(latest_prediction__risk_level__in=AT_RISK_LEVELS)
+    is_at_risk = Q(newest_level__in=AT_RISK_LEVELS)
+
+    row = (
+        customers
+        .order_by()
+        .annotate(newest_level=newest_level)
+        .aggregate(
+            new_risks=Count("pk", filter=is_at_risk & ~was_at_risk),
+            resolved_risks=Count("pk", filter=was_at_risk & ~is_at_risk),
+        )
+    )
+    return row["new_risks"], row["resolved_risks"]
+
+
+def record_daily_metrics(tenant, new_risks=0, resolved_risks=0, day=None):
+    """
+    Refresh today's TenantDailyMetrics row from the current predictions
+    and add the run's risk transitions to it. Call inside the scoring
+    run's transaction, after the latest_prediction pointers are updated.
+
+    The row is changed with a single UPDATE (counters incremented in SQL),
+    so concurrent runs for the tenant add up instead of overwriting each
+    other. The first run of the day creates it through get_or_create, which
+    falls back to fetching the row if another run inserted it first.
+    """
+    summary = summarize_predictions(current_predictions(tenant))
+    snapshot = {
+        "scored_customers": summary["total"],
+        "customers_at_risk": sum(summary["levels"][level] for level in AT_RISK_LEVELS),
+        "revenue_at_risk": summary["revenue_at_risk"],
+        **{f"level_{level}": summary["levels"][level] for level in RISK_LEVELS},
+        **{f"trend_{trend}": summary["trends"][trend] for trend in RISK_TRENDS},
+    }
+    day = day or date.today()
+
+    today_row = TenantDailyMetrics.objects.filter(tenant=tenant, date=day)
+    changes = {
+        **snapshot,
+        "new_risks": F("new_risks") + new_risks,
+        "resolved_risks": F("resolved_risks") + resolved_risks,
+        "updated_at": now(),
+    }
+    if not today_row.update(**changes):
+        TenantDailyMetrics.objects.get_or_create(tenant=tenant, date=day)
+        today_row.update(**changes)
+
+
+def recent_daily_metrics(tenant, days, today=None):
+    """
+    The tenant's metrics rows for the last `days` days, oldest first.
+    """
+    today = today or date.today()
+    return list(
+        TenantDailyMetrics.objects
+        .filter(tenant=tenant, date__gt=today - timedelta(days=days))
+        .order_by("date")
+    )
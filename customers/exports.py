@@ -0,0 +1,95 @@
+"""
+Streaming CSV export of a tenant's current churn predictions.
+
+Rows are read with a chunked .iterator() and written straight into the
+response, optionally gzip-compressed on the fly, so memory stays flat and
+the first bytes go out before the query has finished.
+"""
+import csv
+import zlib
+
+from .models import Customer
+
+
+EXPORT_ITERATOR_CHUNK_SIZE = 2000
+
+# Bytes of CSV gathered before a chunk is handed to the server (or to the
+# compressor), so million-row exports aren't sent one line at a time.
+EXPORT_BUFFER_SIZE = 64 * 1024
+
+# (CSV header, Customer field path) for every exported column.
+EXPORT_COLUMNS = (
+    ("external_id", "external_id"),
+    ("email", "email"),
+    ("subscription_type", "subscription_type"),
+    ("monthly_spend", "monthly_spend"),
+    ("last_active_date", "last_active_date"),
+    ("risk_score", "latest_prediction__risk_score"),
+    ("risk_level", "latest_prediction__risk_level"),
+    ("reasons", "latest_prediction__reasons"),
+    ("revenue_at_risk", "latest_prediction__revenue_at_risk"),
+    ("recommended_action", "latest_prediction__recommended_action"),
+    ("risk_trend", "latest_prediction__risk_trend"),
+    ("early_warning", "latest_prediction__early_warning"),
+    ("days_in_risk", "latest_prediction__days_in_risk"),
+    ("scored_at", "latest_prediction__created_at"),
+)
+
+REASONS_COLUMN = [header for header, _ in EXPORT_COLUMNS].index("reasons")
+
+
+class Echo:
+    """
+    File-like object whose write() returns the value, so csv.writer
+    produces lines instead of buffering them.
+    """
+
+    def write(self, value):
+        return value
+
+
+def export_rows(tenant):
+    """
+    One tuple per currently scored customer, in EXPORT_COLUMNS order,
+    through the latest_prediction pointer (no scan of history).
+    """
+    return (
+        Customer.objects
+        .filter(tenant=tenant, latest_prediction__isnull=False)
+        .order_by("pk")
+        .values_list(*(path for _, path in EXPORT_COLUMNS))
+        .iterator(chunk_size=EXPORT_ITERATOR_CHUNK_SIZE)
+    )
+
+
+def csv_chunks(rows):
+    """
+    Encoded CSV for the rows, header first, in chunks of about
+    EXPORT_BUFFER_SIZE bytes.
+    """
+    writer = csv.writer(Echo())
+    buffer = [writer.writerow([header for header, _ in EXPORT_COLUMNS])]
+    size = len(buffer[0])
+    for row in rows:
+        row = list(row)
+        row[REASONS_COLUMN] = "; ".join(row[REASONS_COLUMN] or [])
+        line = writer.writerow(row)
+        buffer.append(line)
+        size += len(line)
+        if size >= EXPORT_BUFFER_SIZE:
+            yield "".join(buffer).encode("utf-8")
+            buffer, size = [], 0
+    if buffer:
+        yield "".join(buffer).encode("utf-8")
+
+
+def gzip_chunks(chunks):
+    """
+    Gzip-compress a stream of byte chunks incrementally.
+    """
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
@@ -1,4 +1,20 @@
 from django import forms
 
+from .columnar import COLUMNAR_FORMATS, pa
+
+UPLOAD_EXTENSIONS = (".csv", *COLUMNAR_FORMATS)
+
+
 class CustomerUploadForm(forms.Form):
     file = forms.FileField()
+
+    def clean_file(self):
+        file = self.cleaned_data["file"]
+        name = file.name.lower()
+        if not name.endswith(UPLOAD_EXTENSIONS):
+            raise forms.ValidationError(
+                "Upload a CSV, Parquet or Arrow file (" + ", ".join(UPLOAD_EXTENSIONS) + ")."
+            )
+        if not name.endswith(".csv") and pa is None:
+            raise forms.ValidationError("Parquet and Arrow uploads are not enabled on this server.")
+        return file
@@ -0,0 +1,214 @@
+import csv
+import math
+from collections import Counter
+from datetime import datetime
+
+from django.db import transaction
+
+from .caching import bump_data_version
+from .models import Customer
+
+
+IMPORT_CHUNK_SIZE = 500
+
+REQUIRED_COLUMNS = {"external_id"}
+
+# Customer columns written by an import; everything except the
+# (tenant, external_id) key and uploaded_at.
+IMPORT_FIELDS = (
+    "email",
+    "signup_date",
+    "last_active_date",
+    "subscription_type",
+    "monthly_spend",
+    "feature_usage_score",
+    "churned",
+)
+
+
+class CustomerImportError(ValueError):
+    """
+    Raised when an uploaded file can't be imported at all
+    (e.g. required columns are missing).
+    """
+
+
+def parse_date(value):
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except:
+        return None
+
+
+def safe_float(value):
+    try:
+        value = float(value)
+    except:
+        return None
+    # NaN never compares equal, so it would be rewritten on every import.
+    return value if math.isfinite(value) else None
+
+
+def parse_bool(value):
+    if not value:
+        return False
+    return value.lower() in ("1", "true", "yes")
+
+
+def normalize_csv_header(value):
+    if value is None:
+        return ""
+    return value.strip().lstrip("\ufeff").lower()
+
+
+def normalize_customer_row(row):
+    """
+    Turn a raw CSV row into Customer field values.
+    Returns None when the row has no external_id and must be skipped.
+    """
+    normalized_row = {
+        normalize_csv_header(key): value
+        for key, value in row.items()
+    }
+    external_id = (normalized_row.get("external_id") or "").strip()
+    if not external_id:
+        return None
+
+    return {
+        "external_id": external_id,
+        "email": normalized_row.get("email"),
+        "signup_date": parse_date(normalized_row.get("signup_date")),
+        "last_active_date": parse_date(normalized_row.get("last_active_date")),
+        "subscription_type": normalized_row.get("subscription_type"),
+        "monthly_spend": safe_float(normalized_row.get("monthly_spend")),
+        "feature_usage_score": safe_float(normalized_row.get("feature_usage_score")),
+        "churned": parse_bool(normalized_row.get("churned")),
+    }
+
+
+def new_import_report():
+    return {"created": 0, "updated": 0, "unchanged": 0, "skipped": 0}
+
+
+def upsert_customer_chunk(tenant, values_list):
+    """
+    Write one chunk of normalized rows. Existing rows are prefetched and
+    compared field by field, and only new or changed customers go into
+    a single bulk upsert on the (tenant, external_id) unique constraint,
+    so re-importing the same file writes nothing.
+    Returns: (created, updated, unchanged, whether anything was written)
+    """
+    # Last row wins for duplicate external_ids, like sequential updates would.
+    by_external_id = {}
+    rows_per_id = Counter()
+    for values in values_list:
+        by_external_id[values["external_id"]] = values
+        rows_per_id[values["external_id"]] += 1
+
+    existing = {
+        row[0]: row[1:]
+        for row in (
+            Customer.objects
+            .filter(tenant=tenant, external_id__in=list(by_external_id))
+            .values_list("external_id", *IMPORT_FIELDS)
+        )
+    }
+
+    customers = []
+    created = updated = unchanged = 0
+    for external_id, values in by_external_id.items():
+        # Earlier duplicates of the id were superseded by this row.
+        superseded = rows_per_id[external_id] - 1
+        current = existing.get(external_id)
+        if current is not None and current == tuple(values[field] for field in IMPORT_FIELDS):
+            unchanged += 1 + superseded
+            continue
+        if current is None:
+            created += 1
+            updated += superseded
+        else:
+            updated += 1 + superseded
+        customer = Customer(tenant=tenant, **values)
+        customer.refresh_input_fingerprint()
+        customers.append(customer)
+
+    if customers:
+        Customer.objects.bulk_create(
+            customers,
+            update_conflicts=True,
+            unique_fields=["tenant", "external_id"],
+            update_fields=[*IMPORT_FIELDS, "input_fingerprint"],
+        )
+
+    return created, updated, unchanged, bool(customers)
+
+
+def import_customers(tenant, rows, chunk_size=IMPORT_CHUNK_SIZE, progress=None):
+    """
+    Validate, normalize and bulk upsert raw customer rows chunk by chunk.
+    progress, if given, is called with the number of rows handled so far
+    after every chunk.
+    Returns a report dict with created, updated, unchanged and skipped counts.
+    """
+    report = new_import_report()
+
+    def normalized():
+        for row in rows:
+            values = normalize_customer_row(row)
+            if values is None:
+                report["skipped"] += 1
+                continue
+            yield values
+
+    return import_customer_values(tenant, normalized(), chunk_size, progress, report)
+
+
+def import_customer_values(tenant, values_iter, chunk_size=IMPORT_CHUNK_SIZE, progress=None, report=None):
+    """
+    Bulk upsert already-normalized Customer field values chunk by chunk.
+    Rows skipped by the caller can be counted in the report it passes in.
+    Returns the report dict with created, updated, unchanged and skipped counts.
+    """
+    if report is None:
+        report = new_import_report()
+
+    def flush(chunk):
+        with transaction.atomic():
+            created, updated, unchanged, written = upsert_customer_chunk(tenant, chunk)
+            if written:
+                bump_data_version(tenant)
+        report["created"] += created
+        report["updated"] += updated
+        report["unchanged"] += unchanged
+        if progress:
+            progress(sum(report.values()))
+
+    chunk = []
+    for values in values_iter:
+        chunk.append(values)
+        if len(chunk) >= chunk_size:
+            flush(chunk)
+            chunk = []
+
+    if chunk:
+        flush(chunk)
+
+    return report
+
+
+def import_customers_csv(tenant, text_stream, chunk_size=IMPORT_CHUNK_SIZE, progress=None):
+    """
+    Import a CSV text stream for the tenant.
+    Raises CustomerImportError if required columns are missing.
+    """
+    reader = csv.DictReader(text_stream)
+    normalized_fieldnames = [normalize_csv_header(name) for name in reader.fieldnames or []]
+    missing_columns = REQUIRED_COLUMNS - set(normalized_fieldnames)
+    if missing_columns:
+        raise CustomerImportError(
+            "Missing required columns: " + ", ".join(sorted(missing_columns))
+        )
+
+    return import_customers(tenant, reader, chunk_size=chunk_size, progress=progress)
@@ -0,0 +1,174 @@
+import io
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Q
+from django.utils.timezone import now
+
+from .columnar import columnar_format, import_customers_columnar
+from .importer import import_customers_csv
+from .models import Job
+from .scoring import generate_churn_predictions
+
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_import_job(tenant, uploaded_file):
+    """
+    Store the uploaded file and queue an import (followed by scoring).
+    """
+    return Job.objects.create(
+        tenant=tenant,
+        kind=Job.KIND_IMPORT,
+        upload=uploaded_file,
+        message="Waiting for a worker",
+    )
+
+
+def enqueue_scoring_job(tenant):
+    """
+    Queue a scoring run, reusing one that is already queued for the tenant.
+    """
+    pending = (
+        Job.objects
+        .filter(tenant=tenant, kind=Job.KIND_SCORING, status=Job.STATUS_QUEUED)
+        .order_by("created_at")
+        .first()
+    )
+    if pending:
+        return pending
+
+    return Job.objects.create(
+        tenant=tenant,
+        kind=Job.KIND_SCORING,
+        message="Waiting for a worker",
+    )
+
+
+def claim_next_job():
+    """
+    Atomically move the oldest queued job to running.
+    The conditional UPDATE makes this safe with several workers.
+    A running job not updated for settings.JOB_TIMEOUT_MINUTES (its worker
+    died) is claimed again like a queued one.
+    Returns the claimed Job or None if the queue is empty.
+    """
+    stale_before = now() - timedelta(minutes=settings.JOB_TIMEOUT_MINUTES)
+    claimable = Q(status=Job.STATUS_QUEUED) | Q(status=Job.STATUS_RUNNING, heartbeat_at__lt=stale_before)
+    while True:
+        job = (
+            Job.objects
+            .filter(claimable)
+            .order_by("created_at", "id")
+            .first()
+        )
+        if job is None:
+            return None
+
+        if job.status == Job.STATUS_RUNNING:
+            logger.warning("Reclaiming job %s, last updated at %s", job.pk, job.heartbeat_at)
+        claimed = (
+            Job.objects
+            .filter(pk=job.pk, status=job.status, heartbeat_at=job.heartbeat_at)
+            .update(status=Job.STATUS_RUNNING, started_at=now(), heartbeat_at=now(), message="Starting")
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+
+
+def update_job(job, **fields):
+    """
+    Write fields of the job's row, recording that its worker is alive.
+    """
+    Job.objects.filter(pk=job.pk).update(**fields, heartbeat_at=now())
+
+
+def run_import_job(job):
+    def import_progress(done):
+        update_job(job, progress_current=done)
+
+    update_job(job, message="Importing customers")
+    fmt = columnar_format(job.upload.name)
+    if fmt:
+        report = import_columnar_upload(job, fmt, import_progress)
+    else:
+        with job.upload.open("rb") as raw:
+            text_stream = io.TextIOWrapper(raw, encoding="utf-8", newline="")
+            report = import_customers_csv(job.tenant, text_stream, progress=import_progress)
+
+    # Only customers the upload changed (or whose date rules expired) need new scores.
+    run_scoring_job(job, incremental=True)
+    return report
+
+
+def import_columnar_upload(job, fmt, progress):
+    try:
+        # Local uploads are memory-mapped straight from disk.
+        source = job.upload.path
+    except NotImplementedError:
+        with job.upload.open("rb") as raw:
+            return import_customers_columnar(job.tenant, raw, fmt, progress=progress)
+    return import_customers_columnar(job.tenant, source, fmt, progress=progress)
+
+
+def run_scoring_job(job, incremental=False):
+    def scoring_progress(done, total):
+        update_job(job, progress_current=done, progress_total=total)
+
+    update_job(job, message="Scoring customers", progress_current=0, progress_total=0)
+    generate_churn_predictions(job.tenant, progress=scoring_progress, incremental=incremental)
+    return {}
+
+
+JOB_HANDLERS = {
+    Job.KIND_IMPORT: run_import_job,
+    Job.KIND_SCORING: run_scoring_job,
+}
+
+
+def run_job(job):
+    """
+    Execute a claimed job and record its outcome.
+    """
+    try:
+        result = JOB_HANDLERS[job.kind](job)
+    except Exception as exc:
+        logger.exception("Job %s failed", job.pk)
+        update_job(
+            job,
+            status=Job.STATUS_FAILED,
+            message="Failed",
+            error=str(exc) or traceback.format_exc(),
+            finished_at=now(),
+        )
+    else:
+        update_job(
+            job,
+            status=Job.STATUS_SUCCEEDED,
+            message="Done",
+            result=result or {},
+            finished_at=now(),
+        )
+    finally:
+        if job.upload:
+            job.upload.delete(save=False)
+            update_job(job, upload="")
+
+    job.refresh_from_db()
+    return job
+
+
+def run_next_job():
+    """
+    Claim and run one job. Returns the finished Job or None if idle.
+    """
+    close_old_connections()
+    job = claim_next_job()
+    if job is None:
+        return None
+    return run_job(job)
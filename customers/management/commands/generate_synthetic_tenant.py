@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from customers.synthetic import create_synthetic_tenant
+
+
+class Command(BaseCommand):
+    help = (
+        "Create a synthetic tenant with N customers and K scoring runs of prediction "
+        "history for benchmarking. Replaces any tenant with the same slug."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--slug", default="synthetic", help="Tenant slug (default: %(default)s).")
+        parser.add_argument(
+            "--customers",
+            type=int,
+            default=1000,
+            help="Number of customers, e.g. 1000, 100000 or 1000000 (default: %(default)s).",
+        )
+        parser.add_argument(
+            "--runs",
+            type=int,
+            default=1,
+            help="Scoring runs of prediction history, one day apart (default: %(default)s).",
+        )
+        parser.add_argument("--seed", type=int, default=0, help="Random seed (default: %(default)s).")
+
+    def handle(self, *args, **options):
+        if options["customers"] < 1 or options["runs"] < 0:
+            raise CommandError("--customers must be positive and --runs non-negative.")
+
+        tenant = create_synthetic_tenant(
+            options["slug"],
+            options["customers"],
+            runs=options["runs"],
+            seed=options["seed"],
+            stdout=self.stdout,
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Created tenant '{tenant.slug}' with {options['customers']} customers "
+                f"and {options['runs']} scoring runs."
+            )
+        )
@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from customers.chunked_uploads import prune_stale_uploads
+
+
+class Command(BaseCommand):
+    help = "Delete resumable uploads that were abandoned or already imported, with their files."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--max-age-hours",
+            type=int,
+            default=settings.CHUNKED_UPLOAD_EXPIRY_HOURS,
+            help="Delete uploads without a new part for this many hours (default: %(default)s).",
+        )
+
+    def handle(self, *args, **options):
+        deleted = prune_stale_uploads(options["max_age_hours"])
+        self.stdout.write(f"Deleted {deleted} stale uploads.")
@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import Tenant
+from customers.retention import GRANULARITIES, prune_prediction_history, retention_settings
+
+
+class Command(BaseCommand):
+    help = (
+        "Apply the ChurnPrediction retention policy: keep recent predictions in full "
+        "and roll older history up into daily or weekly snapshots."
+    )
+
+    def add_arguments(self, parser):
+        options = retention_settings()
+        parser.add_argument("--tenant", help="Only prune this tenant (slug).")
+        parser.add_argument(
+            "--detail-days",
+            type=int,
+            default=options["DETAIL_DAYS"],
+            help="Keep every prediction newer than this many days (default: %(default)s).",
+        )
+        parser.add_argument(
+            "--granularity",
+            choices=GRANULARITIES,
+            default=options["ROLLUP"],
+            help="Snapshot size for older history (default: %(default)s).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=options["BATCH_SIZE"],
+            help="Rows deleted per transaction (default: %(default)s).",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report what would be deleted without deleting anything.",
+        )
+
+    def handle(self, *args, **options):
+        tenants = Tenant.objects.order_by("pk")
+        if options["tenant"]:
+            tenants = tenants.filter(slug=options["tenant"])
+            if not tenants.exists():
+                raise CommandError(f"Unknown tenant: {options['tenant']}")
+
+        verb = "Would delete" if options["dry_run"] else "Deleted"
+        for tenant in tenants:
+            report = prune_prediction_history(
+                tenant,
+                detail_days=options["detail_days"],
+                granularity=options["granularity"],
+                batch_size=options["batch_size"],
+                dry_run=options["dry_run"],
+            )
+            self.stdout.write(
+                f"{tenant.name}: {verb} {report['deleted']} of "
+                f"{report['scanned']} predictions older than {options['detail_days']} days."
+            )
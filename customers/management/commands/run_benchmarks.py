@@ -0,0 +1,70 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import Tenant
+from customers.benchmarks import run_benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure wall time, peak memory and SQL query count of CSV import, scoring, "
+        "the churn dashboards and Stripe mapping against a synthetic tenant."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tenant", default="synthetic", help="Tenant slug (default: %(default)s).")
+        parser.add_argument("--repeat", type=int, default=1, help="Runs per benchmark (default: %(default)s).")
+        parser.add_argument("--only", nargs="*", help="Only run these benchmarks.")
+        parser.add_argument(
+            "--throughput",
+            type=int,
+            default=0,
+            metavar="REQUESTS",
+            help="Also compare WSGI and ASGI throughput of the dashboards with this many requests.",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=8,
+            help="Concurrent workers for --throughput (default: %(default)s).",
+        )
+        parser.add_argument(
+            "--output",
+            help="JSON file to write (default: benchmark-<commit>.json).",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            tenant = Tenant.objects.get(slug=options["tenant"])
+        except Tenant.DoesNotExist:
+            raise CommandError(
+                f"Unknown tenant: {options['tenant']}. Create one with generate_synthetic_tenant."
+            )
+
+        report = run_benchmarks(
+            tenant,
+            only=options["only"],
+            repeat=options["repeat"],
+            throughput_requests=options["throughput"],
+            concurrency=options["concurrency"],
+        )
+
+        self.stdout.write(f"{report['customers']} customers @ {report['commit']}")
+        for result in report["results"]:
+            self.stdout.write(
+                f"{result['name']:<28} {result['wall_time_s']:>10.3f}s "
+                f"{result['peak_memory_bytes'] / 1024 / 1024:>10.1f} MiB "
+                f"{result['queries']:>8} queries"
+            )
+
+        for result in report.get("throughput", []):
+            self.stdout.write(
+                f"{result['name']:<28} {result['requests_per_s']:>10.1f} req/s "
+                f"({result['requests']} requests, concurrency {result['concurrency']})"
+            )
+
+        output = Path(options["output"] or f"benchmark-{report['commit']}.json")
+        output.write_text(json.dumps(report, indent=2))
+        self.stdout.write(self.style.SUCCESS(f"Wrote {output}"))
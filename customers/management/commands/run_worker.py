@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from customers.jobs import run_next_job
+
+
+class Command(BaseCommand):
+    help = "Run queued import and scoring jobs from the database job queue."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Run the jobs currently queued, then exit.",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=2.0,
+            help="Seconds to sleep when the queue is empty (default: 2).",
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write("Worker started.")
+
+        while True:
+            job = run_next_job()
+
+            if job is None:
+                if options["once"]:
+                    break
+                time.sleep(options["poll_interval"])
+                continue
+
+            style = self.style.SUCCESS if job.status == job.STATUS_SUCCEEDED else self.style.ERROR
+            self.stdout.write(style(f"{job} for {job.tenant}"))
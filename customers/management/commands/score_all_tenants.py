@@ -0,0 +1,75 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from customers.parallel_scoring import score_all_tenants
+from customers.scoring_locks import MIN_STALE_LOCK_AFTER
+
+
+MIN_STALE_LOCK_MINUTES = MIN_STALE_LOCK_AFTER // timedelta(minutes=1)
+
+
+class Command(BaseCommand):
+    help = (
+        "Rescore every tenant in parallel across a process pool, largest tenants "
+        "first. Tenants being scored by another run are skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            help="Worker processes (default: number of CPUs; 1 scores in-process).",
+        )
+        parser.add_argument("--tenant", action="append", dest="tenants", help="Only this tenant slug (repeatable).")
+        parser.add_argument("--engine", choices=["python", "sql"], help="Scoring engine (default: CHURN_SCORING_ENGINE).")
+        parser.add_argument(
+            "--incremental",
+            action="store_true",
+            help="Only rescore customers whose inputs changed or whose date rules expired.",
+        )
+        parser.add_argument(
+            "--stale-lock-minutes",
+            type=int,
+            default=60,
+            help=(
+                "Take over scoring locks without a heartbeat for this long "
+                f"(default: %(default)s, minimum: {MIN_STALE_LOCK_MINUTES})."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        if options["workers"] is not None and options["workers"] < 1:
+            raise CommandError("--workers must be at least 1.")
+        stale_after = timedelta(minutes=options["stale_lock_minutes"])
+        if stale_after < MIN_STALE_LOCK_AFTER:
+            raise CommandError(f"--stale-lock-minutes must be at least {MIN_STALE_LOCK_MINUTES}.")
+
+        def report(result):
+            style = {"scored": self.style.SUCCESS, "locked": self.style.WARNING}.get(result["status"], self.style.ERROR)
+            self.stdout.write(style(
+                f"{result['slug']:<30} {result['status']:<7} {result['customers']:>9} customers "
+                f"{result['predictions']:>9} predictions {result['seconds']:>8.2f}s {result['error']}".rstrip()
+            ))
+
+        start = time.perf_counter()
+        results = score_all_tenants(
+            workers=options["workers"],
+            engine=options["engine"],
+            incremental=options["incremental"],
+            slugs=options["tenants"],
+            stale_after=stale_after,
+            on_result=report,
+        )
+
+        scored = [r for r in results if r["status"] == "scored"]
+        failed = [r for r in results if r["status"] == "failed"]
+        self.stdout.write(
+            f"{len(scored)} of {len(results)} tenants scored, "
+            f"{sum(r['predictions'] for r in scored)} predictions, "
+            f"{sum(r['seconds'] for r in results):.2f}s of scoring time "
+            f"in {time.perf_counter() - start:.2f}s."
+        )
+        if failed:
+            raise CommandError(f"Scoring failed for: {', '.join(r['slug'] for r in failed)}")
@@ -1,22 +1,53 @@
 from django.core.management.base import BaseCommand, CommandError
 
-from customers.stripe_sync import fetch_stripe_customers_with_mrr, map_stripe_customers_to_internal
+from accounts.models import Tenant
+from customers.models import StripeSyncCheckpoint
+from customers.stripe_sync import (
+    apply_stripe_billing,
+    fetch_stripe_customers_with_mrr,
+    map_stripe_customers_to_internal,
+)
 
 
 class Command(BaseCommand):
     help = "Fetch read-only Stripe customers and active subscriptions for churn analysis."
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--tenant",
+            required=True,
+            help="Tenant (slug) the Stripe account belongs to.",
+        )
+        parser.add_argument(
+            "--incremental",
+            action="store_true",
+            help="Only fetch objects created since the tenant's last sync checkpoint.",
+        )
+        parser.add_argument(
+            "--apply",
+            action="store_true",
+            help="Write matched MRR and plans into customer records and rescore changed customers.",
+        )
+
     def handle(self, *args, **options):
         try:
-            stripe_customers = fetch_stripe_customers_with_mrr()
+            tenant = Tenant.objects.get(slug=options["tenant"])
+        except Tenant.DoesNotExist:
+            raise CommandError(f"Unknown tenant: {options['tenant']}")
+
+        checkpoint = None
+        if options["incremental"]:
+            checkpoint, _ = StripeSyncCheckpoint.objects.get_or_create(tenant=tenant)
+
+        try:
+            stripe_customers = fetch_stripe_customers_with_mrr(checkpoint=checkpoint)
         except Exception as exc:  # pragma: no cover - operational path
             raise CommandError(str(exc))
 
-        mapped_customers = map_stripe_customers_to_internal(stripe_customers)
+        mapped_customers = map_stripe_customers_to_internal(stripe_customers, tenant)
 
         if not mapped_customers:
             self.stdout.write(self.style.WARNING("No Stripe customers returned."))
-            return
 
         for customer in mapped_customers:
             name = customer.get("name") or "(no name)"
@@ -30,3 +61,16 @@ class Command(BaseCommand):
             )
 
             self.stdout.write(f"{name} | {email} | {plan} | MRR: {mrr} | {matched}")
+
+        if options["apply"]:
+            summary = apply_stripe_billing(tenant, mapped_customers)
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Applied Stripe billing: {summary['matched']} matched, "
+                    f"{summary['updated']} updated, {summary['rescored']} rescored."
+                )
+            )
+
+        # Only advance the checkpoint once everything fetched was processed.
+        if checkpoint is not None:
+            checkpoint.save()
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:41
+
+from django.db import migrations, models
+
+from customers.risk_engine import input_fingerprint
+
+
+def fill_input_fingerprints(apps, schema_editor):
+    Customer = apps.get_model("customers", "Customer")
+    batch = []
+    for customer in Customer.objects.only(
+        "last_active_date", "signup_date", "feature_usage_score", "monthly_spend"
+    ).iterator(chunk_size=2000):
+        customer.input_fingerprint = input_fingerprint(
+            customer.last_active_date,
+            customer.signup_date,
+            customer.feature_usage_score,
+            customer.monthly_spend,
+        )
+        batch.append(customer)
+        if len(batch) >= 500:
+            Customer.objects.bulk_update(batch, ["input_fingerprint"])
+            batch = []
+    if batch:
+        Customer.objects.bulk_update(batch, ["input_fingerprint"])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("customers", "0005_job"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="customer",
+            name="input_fingerprint",
+            field=models.CharField(blank=True, default="", max_length=32),
+        ),
+        migrations.AddField(
+            model_name="customer",
+            name="scored_fingerprint",
+            field=models.CharField(blank=True, default="", max_length=32),
+        ),
+        migrations.RunPython(fill_input_fingerprints, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def fill_latest_predictions(apps, schema_editor):
+    Customer = apps.get_model("customers", "Customer")
+    ChurnPrediction = apps.get_model("customers", "ChurnPrediction")
+    Customer.objects.update(
+        latest_prediction=Subquery(
+            ChurnPrediction.objects.filter(customer=OuterRef("pk"))
+            .order_by("-id")
+            .values("id")[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("customers", "0006_customer_input_fingerprint"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="customer",
+            name="latest_prediction",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="customers.churnprediction",
+            ),
+        ),
+        migrations.RunPython(fill_latest_predictions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("accounts", "0001_initial"),
+        ("customers", "0007_customer_latest_prediction"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="churnprediction",
+            index=models.Index(
+                fields=["tenant", "customer", "created_at"],
+                name="churnpred_tenant_cust_created",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="churnprediction",
+            index=models.Index(
+                fields=["tenant", "created_at"], name="churnpred_tenant_created"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="churnprediction",
+            index=models.Index(
+                fields=["tenant", "-risk_score"], name="churnpred_tenant_score"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="churnprediction",
+            index=models.Index(
+                fields=["tenant", "risk_level", "-revenue_at_risk"],
+                name="churnpred_tenant_level_rev",
+            ),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("accounts", "0001_initial"),
+        ("customers", "0008_churnprediction_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="churnprediction",
+            index=models.Index(
+                fields=["tenant", "-revenue_at_risk"], name="churnpred_tenant_revenue"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="churnprediction",
+            index=models.Index(
+                fields=["tenant", "-days_in_risk"], name="churnpred_tenant_days_in_risk"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="customer",
+            index=models.Index(
+                fields=["tenant", "last_active_date"],
+                name="customer_tenant_last_active",
+            ),
+        ),
+    ]
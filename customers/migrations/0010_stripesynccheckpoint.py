@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("accounts", "0001_initial"),
+        ("customers", "0009_pagination_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StripeSyncCheckpoint",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "customers_created_after",
+                    models.BigIntegerField(blank=True, null=True),
+                ),
+                (
+                    "subscriptions_created_after",
+                    models.BigIntegerField(blank=True, null=True),
+                ),
+                ("synced_at", models.DateTimeField(auto_now=True)),
+                (
+                    "tenant",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="stripe_sync_checkpoint",
+                        to="accounts.tenant",
+                    ),
+                ),
+            ],
+        ),
+    ]
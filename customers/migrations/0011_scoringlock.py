@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("accounts", "0002_tenant_data_version"),
+        ("customers", "0010_stripesynccheckpoint"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ScoringLock",
+            fields=[
+                (
+                    "tenant",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="scoring_lock",
+                        serialize=False,
+                        to="accounts.tenant",
+                    ),
+                ),
+                ("owner", models.CharField(max_length=255)),
+                ("acquired_at", models.DateTimeField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("accounts", "0002_tenant_data_version"),
+        ("customers", "0012_chunkedupload"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TenantDailyMetrics",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField()),
+                ("scored_customers", models.IntegerField(default=0)),
+                ("customers_at_risk", models.IntegerField(default=0)),
+                ("revenue_at_risk", models.FloatField(default=0.0)),
+                ("new_risks", models.IntegerField(default=0)),
+                ("resolved_risks", models.IntegerField(default=0)),
+                ("level_low", models.IntegerField(default=0)),
+                ("level_medium", models.IntegerField(default=0)),
+                ("level_high", models.IntegerField(default=0)),
+                ("trend_new", models.IntegerField(default=0)),
+                ("trend_improving", models.IntegerField(default=0)),
+                ("trend_stable", models.IntegerField(default=0)),
+                ("trend_worsening", models.IntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "tenant",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="daily_metrics",
+                        to="accounts.tenant",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("tenant", "date"), name="tenantdailymetrics_tenant_date"
+                    )
+                ],
+            },
+        ),
+    ]
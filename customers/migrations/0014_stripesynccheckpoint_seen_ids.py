@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("customers", "0013_tenantdailymetrics"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="stripesynccheckpoint",
+            name="customers_seen_ids",
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name="stripesynccheckpoint",
+            name="subscriptions_seen_ids",
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:40
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("customers", "0014_stripesynccheckpoint_seen_ids"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="scoringlock",
+            name="heartbeat_at",
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -1,6 +1,9 @@
 from django.db import models
+from django.utils.timezone import now
 from accounts.models import Tenant
 
+from .risk_engine import input_fingerprint
+
 
 class Customer(models.Model):
     """
@@ -27,12 +30,48 @@ class Customer(models.Model):
 
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
+    # Hash of the scoring inputs now, and as of the last scoring run.
+    # They differ when the customer needs rescoring.
+    input_fingerprint = models.CharField(max_length=32, blank=True, default="")
+    scored_fingerprint = models.CharField(max_length=32, blank=True, default="")
+
+    # Denormalized pointer to the newest ChurnPrediction, kept up to date by
+    # scoring so current predictions never need a GROUP BY over history.
+    latest_prediction = models.ForeignKey(
+        "ChurnPrediction",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+
     class Meta:
         unique_together = ("tenant", "external_id")
+        indexes = [
+            models.Index(
+                fields=["tenant", "last_active_date"],
+                name="customer_tenant_last_active",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.external_id} ({self.tenant.name})"
 
+    def refresh_input_fingerprint(self):
+        self.input_fingerprint = input_fingerprint(
+            self.last_active_date,
+            self.signup_date,
+            self.feature_usage_score,
+            self.monthly_spend,
+        )
+
+    def save(self, *args, **kwargs):
+        self.refresh_input_fingerprint()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "input_fingerprint" not in update_fields:
+            kwargs["update_fields"] = [*update_fields, "input_fingerprint"]
+        super().save(*args, **kwargs)
+
 class ChurnPrediction(models.Model):
     customer = models.ForeignKey(
         "Customer",
@@ -65,3 +104,237 @@ class ChurnPrediction(models.Model):
     days_in_risk = models.IntegerField(default=0)
 
     created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Per-customer history (first seen, trend) and last run lookups
+            models.Index(
+                fields=["tenant", "customer", "created_at"],
+                name="churnpred_tenant_cust_created",
+            ),
+            models.Index(
+                fields=["tenant", "created_at"],
+                name="churnpred_tenant_created",
+            ),
+            # Dashboard ordering and high-risk focus list
+            models.Index(
+                fields=["tenant", "-risk_score"],
+                name="churnpred_tenant_score",
+            ),
+            models.Index(
+                fields=["tenant", "risk_level", "-revenue_at_risk"],
+                name="churnpred_tenant_level_rev",
+            ),
+            # Keyset pagination sort keys
+            models.Index(
+                fields=["tenant", "-revenue_at_risk"],
+                name="churnpred_tenant_revenue",
+            ),
+            models.Index(
+                fields=["tenant", "-days_in_risk"],
+                name="churnpred_tenant_days_in_risk",
+            ),
+        ]
+
+
+class Job(models.Model):
+    """
+    Background job (CSV import or churn scoring) run by `manage.py run_worker`.
+    The database is the queue; no external broker is needed.
+    """
+
+    KIND_IMPORT = "import"
+    KIND_SCORING = "scoring"
+    KIND_CHOICES = [
+        (KIND_IMPORT, "Customer import"),
+        (KIND_SCORING, "Churn scoring"),
+    ]
+
+    STATUS_QUEUED = "queued"
+    STATUS_RUNNING = "running"
+    STATUS_SUCCEEDED = "succeeded"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, "Queued"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_SUCCEEDED, "Succeeded"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    tenant = models.ForeignKey(
+        Tenant,
+        on_delete=models.CASCADE,
+        related_name="jobs"
+    )
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default=STATUS_QUEUED,
+    )
+
+    upload = models.FileField(upload_to="imports/", null=True, blank=True)
+
+    message = models.CharField(max_length=255, blank=True, default="")
+    progress_current = models.IntegerField(default=0)
+    progress_total = models.IntegerField(default=0)
+    result = models.JSONField(default=dict, blank=True)
+    error = models.TextField(blank=True, default="")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # Touched by every status and progress update of a running job; a job
+    # whose worker stops updating it is claimed again (see jobs.claim_next_job).
+    heartbeat_at = models.DateTimeField(default=now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "created_at"]),
+        ]
+
+    @property
+    def is_finished(self):
+        return self.status in (self.STATUS_SUCCEEDED, self.STATUS_FAILED)
+
+    def __str__(self):
+        return f"{self.get_kind_display()} #{self.pk} ({self.status})"
+
+
+class ChunkedUpload(models.Model):
+    """
+    A customer file uploaded in parts (see customers.chunked_uploads).
+    Parts are appended to `file` on disk; received_bytes is the offset the
+    next part must start at, so an interrupted upload resumes from there.
+    Completing the upload hands the file to an import Job.
+    """
+
+    STATUS_UPLOADING = "uploading"
+    STATUS_COMPLETE = "complete"
+    STATUS_CHOICES = [
+        (STATUS_UPLOADING, "Uploading"),
+        (STATUS_COMPLETE, "Complete"),
+    ]
+
+    tenant = models.ForeignKey(
+        Tenant,
+        on_delete=models.CASCADE,
+        related_name="chunked_uploads"
+    )
+
+    filename = models.CharField(max_length=255)
+    file = models.FileField(upload_to="chunked/", blank=True)
+    total_size = models.BigIntegerField(null=True, blank=True)
+    received_bytes = models.BigIntegerField(default=0)
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default=STATUS_UPLOADING,
+    )
+    job = models.ForeignKey(
+        Job,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Chunked upload #{self.pk} ({self.filename}, {self.status})"
+
+
+class StripeSyncCheckpoint(models.Model):
+    """
+    Per-tenant cursors for incremental Stripe syncs: the newest `created`
+    timestamp already fetched for each listing, and the ids fetched at that
+    timestamp (the next sync lists from the same second and skips them).
+    """
+
+    tenant = models.OneToOneField(
+        Tenant,
+        on_delete=models.CASCADE,
+        related_name="stripe_sync_checkpoint"
+    )
+
+    customers_created_after = models.BigIntegerField(null=True, blank=True)
+    subscriptions_created_after = models.BigIntegerField(null=True, blank=True)
+    customers_seen_ids = models.JSONField(default=list, blank=True)
+    subscriptions_seen_ids = models.JSONField(default=list, blank=True)
+
+    synced_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Stripe sync checkpoint ({self.tenant.name})"
+
+
+class ScoringLock(models.Model):
+    """
+    Held while a tenant is being scored, so overlapping runs never score
+    the same tenant at once (see customers.scoring_locks). The holder
+    refreshes heartbeat_at while it runs.
+    """
+
+    tenant = models.OneToOneField(
+        Tenant,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="scoring_lock"
+    )
+
+    owner = models.CharField(max_length=255)
+    acquired_at = models.DateTimeField()
+    heartbeat_at = models.DateTimeField(default=now)
+
+    def __str__(self):
+        return f"Scoring lock ({self.tenant.name}, {self.owner})"
+
+
+class TenantDailyMetrics(models.Model):
+    """
+    One row per tenant per day, refreshed by every scoring run, so the home
+    dashboard reads a few small rows instead of prediction history.
+    Level/trend counts and revenue are a snapshot of the current
+    predictions after the day's last run; new and resolved risks add up
+    over the day's runs.
+    """
+
+    tenant = models.ForeignKey(
+        Tenant,
+        on_delete=models.CASCADE,
+        related_name="daily_metrics"
+    )
+    date = models.DateField()
+
+    scored_customers = models.IntegerField(default=0)
+    customers_at_risk = models.IntegerField(default=0)
+    revenue_at_risk = models.FloatField(default=0.0)
+
+    # Customers who entered (new) or left (resolved) medium/high risk.
+    new_risks = models.IntegerField(default=0)
+    resolved_risks = models.IntegerField(default=0)
+
+    level_low = models.IntegerField(default=0)
+    level_medium = models.IntegerField(default=0)
+    level_high = models.IntegerField(default=0)
+
+    trend_new = models.IntegerField(default=0)
+    trend_improving = models.IntegerField(default=0)
+    trend_stable = models.IntegerField(default=0)
+    trend_worsening = models.IntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["tenant", "date"],
+                name="tenantdailymetrics_tenant_date",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.tenant.name} metrics for {self.date}"
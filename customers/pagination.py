@@ -0,0 +1,228 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import F, Q
+
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+class KeysetPage:
+    """
+    One page of a keyset-paginated queryset plus the links to move around.
+    """
+
+    def __init__(self, items, sort, direction, page_size, next_url=None, prev_url=None, first_url=None, sort_urls=None):
+        self.items = items
+        self.sort = sort
+        self.direction = direction
+        self.page_size = page_size
+        self.next_url = next_url
+        self.prev_url = prev_url
+        self.first_url = first_url
+        self.sort_urls = sort_urls or {}
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def encode_cursor(value, pk, backwards=False):
+    if hasattr(value, "isoformat"):
+        value = value.isoformat()
+    raw = json.dumps({"v": value, "pk": pk, "b": backwards})
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor):
+    """
+    Returns: (value, pk, backwards) or None for a missing/invalid cursor.
+    """
+    if not cursor:
+        return None
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return data["v"], int(data["pk"]), bool(data["b"])
+    except (binascii.Error, ValueError, KeyError, TypeError, UnicodeError):
+        return None
+
+
+def _ordering(field, descending, nulls_last):
+    column = F(field).desc if descending else F(field).asc
+    nulls = {"nulls_last": True} if nulls_last else {"nulls_first": True}
+    return [column(**nulls), "-pk" if descending else "pk"]
+
+
+def _after(field, value, pk, descending, nulls_last):
+    """
+    Rows strictly after (value, pk) in the given ordering.
+    """
+    op = "lt" if descending else "gt"
+    pk_after = Q(**{f"pk__{op}": pk})
+
+    if value is None:
+        after = Q(**{f"{field}__isnull": True}) & pk_after
+        if not nulls_last:
+            after |= Q(**{f"{field}__isnull": False})
+        return after
+
+    after = Q(**{f"{field}__{op}": value}) | (Q(**{field: value}) & pk_after)
+    if nulls_last:
+        after |= Q(**{f"{field}__isnull": True})
+    return after
+
+
+def _checked_cursor(queryset, decoded):
+    """
+    The decoded cursor with its value converted to the sort field's type,
+    or None (first page) if the value doesn't fit, e.g. a tampered cursor
+    or one from another sort.
+    """
+    if decoded is None or decoded[0] is None:
+        return decoded
+    field = queryset.query.annotations["keyset_value"].output_field
+    value, pk, backwards = decoded
+    try:
+        return field.to_python(value), pk, backwards
+    except (ValidationError, ValueError, TypeError):
+        return None
+
+
+def _keyset_queryset(queryset, field, descending, decoded):
+    """
+    The slice of queryset that holds the page after the decoded cursor
+    (one extra row tells whether there are more).
+    Returns: (queryset, decoded cursor as used)
+    """
+    queryset = queryset.annotate(keyset_value=F(field))
+    decoded = _checked_cursor(queryset, decoded)
+    backwards = bool(decoded and decoded[2])
+
+    # Walking backwards is walking forwards in the reversed ordering.
+    walk_descending = descending != backwards
+    walk_nulls_last = not backwards
+
+    queryset = queryset.order_by(*_ordering(field, walk_descending, walk_nulls_last))
+    if decoded:
+        value, pk, _ = decoded
+        queryset = queryset.filter(_after(field, value, pk, walk_descending, walk_nulls_last))
+    return queryset, decoded
+
+
+def keyset_paginate(queryset, field, descending=True, cursor=None, page_size=DEFAULT_PAGE_SIZE):
+    """
+    Fetch one page of queryset ordered by (field, pk) using a keyset
+    cursor instead of OFFSET, so every page costs the same.
+    NULL sort values always come last.
+    Returns: (items, next_cursor, prev_cursor)
+    """
+    queryset, decoded = _keyset_queryset(queryset, field, descending, decode_cursor(cursor))
+    return _keyset_result(list(queryset[:page_size + 1]), page_size, decoded)
+
+
+async def akeyset_paginate(queryset, field, descending=True, cursor=None, page_size=DEFAULT_PAGE_SIZE):
+    """
+    Async version of keyset_paginate().
+    """
+    queryset, decoded = _keyset_queryset(queryset, field, descending, decode_cursor(cursor))
+    items = [item async for item in queryset[:page_size + 1]]
+    return _keyset_result(items, page_size, decoded)
+
+
+def _keyset_result(items, page_size, decoded):
+    backwards = bool(decoded and decoded[2])
+    has_more = len(items) > page_size
+    items = items[:page_size]
+    if backwards:
+        items.reverse()
+
+    if not items:
+        return items, None, None
+
+    first, last = items[0], items[-1]
+    has_next = has_more if not backwards else True
+    has_prev = has_more if backwards else decoded is not None
+
+    next_cursor = encode_cursor(last.keyset_value, last.pk) if has_next else None
+    prev_cursor = encode_cursor(first.keyset_value, first.pk, backwards=True) if has_prev else None
+    return items, next_cursor, prev_cursor
+
+
+def paginate_request(request, queryset, sorts, default_sort, default_direction="desc"):
+    """
+    Keyset-paginate queryset from the request's sort, dir, cursor and
+    page_size query parameters. sorts maps the public sort names to
+    model field paths.
+    """
+    sort, direction, page_size = _page_params(request, sorts, default_sort, default_direction)
+    items, next_cursor, prev_cursor = keyset_paginate(
+        queryset,
+        sorts[sort],
+        descending=direction == "desc",
+        cursor=request.GET.get("cursor"),
+        page_size=page_size,
+    )
+    return _keyset_page(request, sorts, sort, direction, page_size, items, next_cursor, prev_cursor)
+
+
+async def apaginate_request(request, queryset, sorts, default_sort, default_direction="desc"):
+    """
+    Async version of paginate_request().
+    """
+    sort, direction, page_size = _page_params(request, sorts, default_sort, default_direction)
+    items, next_cursor, prev_cursor = await akeyset_paginate(
+        queryset,
+        sorts[sort],
+        descending=direction == "desc",
+        cursor=request.GET.get("cursor"),
+        page_size=page_size,
+    )
+    return _keyset_page(request, sorts, sort, direction, page_size, items, next_cursor, prev_cursor)
+
+
+def _page_params(request, sorts, default_sort, default_direction):
+    sort = request.GET.get("sort")
+    if sort not in sorts:
+        sort = default_sort
+
+    direction = request.GET.get("dir")
+    if direction not in ("asc", "desc"):
+        direction = default_direction
+
+    try:
+        page_size = int(request.GET.get("page_size", DEFAULT_PAGE_SIZE))
+    except ValueError:
+        page_size = DEFAULT_PAGE_SIZE
+    page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+    return sort, direction, page_size
+
+
+def _keyset_page(request, sorts, sort, direction, page_size, items, next_cursor, prev_cursor):
+    def url(**params):
+        query = request.GET.copy()
+        query.pop("cursor", None)
+        query.update({"sort": sort, "dir": direction, "page_size": page_size})
+        for key, value in params.items():
+            query[key] = value
+        return "?" + query.urlencode()
+
+    sort_urls = {}
+    for name in sorts:
+        flipped = "asc" if direction == "desc" else "desc"
+        sort_urls[name] = url(sort=name, dir=flipped if name == sort else "desc")
+
+    return KeysetPage(
+        items,
+        sort,
+        direction,
+        page_size,
+        next_url=url(cursor=next_cursor) if next_cursor else None,
+        prev_url=url(cursor=prev_cursor) if prev_cursor else None,
+        first_url=url() if prev_cursor else None,
+        sort_urls=sort_urls,
+    )
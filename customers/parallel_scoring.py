@@ -0,0 +1,107 @@
+"""
+Scoring every tenant at once (`manage.py score_all_tenants`).
+
+Tenants are sharded across a process pool, largest first so the long runs
+start early and the small ones fill in the gaps. Like every scoring run,
+each tenant is scored under its ScoringLock (see scoring_locks); tenants
+that another run is scoring are skipped instead of waited for.
+"""
+import os
+import time
+from datetime import timedelta
+
+import django
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.db import connections
+from django.db.models import Count
+
+from accounts.models import Tenant
+from .scoring import generate_churn_predictions
+from .scoring_locks import STALE_LOCK_AFTER, ScoringLockHeld
+
+
+def tenants_largest_first(slugs=None):
+    """
+    (id, slug, customer count) for every tenant, most customers first.
+    """
+    tenants = Tenant.objects.all()
+    if slugs:
+        tenants = tenants.filter(slug__in=slugs)
+    return list(
+        tenants
+        .annotate(customer_count=Count("customers"))
+        .order_by("-customer_count", "pk")
+        .values_list("pk", "slug", "customer_count")
+    )
+
+
+def score_tenant(tenant_id, engine=None, incremental=False, stale_after=STALE_LOCK_AFTER):
+    """
+    Score one tenant under its lock. Runs in a pool worker, so it takes and
+    returns plain values.
+    Returns: dict with tenant_id, status (scored, locked or failed),
+    predictions, seconds and error.
+    """
+    result = {"tenant_id": tenant_id, "status": "locked", "predictions": 0, "seconds": 0.0, "error": ""}
+    start = time.perf_counter()
+    try:
+        tenant = Tenant.objects.get(pk=tenant_id)
+        result["predictions"] = generate_churn_predictions(
+            tenant,
+            incremental=incremental,
+            engine=engine,
+            lock_wait=timedelta(0),
+            lock_stale_after=stale_after,
+        )
+        result["status"] = "scored"
+    except ScoringLockHeld:
+        pass
+    except Exception as exc:
+        result["status"] = "failed"
+        result["error"] = str(exc) or exc.__class__.__name__
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def init_worker():
+    # Needed when workers are spawned rather than forked.
+    django.setup()
+
+
+def score_all_tenants(workers=None, engine=None, incremental=False, slugs=None, stale_after=STALE_LOCK_AFTER, on_result=None):
+    """
+    Score every tenant (or the given slugs) across a pool of worker
+    processes; workers=1 scores in this process.
+    on_result, if given, is called with each result as it finishes.
+    Returns the results, one per tenant, largest tenant first.
+    """
+    tenants = tenants_largest_first(slugs)
+    details = {pk: (slug, count) for pk, slug, count in tenants}
+    results = {}
+
+    def record(result):
+        slug, count = details[result["tenant_id"]]
+        result.update(slug=slug, customers=count)
+        results[result["tenant_id"]] = result
+        if on_result:
+            on_result(result)
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for pk, _, _ in tenants:
+            record(score_tenant(pk, engine, incremental, stale_after))
+    else:
+        # Forked workers must not share the parent's database connections.
+        connections.close_all()
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(tenants) or 1), initializer=init_worker
+        ) as pool:
+            futures = [
+                pool.submit(score_tenant, pk, engine, incremental, stale_after)
+                for pk, _, _ in tenants
+            ]
+            for future in as_completed(futures):
+                record(future.result())
+
+    return [results[pk] for pk, _, _ in tenants]
@@ -0,0 +1,20 @@
+"""
+Queries over the stored ChurnPrediction history, shared by scoring,
+daily metrics and the views.
+"""
+from .models import ChurnPrediction, Customer
+
+
+def current_predictions(tenant):
+    """
+    Each customer's latest ChurnPrediction, found through the
+    Customer.latest_prediction pointer instead of scanning history.
+    """
+    return ChurnPrediction.objects.filter(
+        tenant=tenant,
+        id__in=(
+            Customer.objects
+            .filter(tenant=tenant, latest_prediction__isnull=False)
+            .values("latest_prediction_id")
+        ),
+    )
@@ -1,3 +1,26 @@
+import numpy as np
+
+from .risk_engine import REASON_CODES, REASON_VERY_LOW_USAGE
+
+
+ACTION_OUTREACH = "Offer personal outreach or onboarding call"
+ACTION_EDUCATION = "Send feature education email"
+ACTION_DISCOUNT = "Offer retention discount"
+ACTION_UPGRADE = "Encourage upgrade with limited-time offer"
+ACTION_REMINDER = "Send engagement reminder"
+ACTION_NONE = "No action needed"
+
+# Index order of the action codes returned by recommend_actions_batch().
+ACTION_CODES = (
+    ACTION_NONE,
+    ACTION_OUTREACH,
+    ACTION_EDUCATION,
+    ACTION_DISCOUNT,
+    ACTION_UPGRADE,
+    ACTION_REMINDER,
+)
+
+
 def recommend_action(customer, risk_level, reasons):
     """
     Simple rule-based recommendation engine.
@@ -6,14 +29,37 @@ def recommend_action(customer, risk_level, reasons):
 
     if risk_level == "high":
         if customer.monthly_spend and customer.monthly_spend > 50:
-            return "Offer personal outreach or onboarding call"
-        if "Very low feature usage" in reasons:
-            return "Send feature education email"
-        return "Offer retention discount"
+            return ACTION_OUTREACH
+        if REASON_VERY_LOW_USAGE in reasons:
+            return ACTION_EDUCATION
+        return ACTION_DISCOUNT
 
     if risk_level == "medium":
         if customer.monthly_spend == 0:
-            return "Encourage upgrade with limited-time offer"
-        return "Send engagement reminder"
+            return ACTION_UPGRADE
+        return ACTION_REMINDER
+
+    return ACTION_NONE
+
+
+def recommend_actions_batch(level_codes, reason_masks, monthly_spends):
+    """
+    Batch version of recommend_action() over the output of
+    calculate_churn_risk_batch(). monthly_spends is a float array with NaN
+    for missing values. Returns indexes into ACTION_CODES.
+    """
+    high = level_codes == 2
+    medium = level_codes == 1
+    very_low_usage = (reason_masks >> REASON_CODES.index(REASON_VERY_LOW_USAGE) & 1).astype(bool)
 
-    return "No action needed"
+    return np.select(
+        [
+            high & (monthly_spends > 50),
+            high & very_low_usage,
+            high,
+            medium & (monthly_spends == 0),
+            medium,
+        ],
+        [1, 2, 3, 4, 5],
+        default=0,
+    )
@@ -0,0 +1,120 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.timezone import now
+
+from .caching import bump_data_version
+from .models import Customer, ChurnPrediction
+
+
+GRANULARITY_DAILY = "daily"
+GRANULARITY_WEEKLY = "weekly"
+GRANULARITIES = (GRANULARITY_DAILY, GRANULARITY_WEEKLY)
+
+CUSTOMER_CHUNK_SIZE = 500
+
+
+def retention_settings():
+    """
+    settings.CHURN_PREDICTION_RETENTION, the only place the retention
+    defaults are defined.
+    """
+    return dict(settings.CHURN_PREDICTION_RETENTION)
+
+
+def snapshot_bucket(created_at, granularity):
+    if granularity == GRANULARITY_DAILY:
+        return created_at.date()
+    year, week, _ = created_at.isocalendar()
+    return year, week
+
+
+def rows_to_delete(rows, granularity, keep_ids):
+    """
+    Pick the rows to drop from one customer's history older than the
+    cutoff, given as (id, created_at) ordered oldest first.
+
+    The last row of every daily/weekly bucket is kept as its snapshot.
+    The customer's first row is always kept so days_in_risk (based on the
+    first-seen timestamp) does not change, as is anything in keep_ids
+    (latest predictions, which trend calculation compares against).
+    """
+    doomed = []
+    for index, (prediction_id, created_at) in enumerate(rows):
+        if index == 0 or prediction_id in keep_ids:
+            continue
+        is_last_in_bucket = (
+            index + 1 == len(rows)
+            or snapshot_bucket(rows[index + 1][1], granularity)
+            != snapshot_bucket(created_at, granularity)
+        )
+        if not is_last_in_bucket:
+            doomed.append(prediction_id)
+    return doomed
+
+
+def prune_prediction_history(tenant, detail_days=None, granularity=None, batch_size=None, dry_run=False):
+    """
+    Keep full-detail predictions for detail_days and roll older history
+    up into one snapshot row per customer per day or week, deleting the
+    rest in batches. Works through the tenant's customers in chunks so
+    memory stays bounded.
+    Returns: dict with scanned and deleted counts.
+    """
+    options = retention_settings()
+    detail_days = options["DETAIL_DAYS"] if detail_days is None else detail_days
+    granularity = granularity or options["ROLLUP"]
+    batch_size = batch_size or options["BATCH_SIZE"]
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Unknown rollup granularity: {granularity}")
+
+    cutoff = now() - timedelta(days=detail_days)
+    report = {"scanned": 0, "deleted": 0}
+    pending = []
+
+    def delete_batch(batch):
+        if not dry_run:
+            with transaction.atomic():
+                ChurnPrediction.objects.filter(pk__in=batch).delete()
+                bump_data_version(tenant)
+        report["deleted"] += len(batch)
+
+    customers = Customer.objects.filter(tenant=tenant).order_by("pk")
+    last_customer_id = 0
+    while True:
+        chunk = list(
+            customers
+            .filter(pk__gt=last_customer_id)
+            .values_list("pk", "latest_prediction_id")[:CUSTOMER_CHUNK_SIZE]
+        )
+        if not chunk:
+            break
+        last_customer_id = chunk[-1][0]
+        keep_ids = {latest_id for _, latest_id in chunk if latest_id}
+
+        history = {}
+        old_rows = (
+            ChurnPrediction.objects
+            .filter(
+                tenant=tenant,
+                customer_id__in=[customer_id for customer_id, _ in chunk],
+                created_at__lt=cutoff,
+            )
+            .order_by("customer_id", "created_at", "id")
+            .values_list("customer_id", "id", "created_at")
+        )
+        for customer_id, prediction_id, created_at in old_rows:
+            history.setdefault(customer_id, []).append((prediction_id, created_at))
+            report["scanned"] += 1
+
+        for rows in history.values():
+            pending.extend(rows_to_delete(rows, granularity, keep_ids))
+            while len(pending) >= batch_size:
+                delete_batch(pending[:batch_size])
+                del pending[:batch_size]
+
+    if pending:
+        delete_batch(pending)
+
+    return report
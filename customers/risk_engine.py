@@ -1,9 +1,40 @@
+import hashlib
 from datetime import date
 
+import numpy as np
+
+
+REASON_INACTIVE_30 = "Inactive for more than 30 days"
+REASON_INACTIVE_14 = "Inactive for more than 14 days"
+REASON_VERY_LOW_USAGE = "Very low feature usage"
+REASON_LOW_USAGE = "Low feature usage"
+REASON_FREE_PLAN = "Free plan user"
+REASON_NEW_USER = "New user with early drop-off risk"
+
+# Bit positions of the reason codes used by the batch engine, in the
+# order the rules append them to the reasons list.
+REASON_CODES = (
+    REASON_INACTIVE_30,
+    REASON_INACTIVE_14,
+    REASON_VERY_LOW_USAGE,
+    REASON_LOW_USAGE,
+    REASON_FREE_PLAN,
+    REASON_NEW_USER,
+)
+
+RISK_LEVELS = ("low", "medium", "high")
+
+MISSING_DAYS = 999
+
+# Date-based rule thresholds. A customer's score can change without any
+# input changing when one of these is crossed (see scoring.customers_to_rescore).
+INACTIVITY_THRESHOLDS = (30, 14)
+NEW_USER_DAYS = 7
+
 
 def days_since(d):
     if not d:
-        return 999
+        return MISSING_DAYS
     return (date.today() - d).days
 
 
@@ -18,31 +49,31 @@ def calculate_churn_risk(customer):
 
     # 1. Inactivity
     inactivity_days = days_since(customer.last_active_date)
-    if inactivity_days > 30:
+    if inactivity_days > INACTIVITY_THRESHOLDS[0]:
         score += 0.5
-        reasons.append("Inactive for more than 30 days")
-    elif inactivity_days > 14:
+        reasons.append(REASON_INACTIVE_30)
+    elif inactivity_days > INACTIVITY_THRESHOLDS[1]:
         score += 0.3
-        reasons.append("Inactive for more than 14 days")
+        reasons.append(REASON_INACTIVE_14)
 
     # 2. Low feature usage
     if customer.feature_usage_score is not None:
         if customer.feature_usage_score < 20:
             score += 0.3
-            reasons.append("Very low feature usage")
+            reasons.append(REASON_VERY_LOW_USAGE)
         elif customer.feature_usage_score < 40:
             score += 0.15
-            reasons.append("Low feature usage")
+            reasons.append(REASON_LOW_USAGE)
 
     # 3. Free or low-paying plan
     if customer.monthly_spend is not None and customer.monthly_spend == 0:
         score += 0.2
-        reasons.append("Free plan user")
+        reasons.append(REASON_FREE_PLAN)
 
     # 4. Very new user (early churn risk)
-    if days_since(customer.signup_date) < 7:
+    if days_since(customer.signup_date) < NEW_USER_DAYS:
         score += 0.1
-        reasons.append("New user with early drop-off risk")
+        reasons.append(REASON_NEW_USER)
 
     # Cap score
     score = min(score, 1.0)
@@ -56,3 +87,100 @@ def calculate_churn_risk(customer):
         level = "low"
 
     return score, level, reasons
+
+
+def days_since_array(dates, today=None):
+    """
+    Vectorized days_since() for a sequence of dates (None allowed).
+    """
+    today = today or date.today()
+    ordinals = np.fromiter(
+        (d.toordinal() if d else -1 for d in dates),
+        dtype=np.int64,
+        count=len(dates),
+    )
+    return np.where(ordinals < 0, MISSING_DAYS, today.toordinal() - ordinals)
+
+
+def float_array(values):
+    """
+    Float64 array where None becomes NaN, so every comparison on it is False.
+    """
+    return np.fromiter(
+        (np.nan if v is None else v for v in values),
+        dtype=np.float64,
+        count=len(values),
+    )
+
+
+def calculate_churn_risk_batch(last_active_dates, signup_dates, feature_usage_scores, monthly_spends, today=None):
+    """
+    Batch version of calculate_churn_risk() over whole columns.
+
+    Takes parallel sequences of the scoring inputs and returns NumPy arrays
+    (scores, level_codes, reason_masks). level_codes index into RISK_LEVELS,
+    reason_masks are bitmasks over REASON_CODES (see reasons_from_mask).
+    The rules are applied in the same order as the per-customer engine so
+    the float scores are bit-for-bit identical.
+    """
+    inactivity_days = days_since_array(last_active_dates, today)
+    tenure_days = days_since_array(signup_dates, today)
+    usage = float_array(feature_usage_scores)
+    spend = float_array(monthly_spends)
+
+    score = np.zeros(len(inactivity_days), dtype=np.float64)
+    masks = np.zeros(len(inactivity_days), dtype=np.int64)
+
+    # 1. Inactivity
+    inactive_30 = inactivity_days > INACTIVITY_THRESHOLDS[0]
+    inactive_14 = ~inactive_30 & (inactivity_days > INACTIVITY_THRESHOLDS[1])
+    score[inactive_30] += 0.5
+    score[inactive_14] += 0.3
+    masks |= inactive_30 << 0
+    masks |= inactive_14 << 1
+
+    # 2. Low feature usage (NaN compares False, like the None check)
+    very_low_usage = usage < 20
+    low_usage = ~very_low_usage & (usage < 40)
+    score[very_low_usage] += 0.3
+    score[low_usage] += 0.15
+    masks |= very_low_usage << 2
+    masks |= low_usage << 3
+
+    # 3. Free or low-paying plan
+    free_plan = spend == 0
+    score[free_plan] += 0.2
+    masks |= free_plan << 4
+
+    # 4. Very new user (early churn risk)
+    new_user = tenure_days < NEW_USER_DAYS
+    score[new_user] += 0.1
+    masks |= new_user << 5
+
+    # Cap score
+    score = np.minimum(score, 1.0)
+
+    # Risk level
+    levels = np.select([score >= 0.7, score >= 0.4], [2, 1], default=0)
+
+    return score, levels, masks
+
+
+def reasons_from_mask(mask):
+    """
+    Expand a reason bitmask from calculate_churn_risk_batch() into the
+    same reasons list calculate_churn_risk() returns.
+    """
+    return [reason for bit, reason in enumerate(REASON_CODES) if mask >> bit & 1]
+
+
+def input_fingerprint(last_active_date, signup_date, feature_usage_score, monthly_spend):
+    """
+    Stable hash of the scoring inputs. It changes exactly when a value
+    the rules read changes, so unchanged customers can skip rescoring.
+    """
+    raw = "|".join(
+        repr(value)
+        for value in (last_active_date, signup_date, feature_usage_score, monthly_spend)
+    )
+    return hashlib.md5(raw.encode("utf-8")).hexdigest()
@@ -0,0 +1,241 @@
+from datetime import date, timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import DateField, ExpressionWrapper, F, Min, OuterRef, Q, Subquery
+from django.db.models.functions import TruncDate
+
+from .caching import bump_data_version
+from .daily_metrics import count_risk_transitions, record_daily_metrics
+from .models import Customer, ChurnPrediction
+from .scoring_locks import SCORING_LOCK_WAIT, STALE_LOCK_AFTER, scoring_lock
+from .risk_engine import (
+    INACTIVITY_THRESHOLDS,
+    NEW_USER_DAYS,
+    RISK_LEVELS,
+    calculate_churn_risk_batch,
+    float_array,
+    reasons_from_mask,
+)
+from .recommendations import ACTION_CODES, recommend_actions_batch
+from .trends import analyze_trend, calculate_days_in_risk
+
+
+BULK_CREATE_BATCH_SIZE = 1000
+
+SCORING_COLUMNS = (
+    "id",
+    "last_active_date",
+    "signup_date",
+    "feature_usage_score",
+    "monthly_spend",
+)
+
+
+def score_customers(customers, today=None):
+    """
+    Score a Customer queryset in one vectorized pass.
+
+    Only the scoring columns are loaded. Returns a list of dicts with
+    customer_id, risk_score, risk_level, reasons, revenue_at_risk and
+    recommended_action, in queryset order.
+    """
+    rows = list(customers.values_list(*SCORING_COLUMNS))
+    if not rows:
+        return []
+
+    ids, last_active_dates, signup_dates, usage_scores, spends = zip(*rows)
+    today = today or date.today()
+
+    scores, levels, masks = calculate_churn_risk_batch(
+        last_active_dates, signup_dates, usage_scores, spends, today=today
+    )
+    spend_array = float_array(spends)
+    revenue = scores * np.nan_to_num(spend_array, nan=0.0)
+    actions = recommend_actions_batch(levels, masks, spend_array)
+
+    reasons_cache = {}
+    results = []
+    for i, customer_id in enumerate(ids):
+        mask = int(masks[i])
+        if mask not in reasons_cache:
+            reasons_cache[mask] = reasons_from_mask(mask)
+        results.append(
+            {
+                "customer_id": customer_id,
+                "risk_score": float(scores[i]),
+                "risk_level": RISK_LEVELS[levels[i]],
+                "reasons": list(reasons_cache[mask]),
+                "revenue_at_risk": float(revenue[i]),
+                "recommended_action": ACTION_CODES[actions[i]],
+            }
+        )
+
+    return results
+
+
+def customers_to_rescore(tenant, today=None):
+    """
+    Customers whose score may differ from their latest prediction: those
+    never scored, those with changed inputs (fingerprint mismatch) and
+    those for whom a date-based rule threshold was crossed since the day of
+    their own latest prediction.
+    """
+    today = today or date.today()
+    customers = (
+        Customer.objects
+        .filter(tenant=tenant)
+        .alias(scored_on=TruncDate("latest_prediction__created_at"))
+    )
+
+    def days_before_scoring(days):
+        return ExpressionWrapper(F("scored_on") - timedelta(days=days), output_field=DateField())
+
+    changed = Q(latest_prediction__isnull=True) | ~Q(input_fingerprint=F("scored_fingerprint"))
+
+    # Inactivity went from <= N days when last scored to > N days today.
+    for threshold in INACTIVITY_THRESHOLDS:
+        changed |= Q(
+            last_active_date__gte=days_before_scoring(threshold),
+            last_active_date__lt=today - timedelta(days=threshold),
+        )
+
+    # Tenure went from < NEW_USER_DAYS when last scored to >= today.
+    changed |= Q(
+        signup_date__gt=days_before_scoring(NEW_USER_DAYS),
+        signup_date__lte=today - timedelta(days=NEW_USER_DAYS),
+    )
+
+    return customers.filter(changed)
+
+
+def load_prediction_history(tenant, customers=None):
+    """
+    Previous score and first-seen timestamp for every scored customer of
+    the tenant (or of the given Customer queryset), in two set-based queries.
+    Returns: (prev_scores, first_seen) dicts keyed by customer_id.
+    """
+    if customers is None:
+        customers = Customer.objects.filter(tenant=tenant)
+
+    prev_scores = dict(
+        customers
+        .filter(latest_prediction__isnull=False)
+        .values_list("id", "latest_prediction__risk_score")
+    )
+
+    first_seen = dict(
+        ChurnPrediction.objects
+        .filter(tenant=tenant, customer__in=customers.values("id"))
+        .values("customer_id")
+        .annotate(first_seen=Min("created_at"))
+        .values_list("customer_id", "first_seen")
+    )
+
+    return prev_scores, first_seen
+
+
+def generate_churn_predictions(
+    tenant,
+    progress=None,
+    incremental=False,
+    customer_ids=None,
+    engine=None,
+    lock_wait=SCORING_LOCK_WAIT,
+    lock_stale_after=STALE_LOCK_AFTER,
+):
+    """
+    Score every customer of the tenant and store a new ChurnPrediction each.
+    With incremental=True only customers_to_rescore() are scored, and with
+    customer_ids only those customers; everyone else keeps their latest
+    prediction.
+    progress, if given, is called with (done, total) after every chunk,
+    outside any transaction the engine opens.
+    engine is "python" or "sql" (see sql_scoring), defaulting to
+    settings.CHURN_SCORING_ENGINE.
+    The run holds the tenant's scoring lock, waiting up to lock_wait for
+    another run to finish (ScoringLockHeld if it doesn't).
+    Returns the number of predictions written.
+    """
+    engine = engine or getattr(settings, "CHURN_SCORING_ENGINE", "python")
+    if engine not in ("python", "sql"):
+        raise ValueError(f"Unknown scoring engine: {engine}")
+
+    with scoring_lock(tenant.pk, wait=lock_wait, stale_after=lock_stale_after):
+        if engine == "sql":
+            from .sql_scoring import generate_churn_predictions_sql
+
+            return generate_churn_predictions_sql(
+                tenant, progress=progress, incremental=incremental, customer_ids=customer_ids
+            )
+        return generate_churn_predictions_python(
+            tenant, progress=progress, incremental=incremental, customer_ids=customer_ids
+        )
+
+
+def generate_churn_predictions_python(tenant, progress=None, incremental=False, customer_ids=None):
+    """
+    The Python (NumPy) scoring engine. Callers hold the tenant's scoring lock.
+    """
+    today = date.today()
+    if incremental:
+        customers = customers_to_rescore(tenant, today=today)
+    else:
+        customers = Customer.objects.filter(tenant=tenant)
+    if customer_ids is not None:
+        customers = customers.filter(pk__in=customer_ids)
+    prev_scores, first_seen = load_prediction_history(tenant, customers)
+    results = score_customers(customers, today=today)
+    if progress:
+        progress(0, len(results))
+
+    new_risks = resolved_risks = 0
+    for start in range(0, len(results), BULK_CREATE_BATCH_SIZE):
+        # Each chunk commits on its own, so progress is visible to the job
+        # status page (and a failed run keeps the chunks already scored).
+        with transaction.atomic():
+            predictions = []
+            for result in results[start:start + BULK_CREATE_BATCH_SIZE]:
+                customer_id = result["customer_id"]
+
+                trend, early_warning = analyze_trend(
+                    prev_scores.get(customer_id), result["risk_score"]
+                )
+                days_in_risk = calculate_days_in_risk(first_seen.get(customer_id))
+
+                predictions.append(
+                    ChurnPrediction(
+                        tenant=tenant,
+                        risk_trend=trend,
+                        early_warning=early_warning,
+                        days_in_risk=days_in_risk,
+                        **result,
+                    )
+                )
+
+            ChurnPrediction.objects.bulk_create(predictions)
+            scored = Customer.objects.filter(pk__in=[p.customer_id for p in predictions])
+            new, resolved = count_risk_transitions(scored)
+            new_risks += new
+            resolved_risks += resolved
+            (
+                scored
+                .update(
+                    scored_fingerprint=F("input_fingerprint"),
+                    latest_prediction=Subquery(
+                        ChurnPrediction.objects
+                        .filter(customer=OuterRef("pk"))
+                        .order_by("-id")
+                        .values("id")[:1]
+                    ),
+                )
+            )
+        if progress:
+            progress(start + len(predictions), len(results))
+
+    with transaction.atomic():
+        record_daily_metrics(tenant, new_risks, resolved_risks)
+        bump_data_version(tenant)
+
+    return len(results)
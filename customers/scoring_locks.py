@@ -0,0 +1,136 @@
+"""
+Per-tenant scoring locks (ScoringLock rows).
+
+Every scoring run takes its tenant's lock (see
+scoring.generate_churn_predictions), so job workers, import and Stripe
+rescoring and `manage.py score_all_tenants` never score the same tenant at
+once. While a run holds the lock, a background thread refreshes its
+heartbeat every LOCK_HEARTBEAT_INTERVAL, whatever staleness threshold the
+run itself was given; a lock whose heartbeat is older than a caller's
+stale_after (at least MIN_STALE_LOCK_AFTER) belongs to a crashed run and
+may be taken over.
+"""
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.db import IntegrityError, connections, transaction
+from django.utils.timezone import now
+
+from .models import ScoringLock
+
+
+logger = logging.getLogger(__name__)
+
+STALE_LOCK_AFTER = timedelta(hours=1)
+
+# Fixed, so every holder beats often enough for any caller's stale_after.
+LOCK_HEARTBEAT_INTERVAL = timedelta(seconds=30)
+MIN_STALE_LOCK_AFTER = timedelta(minutes=5)
+
+# How long a scoring run waits for another run of the same tenant.
+SCORING_LOCK_WAIT = timedelta(minutes=10)
+
+LOCK_POLL_SECONDS = 1.0
+
+
+class ScoringLockHeld(Exception):
+    """
+    Raised when a tenant's scoring lock couldn't be taken in time.
+    """
+
+
+def acquire_scoring_lock(tenant_id, owner, stale_after=STALE_LOCK_AFTER):
+    """
+    Take the tenant's scoring lock. A lock without a heartbeat for
+    stale_after (a crashed run) is taken over. Returns True if the lock is
+    now held by owner.
+    """
+    try:
+        with transaction.atomic():
+            ScoringLock.objects.create(
+                tenant_id=tenant_id, owner=owner, acquired_at=now(), heartbeat_at=now()
+            )
+        return True
+    except IntegrityError:
+        return bool(
+            ScoringLock.objects
+            .filter(tenant_id=tenant_id, heartbeat_at__lt=now() - stale_after)
+            .update(owner=owner, acquired_at=now(), heartbeat_at=now())
+        )
+
+
+def release_scoring_lock(tenant_id, owner):
+    ScoringLock.objects.filter(tenant_id=tenant_id, owner=owner).delete()
+
+
+def refresh_scoring_lock(tenant_id, owner):
+    """
+    Record that owner is still alive. Returns False if it lost the lock.
+    """
+    return bool(
+        ScoringLock.objects
+        .filter(tenant_id=tenant_id, owner=owner)
+        .update(heartbeat_at=now())
+    )
+
+
+class LockHeartbeat(threading.Thread):
+    """
+    Refreshes a held lock every `interval` seconds until stopped. It uses
+    its own database connection, so it keeps beating while the run is busy
+    in a long statement. (On SQLite a beat waits for the run's write lock
+    and may be skipped; keep stale_after well above the longest run there.)
+    """
+
+    def __init__(self, tenant_id, owner, interval):
+        super().__init__(daemon=True, name=f"scoring-lock-{tenant_id}")
+        self.tenant_id = tenant_id
+        self.owner = owner
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self):
+        try:
+            while not self.stopped.wait(self.interval):
+                try:
+                    if not refresh_scoring_lock(self.tenant_id, self.owner):
+                        logger.warning("Scoring lock for tenant %s was taken over", self.tenant_id)
+                        return
+                except Exception:
+                    logger.exception("Scoring lock heartbeat for tenant %s failed", self.tenant_id)
+        finally:
+            connections.close_all()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+@contextmanager
+def scoring_lock(tenant_id, wait=SCORING_LOCK_WAIT, stale_after=STALE_LOCK_AFTER):
+    """
+    Hold the tenant's scoring lock for the block, waiting up to `wait` for
+    another run to finish. Raises ScoringLockHeld if it doesn't.
+    """
+    if stale_after < MIN_STALE_LOCK_AFTER:
+        raise ValueError(f"stale_after must be at least {MIN_STALE_LOCK_AFTER}.")
+    owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex}"
+    deadline = time.monotonic() + wait.total_seconds()
+    while not acquire_scoring_lock(tenant_id, owner, stale_after):
+        if time.monotonic() >= deadline:
+            raise ScoringLockHeld(f"Tenant {tenant_id} is already being scored.")
+        time.sleep(LOCK_POLL_SECONDS)
+
+    heartbeat = LockHeartbeat(tenant_id, owner, LOCK_HEARTBEAT_INTERVAL.total_seconds())
+    heartbeat.start()
+    try:
+        yield owner
+    finally:
+        heartbeat.stop()
+        release_scoring_lock(tenant_id, owner)
@@ -0,0 +1,270 @@
+"""
+In-database scoring engine.
+
+The rules of risk_engine.calculate_churn_risk() compiled into ORM Case/When
+expressions, so a scoring run is a single INSERT ... SELECT into
+ChurnPrediction plus one UPDATE of the Customer pointers. No customer rows
+are loaded into Python, so memory stays constant however large the tenant.
+Scores, levels, reasons, actions, trends and days in risk match the Python
+engine (see the parity tests).
+"""
+import json
+from datetime import date, timedelta
+from itertools import product
+
+from django.db import NotSupportedError, connection, transaction
+from django.db.models import (
+    Case,
+    CharField,
+    DateTimeField,
+    F,
+    FloatField,
+    Func,
+    IntegerField,
+    JSONField,
+    Min,
+    OuterRef,
+    Q,
+    Subquery,
+    Value,
+    When,
+)
+from django.db.models.functions import Cast, Coalesce, Least
+from django.utils.timezone import now
+
+from .caching import bump_data_version
+from .daily_metrics import count_risk_transitions, record_daily_metrics
+from .models import Customer, ChurnPrediction
+from .recommendations import (
+    ACTION_DISCOUNT,
+    ACTION_EDUCATION,
+    ACTION_NONE,
+    ACTION_OUTREACH,
+    ACTION_REMINDER,
+    ACTION_UPGRADE,
+)
+from .risk_engine import INACTIVITY_THRESHOLDS, NEW_USER_DAYS, reasons_from_mask
+
+
+# Every reason bitmask the rules can produce (inactivity, usage, free plan
+# and new user are independent; the two levels of each are exclusive).
+REASON_MASKS = tuple(
+    sum(bits) for bits in product((0, 1, 2), (0, 4, 8), (0, 16), (0, 32))
+)
+
+# ChurnPrediction columns written by the INSERT ... SELECT, in order.
+PREDICTION_COLUMNS = (
+    "customer_id",
+    "tenant_id",
+    "risk_score",
+    "risk_level",
+    "reasons",
+    "revenue_at_risk",
+    "recommended_action",
+    "risk_trend",
+    "early_warning",
+    "days_in_risk",
+    "created_at",
+)
+
+
+class DaysSince(Func):
+    """
+    Whole days from the UTC date of a datetime expression to a given date,
+    like (today - value.date()).days in Python.
+    """
+
+    output_field = IntegerField()
+
+    def __init__(self, expression, today, **extra):
+        super().__init__(expression, Value(today), **extra)
+
+    def compile_arguments(self, compiler):
+        value, today = self.get_source_expressions()
+        value_sql, value_params = compiler.compile(value)
+        today_sql, today_params = compiler.compile(today)
+        return value_sql, today_sql, (*today_params, *value_params)
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        value_sql, today_sql, params = self.compile_arguments(compiler)
+        return f"CAST(julianday({today_sql}) - julianday(date({value_sql})) AS INTEGER)", params
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        value_sql, today_sql, params = self.compile_arguments(compiler)
+        return f"(CAST({today_sql} AS date) - CAST({value_sql} AT TIME ZONE 'UTC' AS date))", params
+
+    def as_sql(self, compiler, connection, **extra_context):
+        raise NotSupportedError(f"DaysSince is not implemented for {connection.vendor}.")
+
+
+def rule_conditions(today):
+    """
+    The risk rules as Q objects on Customer, one per reason code, in
+    REASON_CODES order. Day counts are turned into date cutoffs, and a
+    missing date counts as long ago (like risk_engine.MISSING_DAYS).
+    """
+    def before(days):
+        return today - timedelta(days=days)
+
+    return (
+        Q(last_active_date__lt=before(INACTIVITY_THRESHOLDS[0])) | Q(last_active_date__isnull=True),
+        Q(last_active_date__lt=before(INACTIVITY_THRESHOLDS[1])),
+        Q(feature_usage_score__lt=20),
+        Q(feature_usage_score__lt=40),
+        Q(monthly_spend=0),
+        Q(signup_date__gt=before(NEW_USER_DAYS)),
+    )
+
+
+def first_match(*branches, default, output_field):
+    return Case(
+        *(When(condition, then=Value(value)) for condition, value in branches),
+        default=Value(default),
+        output_field=output_field,
+    )
+
+
+def scoring_annotations(today, run_at):
+    """
+    Annotations that compute one ChurnPrediction row per Customer.
+    """
+    inactive_30, inactive_14, very_low_usage, low_usage, free_plan, new_user = rule_conditions(today)
+    score_field, text_field = FloatField(), CharField()
+
+    # Same additions in the same order as the Python engine, so the float
+    # scores are identical.
+    score = Least(
+        Value(0.0)
+        + first_match((inactive_30, 0.5), (inactive_14, 0.3), default=0.0, output_field=score_field)
+        + first_match((very_low_usage, 0.3), (low_usage, 0.15), default=0.0, output_field=score_field)
+        + first_match((free_plan, 0.2), default=0.0, output_field=score_field)
+        + first_match((new_user, 0.1), default=0.0, output_field=score_field),
+        Value(1.0),
+        output_field=score_field,
+    )
+    reason_mask = (
+        first_match((inactive_30, 1), (inactive_14, 2), default=0, output_field=IntegerField())
+        + first_match((very_low_usage, 4), (low_usage, 8), default=0, output_field=IntegerField())
+        + first_match((free_plan, 16), default=0, output_field=IntegerField())
+        + first_match((new_user, 32), default=0, output_field=IntegerField())
+    )
+
+    high = Q(prediction_risk_score__gte=0.7)
+    medium = Q(prediction_risk_score__gte=0.4)
+    worsening = Q(prediction_score_change__gt=0.1)
+
+    first_seen = (
+        ChurnPrediction.objects
+        .filter(tenant=OuterRef("tenant"), customer=OuterRef("pk"))
+        .values("customer")
+        .annotate(first_seen=Min("created_at"))
+        .values("first_seen")
+    )
+
+    # Order matters: later annotations refer to earlier ones.
+    return {
+        "prediction_customer_id": F("pk"),
+        "prediction_tenant_id": F("tenant_id"),
+        "prediction_risk_score": score,
+        "prediction_reason_mask": reason_mask,
+        "prediction_score_change": score - F("latest_prediction__risk_score"),
+        "prediction_risk_level": first_match(
+            (high, "high"), (medium, "medium"), default="low", output_field=text_field
+        ),
+        "prediction_reasons": Cast(
+            first_match(
+                *(
+                    (Q(prediction_reason_mask=mask), json.dumps(reasons_from_mask(mask)))
+                    for mask in REASON_MASKS
+                ),
+                default="[]",
+                output_field=text_field,
+            ),
+            output_field=JSONField(),
+        ),
+        "prediction_revenue_at_risk": score * Coalesce(F("monthly_spend"), Value(0.0)),
+        "prediction_recommended_action": first_match(
+            (high & Q(monthly_spend__gt=50), ACTION_OUTREACH),
+            (high & very_low_usage, ACTION_EDUCATION),
+            (high, ACTION_DISCOUNT),
+            (medium & Q(monthly_spend=0), ACTION_UPGRADE),
+            (medium, ACTION_REMINDER),
+            default=ACTION_NONE,
+            output_field=text_field,
+        ),
+        "prediction_risk_trend": first_match(
+            (Q(latest_prediction__isnull=True), "new"),
+            (worsening, "worsening"),
+            (Q(prediction_score_change__lt=-0.1), "improving"),
+            default="stable",
+            output_field=text_field,
+        ),
+        "prediction_early_warning": Case(
+            When(worsening, then=Value(True)), default=Value(False)
+        ),
+        "prediction_days_in_risk": Coalesce(
+            DaysSince(Subquery(first_seen, output_field=DateTimeField()), today), Value(0)
+        ),
+        "prediction_created_at": Value(run_at, output_field=DateTimeField()),
+    }
+
+
+def insert_predictions_sql(customers, today, run_at):
+    """
+    Score the Customer queryset with one INSERT ... SELECT.
+    Returns the number of predictions written.
+    """
+    annotations = scoring_annotations(today, run_at)
+    select = (
+        customers
+        .order_by()
+        .annotate(**annotations)
+        .values(*(f"prediction_{column}" for column in PREDICTION_COLUMNS))
+    )
+    select_sql, params = select.query.sql_with_params()
+
+    quote = connection.ops.quote_name
+    columns = ", ".join(quote(column) for column in PREDICTION_COLUMNS)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {quote(ChurnPrediction._meta.db_table)} ({columns}) {select_sql}",
+            params,
+        )
+        return cursor.rowcount
+
+
+def generate_churn_predictions_sql(tenant, progress=None, incremental=False, customer_ids=None):
+    """
+    Database-side scoring engine, run by scoring.generate_churn_predictions()
+    (which holds the tenant's scoring lock) with the same arguments. Nothing
+    is loaded into Python; progress is only reported once, when the run is
+    done.
+    """
+    from .scoring import customers_to_rescore
+
+    today = date.today()
+    if incremental:
+        customers = customers_to_rescore(tenant, today=today)
+    else:
+        customers = Customer.objects.filter(tenant=tenant)
+    if customer_ids is not None:
+        customers = customers.filter(pk__in=customer_ids)
+
+    with transaction.atomic():
+        written = insert_predictions_sql(customers, today, now())
+        new_risks, resolved_risks = count_risk_transitions(customers)
+        customers.update(
+            scored_fingerprint=F("input_fingerprint"),
+            latest_prediction=Subquery(
+                ChurnPrediction.objects
+                .filter(customer=OuterRef("pk"))
+                .order_by("-id")
+                .values("id")[:1]
+            ),
+        )
+        record_daily_metrics(tenant, new_risks, resolved_risks)
+        bump_data_version(tenant)
+
+    if progress:
+        progress(written, written)
+    return written
@@ -0,0 +1,31 @@
+"""
+Static file finder that serves the installed plotly package's
+plotly.min.js as static/plotly/plotly.min.js, and nothing else from it.
+"""
+import os
+from pathlib import Path
+
+import plotly
+from django.contrib.staticfiles.finders import BaseFinder
+from django.core.files.storage import FileSystemStorage
+
+
+PLOTLY_JS = "plotly.min.js"
+PLOTLY_JS_PREFIX = "plotly"
+PLOTLY_JS_PATH = f"{PLOTLY_JS_PREFIX}/{PLOTLY_JS}"
+
+
+class PlotlyJSFinder(BaseFinder):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.storage = FileSystemStorage(location=Path(plotly.__file__).resolve().parent / "package_data")
+        self.storage.prefix = PLOTLY_JS_PREFIX
+
+    def find(self, path, find_all=False, **kwargs):
+        if path.replace(os.sep, "/") != PLOTLY_JS_PATH:
+            return []
+        match = self.storage.path(PLOTLY_JS)
+        return [match] if find_all else match
+
+    def list(self, ignore_patterns):
+        yield PLOTLY_JS, self.storage
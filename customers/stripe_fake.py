@@ -0,0 +1,156 @@
+"""
+In-memory stand-in for the parts of the `stripe` module used by
+stripe_sync, for offline tests and benchmarks.
+
+    client = FakeStripeClient.generate(customers=5000, latency=0.05)
+    fetch_stripe_customers_with_mrr(client=client)
+"""
+import random
+import threading
+import time
+from typing import Dict, List, Optional
+
+
+class FakeStripeObject(dict):
+    """
+    dict with attribute access, like stripe.StripeObject.
+    """
+
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+
+class FakeListObject:
+    def __init__(self, resource, data, params):
+        self.resource = resource
+        self.data = data
+        self.params = params
+        self.has_more = False
+
+    def auto_paging_iter(self):
+        page = self
+        while True:
+            yield from page.data
+            if not page.has_more or not page.data:
+                return
+            page = page.resource.list(**{**page.params, "starting_after": page.data[-1]["id"]})
+
+
+class FakeResource:
+    """
+    One list endpoint. Objects are returned newest first and support the
+    limit, starting_after, created[gt]/created[gte], status and customer
+    parameters.
+    """
+
+    def __init__(self, objects: List[Dict], latency: float = 0.0):
+        self.objects = sorted(
+            (FakeStripeObject(obj) for obj in objects),
+            key=lambda obj: (obj["created"], obj["id"]),
+            reverse=True,
+        )
+        self.latency = latency
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def list(self, limit=10, starting_after=None, created=None, status=None, customer=None, **params):
+        with self._lock:
+            self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+        matches = self.objects
+        if created and "gt" in created:
+            matches = [obj for obj in matches if obj["created"] > created["gt"]]
+        if created and "gte" in created:
+            matches = [obj for obj in matches if obj["created"] >= created["gte"]]
+        if status:
+            matches = [obj for obj in matches if obj.get("status") == status]
+        if customer:
+            matches = [obj for obj in matches if obj.get("customer") == customer]
+
+        start = 0
+        if starting_after:
+            ids = [obj["id"] for obj in matches]
+            start = ids.index(starting_after) + 1
+
+        page = FakeListObject(
+            self,
+            matches[start:start + limit],
+            {"limit": limit, "created": created, "status": status, "customer": customer, **params},
+        )
+        page.has_more = start + limit < len(matches)
+        return page
+
+    def retrieve(self, id):
+        with self._lock:
+            self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+        for obj in self.objects:
+            if obj["id"] == id:
+                return obj
+        return FakeStripeObject({"id": id, "deleted": True})
+
+
+class FakeStripeClient:
+    def __init__(self, customers: Optional[List[Dict]] = None, subscriptions: Optional[List[Dict]] = None, latency: float = 0.0):
+        self.Customer = FakeResource(customers or [], latency)
+        self.Subscription = FakeResource(subscriptions or [], latency)
+
+    def add_customer(self, customer: Dict):
+        self.Customer.objects.insert(0, FakeStripeObject(customer))
+
+    def add_subscription(self, subscription: Dict):
+        self.Subscription.objects.insert(0, FakeStripeObject(subscription))
+
+    @classmethod
+    def generate(cls, customers: int = 100, latency: float = 0.0, seed: int = 0, created_start: int = 1_700_000_000):
+        """
+        Build a client with `customers` customers, most with one active
+        monthly or yearly subscription.
+        """
+        rng = random.Random(seed)
+        customer_objects = []
+        subscription_objects = []
+
+        for i in range(customers):
+            created = created_start + i * 60
+            customer_objects.append(
+                {
+                    "id": f"cus_{i:08d}",
+                    "name": f"cust-{i}",
+                    "email": f"customer{i}@example.com",
+                    "created": created,
+                }
+            )
+            if rng.random() < 0.8:
+                yearly = rng.random() < 0.2
+                subscription_objects.append(
+                    {
+                        "id": f"sub_{i:08d}",
+                        "customer": f"cus_{i:08d}",
+                        "status": "active",
+                        "created": created + 30,
+                        "items": {
+                            "data": [
+                                {
+                                    "quantity": rng.randint(1, 5),
+                                    "price": {
+                                        "nickname": "Annual" if yearly else "Monthly",
+                                        "unit_amount": rng.choice([900, 2900, 9900]) * (10 if yearly else 1),
+                                        "recurring": {
+                                            "interval": "year" if yearly else "month",
+                                            "interval_count": 1,
+                                        },
+                                    },
+                                }
+                            ]
+                        },
+                    }
+                )
+
+        return cls(customer_objects, subscription_objects, latency=latency)
@@ -1,9 +1,12 @@
 import os
-from typing import Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Dict, List, Optional, Tuple
 
 import stripe
 from django.conf import settings
 from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
 
 
 def _get_stripe_api_key() -> str:
@@ -23,32 +26,128 @@ def _format_mrr(amount_cents: Optional[int], interval: Optional[str], interval_c
     return round(monthly_amount * quantity, 2)
 
 
-def fetch_stripe_customers_with_mrr(limit: int = 100) -> List[Dict]:
+def _get_stripe_client():
     stripe.api_key = _get_stripe_api_key()
+    return stripe
 
-    customers = stripe.Customer.list(limit=limit).auto_paging_iter()
-    customer_index: Dict[str, Dict] = {}
 
-    for customer in customers:
-        customer_index[customer.id] = {
-            "stripe_customer_id": customer.id,
-            "name": customer.get("name") or "",
-            "email": customer.get("email") or "",
-            "mrr": 0.0,
-            "plan": None,
-        }
+# Parallel per-customer requests of incremental syncs (Customer.retrieve
+# and Subscription.list by customer).
+RETRIEVE_WORKERS = 8
+
+
+def _list_params(limit: int, created_since: Optional[int], **params) -> Dict:
+    params["limit"] = limit
+    if created_since is not None:
+        # `created` has one-second resolution, so objects created in the same
+        # second as the checkpoint may be new; ids already seen are dropped.
+        params["created"] = {"gte": created_since}
+    return params
+
+
+def _fetch_listing(resource, params: Dict, seen_ids=()) -> Tuple[List, Optional[int], List[str]]:
+    """
+    Page through one Stripe list endpoint, skipping seen_ids.
+    Returns: (objects, newest created timestamp, ids created at that timestamp)
+    """
+    seen = set(seen_ids)
+    objects = [obj for obj in resource.list(**params).auto_paging_iter() if obj.id not in seen]
+    newest = max((obj.get("created") or 0 for obj in objects), default=None)
+    newest_ids = [obj.id for obj in objects if (obj.get("created") or 0) == newest]
+    return objects, newest, newest_ids
+
+
+def _advance_cursor(checkpoint, prefix: str, newest: Optional[int], newest_ids: List[str]):
+    if newest is None:
+        return
+    created_field, seen_field = f"{prefix}_created_after", f"{prefix}_seen_ids"
+    if newest == getattr(checkpoint, created_field):
+        newest_ids = [*getattr(checkpoint, seen_field), *newest_ids]
+    setattr(checkpoint, created_field, newest)
+    setattr(checkpoint, seen_field, newest_ids)
+
+
+def _active_subscriptions(client, customer_id: str, limit: int) -> List:
+    listing = client.Subscription.list(customer=customer_id, status="active", limit=limit)
+    return list(listing.auto_paging_iter())
+
+
+def _empty_entry(customer_id: str, customer=None) -> Dict:
+    customer = customer or {}
+    return {
+        "stripe_customer_id": customer_id,
+        "name": customer.get("name") or "",
+        "email": customer.get("email") or "",
+        "mrr": 0.0,
+        "plan": None,
+    }
+
+
+def fetch_stripe_customers_with_mrr(limit: int = 100, client=None, checkpoint=None) -> List[Dict]:
+    """
+    Fetch Stripe customers and active subscriptions and compute each
+    customer's MRR. The two listings are paged concurrently.
+
+    client defaults to the configured `stripe` module; any object with
+    compatible Customer.list / Subscription.list works (see stripe_fake).
+
+    If a StripeSyncCheckpoint is given, only objects created since its
+    cursors (and not seen at the cursor's second) are fetched, and the
+    cursors are advanced in place; the caller saves it once the results are
+    processed. Customers of new subscriptions who are older than the
+    checkpoint are fetched by id, and the MRR of every customer returned is
+    computed from all of their active subscriptions, not only the new ones.
+    Other changes to existing objects are not picked up incrementally, so
+    run a full sync now and then.
+    """
+    client = client or _get_stripe_client()
+
+    customers_since = checkpoint.customers_created_after if checkpoint else None
+    subscriptions_since = checkpoint.subscriptions_created_after if checkpoint else None
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        customers_future = pool.submit(
+            _fetch_listing,
+            client.Customer,
+            _list_params(limit, customers_since),
+            checkpoint.customers_seen_ids if checkpoint else (),
+        )
+        subscriptions_future = pool.submit(
+            _fetch_listing,
+            client.Subscription,
+            _list_params(limit, subscriptions_since, status="active"),
+            checkpoint.subscriptions_seen_ids if checkpoint else (),
+        )
+        customers, newest_customer, newest_customer_ids = customers_future.result()
+        subscriptions, newest_subscription, newest_subscription_ids = subscriptions_future.result()
+
+    if checkpoint is not None:
+        _advance_cursor(checkpoint, "customers", newest_customer, newest_customer_ids)
+        _advance_cursor(checkpoint, "subscriptions", newest_subscription, newest_subscription_ids)
+
+    customer_index: Dict[str, Dict] = {
+        customer.id: _empty_entry(customer.id, customer) for customer in customers
+    }
+
+    if checkpoint is not None:
+        # A full sync lists every customer and subscription; an incremental
+        # one only the new ones. Subscribers from before the checkpoint are
+        # fetched by id, and each affected customer's subscriptions are
+        # listed in full so their MRR isn't just that of the new ones.
+        subscriber_ids = {subscription.get("customer") for subscription in subscriptions}
+        older = sorted(subscriber_ids - set(customer_index))
+        affected = sorted(subscriber_ids | set(customer_index))
+        with ThreadPoolExecutor(max_workers=RETRIEVE_WORKERS) as pool:
+            for customer in pool.map(client.Customer.retrieve, older):
+                if not customer.get("deleted"):
+                    customer_index[customer.id] = _empty_entry(customer.id, customer)
+            listings = pool.map(partial(_active_subscriptions, client, limit=limit), affected)
+            subscriptions = [subscription for listing in listings for subscription in listing]
 
-    subscriptions = stripe.Subscription.list(status="active", limit=limit).auto_paging_iter()
     for subscription in subscriptions:
         customer_id = subscription.get("customer")
         if customer_id not in customer_index:
-            customer_index[customer_id] = {
-                "stripe_customer_id": customer_id,
-                "name": "",
-                "email": "",
-                "mrr": 0.0,
-                "plan": None,
-            }
+            customer_index[customer_id] = _empty_entry(customer_id)
 
         total_mrr = 0.0
         plan_name = None
@@ -71,9 +170,39 @@ def fetch_stripe_customers_with_mrr(limit: int = 100) -> List[Dict]:
     return list(customer_index.values())
 
 
-def map_stripe_customers_to_internal(stripe_customers: List[Dict]) -> List[Dict]:
+def build_customer_match_index(tenant) -> Tuple[Dict[str, Tuple[int, str]], Dict[str, Tuple[int, str]]]:
+    """
+    Case-folded email and external_id lookups for the tenant's customers,
+    loaded in one query. Values are (customer id, external_id); when
+    several customers share a key the lowest id wins.
+    """
     from customers.models import Customer  # Imported lazily to avoid circular deps
 
+    by_email: Dict[str, Tuple[int, str]] = {}
+    by_external_id: Dict[str, Tuple[int, str]] = {}
+
+    rows = (
+        Customer.objects
+        .filter(tenant=tenant)
+        .order_by("pk")
+        .values_list("pk", "email", "external_id")
+    )
+    for pk, email, external_id in rows.iterator(chunk_size=5000):
+        if email:
+            by_email.setdefault(email.casefold(), (pk, external_id))
+        by_external_id.setdefault(external_id.casefold(), (pk, external_id))
+
+    return by_email, by_external_id
+
+
+def map_stripe_customers_to_internal(stripe_customers: List[Dict], tenant) -> List[Dict]:
+    """
+    Match Stripe customers to the tenant's customers by email, falling
+    back to Stripe name == external_id (both case-insensitive).
+    Runs a constant number of queries however many customers there are.
+    """
+    by_email, by_external_id = build_customer_match_index(tenant)
+
     mapped = []
     for entry in stripe_customers:
         email = entry.get("email") or ""
@@ -81,9 +210,9 @@ def map_stripe_customers_to_internal(stripe_customers: List[Dict]) -> List[Dict]
 
         match = None
         if email:
-            match = Customer.objects.filter(email__iexact=email).first()
+            match = by_email.get(email.casefold())
         if not match and name:
-            match = Customer.objects.filter(external_id__iexact=name).first()
+            match = by_external_id.get(name.casefold())
 
         mapped.append(
             {
@@ -92,9 +221,64 @@ def map_stripe_customers_to_internal(stripe_customers: List[Dict]) -> List[Dict]
                 "email": email,
                 "mrr": entry.get("mrr", 0.0),
                 "plan": entry.get("plan"),
-                "matched_customer_id": match.id if match else None,
-                "matched_customer_name": str(match) if match else None,
+                "matched_customer_id": match[0] if match else None,
+                "matched_customer_name": f"{match[1]} ({tenant.name})" if match else None,
             }
         )
 
     return mapped
+
+
+def apply_stripe_billing(tenant, mapped_customers: List[Dict], batch_size: int = 500) -> Dict[str, int]:
+    """
+    Write matched Stripe MRR and plan names into Customer.monthly_spend and
+    subscription_type. Only rows whose values change are written (in bulk),
+    and only those customers are rescored.
+    Returns: dict with matched, updated and rescored counts.
+    """
+    from customers.caching import bump_data_version
+    from customers.models import Customer  # Imported lazily to avoid circular deps
+    from customers.scoring import generate_churn_predictions
+
+    billing = {
+        entry["matched_customer_id"]: (entry.get("mrr") or 0.0, entry.get("plan"))
+        for entry in mapped_customers
+        if entry.get("matched_customer_id")
+    }
+
+    changed = []
+    matched_ids = list(billing)
+    for start in range(0, len(matched_ids), batch_size):
+        customers = Customer.objects.filter(
+            tenant=tenant, pk__in=matched_ids[start:start + batch_size]
+        ).only(
+            "monthly_spend",
+            "subscription_type",
+            "last_active_date",
+            "signup_date",
+            "feature_usage_score",
+        )
+        for customer in customers:
+            mrr, plan = billing[customer.pk]
+            plan = plan or customer.subscription_type
+            if customer.monthly_spend == mrr and customer.subscription_type == plan:
+                continue
+            customer.monthly_spend = mrr
+            customer.subscription_type = plan
+            customer.refresh_input_fingerprint()
+            changed.append(customer)
+
+    with transaction.atomic():
+        Customer.objects.bulk_update(
+            changed,
+            ["monthly_spend", "subscription_type", "input_fingerprint"],
+            batch_size=batch_size,
+        )
+        if changed:
+            bump_data_version(tenant)
+
+    changed_ids = [customer.pk for customer in changed]
+    if changed_ids:
+        generate_churn_predictions(tenant, customer_ids=changed_ids)
+
+    return {"matched": len(billing), "updated": len(changed), "rescored": len(changed_ids)}
@@ -0,0 +1,94 @@
+import csv
+import io
+import random
+from datetime import date, timedelta
+
+from django.db import transaction
+from django.utils.timezone import now
+
+from accounts.models import Tenant
+from .models import Customer, ChurnPrediction
+from .scoring import generate_churn_predictions
+
+
+PLANS = ("Free", "Starter", "Pro", "Enterprise")
+PLAN_SPEND = {"Free": (0, 0), "Starter": (9, 29), "Pro": (49, 149), "Enterprise": (300, 2000)}
+
+CHUNK_SIZE = 5000
+
+
+def synthetic_customer_values(index, rng, today=None):
+    """
+    Field values for one synthetic customer. Values cluster around the
+    risk rule thresholds so every risk level and reason shows up.
+    """
+    today = today or date.today()
+    plan = rng.choice(PLANS)
+    low, high = PLAN_SPEND[plan]
+    tenure = rng.randint(0, 900)
+    inactivity = min(tenure, int(rng.expovariate(1 / 12)))
+
+    return {
+        "external_id": f"cust-{index}",
+        "email": f"customer{index}@example.com",
+        "signup_date": today - timedelta(days=tenure),
+        "last_active_date": today - timedelta(days=inactivity) if rng.random() > 0.02 else None,
+        "subscription_type": plan,
+        "monthly_spend": round(rng.uniform(low, high), 2),
+        "feature_usage_score": round(rng.uniform(0, 100), 1) if rng.random() > 0.05 else None,
+        "churned": rng.random() < 0.03,
+    }
+
+
+def synthetic_csv(customers, seed=0):
+    """
+    CSV text (as a stream) with `customers` synthetic rows in upload format.
+    """
+    rng = random.Random(seed)
+    buffer = io.StringIO()
+    fields = [
+        "external_id", "email", "signup_date", "last_active_date",
+        "subscription_type", "monthly_spend", "feature_usage_score", "churned",
+    ]
+    writer = csv.DictWriter(buffer, fieldnames=fields)
+    writer.writeheader()
+    for index in range(customers):
+        values = synthetic_customer_values(index, rng)
+        values["churned"] = "yes" if values["churned"] else "no"
+        writer.writerow({key: "" if value is None else value for key, value in values.items()})
+    buffer.seek(0)
+    return buffer
+
+
+def create_synthetic_tenant(slug, customers, runs=1, seed=0, stdout=None):
+    """
+    Create (or replace) tenant `slug` with `customers` synthetic customers
+    and `runs` scoring runs of prediction history, one day apart.
+    """
+    Tenant.objects.filter(slug=slug).delete()
+    tenant = Tenant.objects.create(name=f"Synthetic {slug}", slug=slug)
+    rng = random.Random(seed)
+
+    for start in range(0, customers, CHUNK_SIZE):
+        batch = []
+        for index in range(start, min(start + CHUNK_SIZE, customers)):
+            customer = Customer(tenant=tenant, **synthetic_customer_values(index, rng))
+            customer.refresh_input_fingerprint()
+            batch.append(customer)
+        with transaction.atomic():
+            Customer.objects.bulk_create(batch)
+        if stdout:
+            stdout.write(f"  {start + len(batch)} customers")
+
+    for run in range(runs):
+        last_id = ChurnPrediction.objects.filter(tenant=tenant).order_by("-id").values_list("id", flat=True).first() or 0
+        generate_churn_predictions(tenant)
+        (
+            ChurnPrediction.objects
+            .filter(tenant=tenant, id__gt=last_id)
+            .update(created_at=now() - timedelta(days=runs - 1 - run))
+        )
+        if stdout:
+            stdout.write(f"  scoring run {run + 1}/{runs}")
+
+    return tenant
@@ -1,3 +1,1616 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+from datetime import date, timedelta
+from itertools import product
+from types import SimpleNamespace
+from unittest import skipUnless
+from unittest.mock import patch
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+
+from django.contrib.staticfiles import finders
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection, connections
+from django.db.models import F, Max
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.timezone import now
+
+from accounts.models import Tenant, User
+from .analytics import summarize_predictions, top_revenue_at_risk
+from .caching import data_version, tenant_cache_key
+from .chunked_uploads import ChunkedUploadError, append_part
+from .columnar import import_customers_columnar, pa
+from .exports import EXPORT_BUFFER_SIZE, EXPORT_COLUMNS, csv_chunks
+from .importer import CustomerImportError, import_customers_csv
+from .jobs import claim_next_job, enqueue_scoring_job, run_job, run_next_job, update_job
+from .daily_metrics import record_daily_metrics
+from .models import ChunkedUpload, Customer, ChurnPrediction, Job, ScoringLock, StripeSyncCheckpoint, TenantDailyMetrics
+from .pagination import encode_cursor, keyset_paginate
+from .parallel_scoring import score_all_tenants
+from .retention import prune_prediction_history
+from .stripe_fake import FakeStripeClient
+from .stripe_sync import apply_stripe_billing, fetch_stripe_customers_with_mrr, map_stripe_customers_to_internal
+from .recommendations import recommend_action
+from .risk_engine import calculate_churn_risk
+from .scoring_locks import (
+    LOCK_HEARTBEAT_INTERVAL,
+    MIN_STALE_LOCK_AFTER,
+    ScoringLockHeld,
+    acquire_scoring_lock,
+    refresh_scoring_lock,
+)
+from .predictions import current_predictions
+from .scoring import (
+    generate_churn_predictions,
+    score_customers,
+)
+
+if pa is not None:
+    import pyarrow.csv as pa_csv
+    import pyarrow.ipc  # noqa: F401 (pa.ipc)
+    import pyarrow.parquet as pq
+
+
+def temporary_directory(test):
+    """
+    A new directory that is removed when the test finishes.
+    """
+    path = tempfile.mkdtemp()
+    test.addCleanup(shutil.rmtree, path, ignore_errors=True)
+    return path
+
+
+def use_temporary_media_root(test):
+    """
+    Point MEDIA_ROOT at a temporary directory for the rest of the test.
+    """
+    media_root = override_settings(MEDIA_ROOT=temporary_directory(test))
+    media_root.enable()
+    test.addCleanup(media_root.disable)
+
+
+def make_customer_grid(tenant, today=None):
+    """
+    One customer per combination of values around every rule threshold.
+    """
+    today = today or date.today()
+    day_offsets = [None, -3, 0, 6, 7, 8, 14, 15, 30, 31, 400]
+    usage_scores = [None, 0, 19.9, 20, 39.99, 40, 100]
+    spends = [None, 0, 0.0, 10, 50, 50.01, 500]
+
+    customers = []
+    for i, (active, signup, usage, spend) in enumerate(
+        product(day_offsets, day_offsets[::3], usage_scores, spends)
+    ):
+        customers.append(
+            Customer(
+                tenant=tenant,
+                external_id=f"cust-{i}",
+                last_active_date=today - timedelta(days=active) if active is not None else None,
+                signup_date=today - timedelta(days=signup) if signup is not None else None,
+                feature_usage_score=usage,
+                monthly_spend=spend,
+            )
+        )
+    return Customer.objects.bulk_create(customers)
+
+
+class BatchScoringTests(TestCase):
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="Acme", slug="acme")
+        make_customer_grid(self.tenant)
+
+    def test_batch_matches_per_customer_engine(self):
+        customers = Customer.objects.filter(tenant=self.tenant).order_by("id")
+        results = score_customers(customers)
+
+        self.assertEqual(len(results), customers.count())
+        for customer, result in zip(customers, results):
+            score, level, reasons = calculate_churn_risk(customer)
+            self.assertEqual(result["customer_id"], customer.id)
+            self.assertEqual(result["risk_score"], score)
+            self.assertEqual(result["risk_level"], level)
+            self.assertEqual(result["reasons"], reasons)
+            self.assertEqual(result["revenue_at_risk"], score * (customer.monthly_spend or 0))
+            self.assertEqual(
+                result["recommended_action"],
+                recommend_action(customer, level, reasons),
+            )
+
+    def test_recommend_action_medium_free_plan(self):
+        customer = SimpleNamespace(monthly_spend=0)
+        self.assertEqual(
+            recommend_action(customer, "medium", []),
+            "Encourage upgrade with limited-time offer",
+        )
+
+    def test_generate_churn_predictions_scores_every_customer(self):
+        generate_churn_predictions(self.tenant)
+
+        self.assertEqual(
+            ChurnPrediction.objects.filter(tenant=self.tenant).count(),
+            Customer.objects.filter(tenant=self.tenant).count(),
+        )
+
+
+class PredictionQueryCountTests(TestCase):
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="Acme", slug="acme")
+
+    def add_customers(self, count):
+        start = Customer.objects.filter(tenant=self.tenant).count()
+        Customer.objects.bulk_create(
+            Customer(
+                tenant=self.tenant,
+                external_id=f"cust-{start + i}",
+                last_active_date=date.today() - timedelta(days=i),
+                feature_usage_score=i,
+                monthly_spend=i,
+            )
+            for i in range(count)
+        )
+
+    def count_scoring_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            generate_churn_predictions(self.tenant)
+        return len(ctx.captured_queries)
+
+    def test_query_count_is_constant_in_customer_count(self):
+        self.add_customers(3)
+        generate_churn_predictions(self.tenant)
+        small = self.count_scoring_queries()
+
+        self.add_customers(40)
+        generate_churn_predictions(self.tenant)
+        large = self.count_scoring_queries()
+
+        self.assertEqual(small, large)
+
+    def test_trend_and_days_in_risk_use_previous_run(self):
+        self.add_customers(2)
+        generate_churn_predictions(self.tenant)
+        ChurnPrediction.objects.update(risk_score=0.0, created_at=now() - timedelta(days=3))
+
+        generate_churn_predictions(self.tenant)
+
+        latest = ChurnPrediction.objects.filter(tenant=self.tenant).order_by("-id")[:2]
+        for prediction in latest:
+            expected_trend = "worsening" if prediction.risk_score > 0.1 else "stable"
+            self.assertEqual(prediction.risk_trend, expected_trend)
+            self.assertEqual(prediction.days_in_risk, 3)
+
+
+class CustomerImportTests(TestCase):
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="Acme", slug="acme")
+
+    def test_import_reports_created_updated_and_skipped(self):
+        Customer.objects.create(tenant=self.tenant, external_id="a", monthly_spend=1)
+        csv_text = (
+            "\ufeffExternal_ID,email,signup_date,last_active_date,monthly_spend,feature_usage_score,churned\n"
+            "a,a@example.com,2024-01-02,2024-03-04,49.5,12,yes\n"
+            "b,b@example.com,not-a-date,,abc,,0\n"
+            ",missing@example.com,,,,,\n"
+            "c,c@example.com,,,,,\n"
+            "c,c2@example.com,,,,,\n"
+        )
+
+        report = import_customers_csv(self.tenant, io.StringIO(csv_text), chunk_size=2)
+
+        self.assertEqual(report, {"created": 2, "updated": 2, "unchanged": 0, "skipped": 1})
+        a = Customer.objects.get(tenant=self.tenant, external_id="a")
+        self.assertEqual(a.email, "a@example.com")
+        self.assertEqual(a.signup_date, date(2024, 1, 2))
+        self.assertEqual(a.monthly_spend, 49.5)
+        self.assertTrue(a.churned)
+        b = Customer.objects.get(tenant=self.tenant, external_id="b")
+        self.assertIsNone(b.signup_date)
+        self.assertIsNone(b.monthly_spend)
+        self.assertEqual(Customer.objects.get(external_id="c").email, "c2@example.com")
+
+    def test_missing_required_columns(self):
+        with self.assertRaises(CustomerImportError):
+            import_customers_csv(self.tenant, io.StringIO("email\nx@example.com\n"))
+
+    def test_reimport_only_writes_changed_rows(self):
+        csv_text = (
+            "external_id,email,signup_date,monthly_spend,feature_usage_score,churned\n"
+            "a,a@example.com,2024-01-02,49.5,12,yes\n"
+            "b,b@example.com,,,,\n"
+        )
+        import_customers_csv(self.tenant, io.StringIO(csv_text))
+        version = data_version(self.tenant)
+
+        with CaptureQueriesContext(connection) as queries:
+            report = import_customers_csv(self.tenant, io.StringIO(csv_text))
+
+        self.assertEqual(report, {"created": 0, "updated": 0, "unchanged": 2, "skipped": 0})
+        self.assertFalse([q for q in queries if q["sql"].startswith(("INSERT", "UPDATE"))])
+        self.assertEqual(data_version(self.tenant), version)
+
+        report = import_customers_csv(
+            self.tenant, io.StringIO(csv_text.replace("b@example.com", "new@example.com"))
+        )
+
+        self.assertEqual(report, {"created": 0, "updated": 1, "unchanged": 1, "skipped": 0})
+        self.assertEqual(Customer.objects.get(external_id="b").email, "new@example.com")
+
+    def test_reimport_with_duplicates_and_nan_writes_nothing(self):
+        csv_text = "external_id,email,monthly_spend,feature_usage_score\nc,x@e.com,nan,inf\nc,x@e.com,nan,inf\n"
+        import_customers_csv(self.tenant, io.StringIO(csv_text))
+        version = data_version(self.tenant)
+
+        report = import_customers_csv(self.tenant, io.StringIO(csv_text))
+
+        self.assertEqual(report, {"created": 0, "updated": 0, "unchanged": 2, "skipped": 0})
+        self.assertEqual(data_version(self.tenant), version)
+        customer = Customer.objects.get(external_id="c")
+        self.assertIsNone(customer.monthly_spend)
+        self.assertIsNone(customer.feature_usage_score)
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        use_temporary_media_root(self)
+        self.tenant = Tenant.objects.create(name="Acme", slug="acme")
+        self.user = User.objects.create_user("owner", password="x", tenant=self.tenant)
+        self.client.force_login(self.user)
+
+    def upload(self, csv_text):
+        upload = SimpleUploadedFile("customers.csv", csv_text.encode("utf-8"))
+        return self.client.post(reverse("customer_upload"), {"file": upload})
+
+    def test_upload_enqueues_import_job_and_worker_runs_it(self):
+        response = self.upload("external_id,monthly_spend\na,0\nb,99\n,1\n")
+
+        job = Job.objects.get(tenant=self.tenant)
+        self.assertRedirects(response, reverse("job_status", args=[job.id]))
+        self.assertEqual(job.status, Job.STATUS_QUEUED)
+        self.assertFalse(Customer.objects.exists())
+
+        call_command("run_worker", "--once", stdout=io.StringIO())
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_SUCCEEDED)
+        self.assertEqual(job.result, {"created": 2, "updated": 0, "unchanged": 0, "skipped": 1})
+        self.assertFalse(job.upload)
+        self.assertEqual(ChurnPrediction.objects.filter(tenant=self.tenant).count(), 2)
+
+        progress = self.client.get(reverse("job_progress", args=[job.id])).json()
+        self.assertTrue(progress["finished"])
+        self.assertEqual(progress["status"], Job.STATUS_SUCCEEDED)
+        self.assertEqual(progress["progress_current"], 2)
+
+    def test_failed_import_records_error(self):
+        self.upload("email\nx@example.com\n")
+
+        job = run_next_job()
+
+        self.assertEqual(job.status, Job.STATUS_FAILED)
+        self.assertIn("external_id", job.error)
+
+    @override_settings(JOB_TIMEOUT_MINUTES=30)
+    def test_job_abandoned_by_a_dead_worker_is_run_again(self):
+        self.upload("external_id,monthly_spend\na,0\n")
+        job = Job.objects.get(tenant=self.tenant)
+        # A long run that is still reporting progress is left alone.
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.STATUS_RUNNING, started_at=now() - timedelta(hours=3), heartbeat_at=now() - timedelta(minutes=20)
+        )
+
+        self.assertIsNone(run_next_job())
+
+        Job.objects.filter(pk=job.pk).update(heartbeat_at=now() - timedelta(minutes=40))
+        job = run_next_job()
+
+        self.assertEqual(job.status, Job.STATUS_SUCCEEDED)
+        self.assertEqual(job.result["created"], 1)
+
+    def test_progress_updates_refresh_the_heartbeat(self):
+        self.upload("external_id,monthly_spend\na,0\n")
+        job = claim_next_job()
+        Job.objects.filter(pk=job.pk).update(heartbeat_at=now() - timedelta(hours=1))
+
+        update_job(job, progress_current=1)
+
+        job.refresh_from_db()
+        self.assertGreater(job.heartbeat_at, now() - timedelta(minutes=1))
+
+    def test_scoring_view_reuses_queued_job(self):
+        self.client.get(reverse("run_churn_scoring"))
+        self.client.get(reverse("run_churn_scoring"))
+
+        self.assertEqual(Job.objects.filter(kind=Job.KIND_SCORING).count(), 1)
+
+    def test_jobs_are_tenant_scoped(self):
+        other = Tenant.objects.create(name="Other", slug="other")
+        job = enqueue_scoring_job(other)
+
+        response = self.client.get(reverse("job_progress", args=[job.id]))
+
+        self.assertEqual(response.status_code, 404)
+
+
+class JobProgressTests(TransactionTestCase):
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="Acme", slug="acme")
+        for i in range(5):
+            Customer.objects.create(tenant=self.tenant, external_id=f"c{i}")
+
+    def read_from_another_connection(self, job):
+        rows = []
+
+        def read():
+            try:
+                rows.append(Job.objects.values_list("progress_current", "progress_total").get(pk=job.pk))
+            finally:
+                connections.close_all()
+
+        reader = threading.Thread(target=read)
+        reader.start()
+        reader.join()
+        return rows[0]
+
+    def test_scoring_progress_is_visible_while_the_run_is_going(self):
+        enqueue_scoring_job(self.tenant)
+        job = claim_next_job()
+        seen = []
+        update = update_job
+
+        def update_and_read(job, **fields):
+            update(job, **fields)
+            if fields.get("progress_total"):
+                seen.append(self.read_from_another_connection(job))
+
+        with patch("customers.jobs.update_job", update_and_read), patch("customers.scoring.BULK_CREATE_BATCH_SIZE", 2):
+            run_job(job)
+
+        self.assertEqual(seen, [(0, 5), (2, 5), (4, 5), (5, 5)])
+
+
+class IncrementalScoringTests(TestCase):
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="Acme", slug="acme")
+        today = date.today()
+        self.unchanged = Customer.objects.create(
+            tenant=self.tenant, external_id="unchanged", last_active_date=today, signup_date=today - timedelta(days=100)
+        )
+        self.edited = Customer.objects.create(
+            tenant=self.tenant, external_id="edited", last_active_date=today, signup_date=today - timedelta(days=100)
+        )
+        self.inactive = Customer.objects.create(
+            tenant=self.tenant, external_id="inactive", last_active_date=today - timedelta(days=15)
+        )
+        self.tenured = Customer.objects.create(
+            tenant=self.tenant, external_id="tenured", last_active_date=today, signup_date=today - timedelta(days=8)
+        )
+        generate_churn_predictions(self.tenant)
+        # Pretend the last run happened three days ago.
+        ChurnPrediction.objects.update(created_at=now() - timedelta(days=3))
+
+    def rescored_ids(self, engine="python"):
+        before = ChurnPrediction.objects.aggregate(Max("id"))["id__max"]
+        generate_churn_predictions(self.tenant, incremental=True, engine=engine)
+        return set(
+            ChurnPrediction.objects.filter(id__gt=before).values_list("customer_id", flat=True)
+        )
+
+    def test_rescore_only_changed_and_threshold_crossing_customers(self):
+        self.edited.feature_usage_score = 5
+        self.edited.save()
+
+        self.assertEqual(
+            self.rescored_ids(),
+            {self.edited.id, self.inactive.id, self.tenured.id},
+        )
+        # Nothing changed since that run.
+        self.assertEqual(self.rescored_ids(), set())
+
+    def test_targeted_rescore_does_not_hide_other_customers_crossings(self):
+        for engine in ("python", "sql"):
+            with self.subTest(engine=engine):
+                ChurnPrediction.objects.update(created_at=now() - timedelta(days=3))
+                generate_churn_predictions(self.tenant, customer_ids=[self.unchanged.id], engine=engine)
+
+                self.assertEqual(self.rescored_ids(engine), {self.inactive.id, self.tenured.id})
+
+    def test_reimporting_identical_rows_is_not_a_change(self):
+        ChurnPrediction.objects.update(created_at=now())
+        csv_text = "external_id,last_active_date,signup_date\nunchanged,{},{}\n".format(
+            self.unchanged.last_active_date, self.unchanged.signup_date
+        )
+        import_customers_csv(self.tenant, io.StringIO(csv_text))
+
+        self.assertEqual(self.rescored_ids(), set())
+
+
+class LatestPredictionPointerTests(TestCase):
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="Acme", slug="acme")
+        self.a = Customer.objects.create(tenant=self.tenant, external_id="a", monthly_spend=0)
+        self.b = Customer.objects.create(tenant=self.tenant, external_id="b", monthly_spend=10)
+
+    def test_scoring_moves_pointer_to_newest_prediction(self):
+        generate_churn_predictions(self.tenant)
+        generate_churn_predictions(self.tenant)
+
+        for customer in Customer.objects.filter(tenant=self.tenant):
+            newest = customer.churn_predictions.order_by("-id").first()
+            self.assertEqual(customer.latest_prediction_id, newest.id)
+
+        current = current_predictions(self.tenant)
+        self.assertEqual(
+            set(current.values_list("id", flat=True)),
+            set(Customer.objects.values_list("latest_prediction_id", flat=True)),
+        )
+
+    def test_dashboard_shows_one_row_per_customer(self):
+        user = User.objects.create_user("owner", password="x", tenant=self.tenant)
+        self.client.force_login(user)
+        generate_churn_predictions(self.tenant)
+        generate_churn_predictions(self.tenant)
+
+        response = self.client.get(reverse("churn_dashboard"))
+
+        self.assertEqual(len(response.context["predictions"]), 2)
+
+
+@skipUnless(connection.vendor == "sqlite", "EXPLAIN QUERY PLAN output is SQLite specific")
+class QueryPlanTests(TestCase):
+    """
+    Every hot query touching ChurnPrediction must be an index SEARCH,
+    never a full table SCAN.
+    """
+
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="Acme", slug="acme")
+        Customer.objects.bulk_create(
+            Customer(tenant=self.tenant, external_id=str(i), monthly_spend=i % 3, feature_usage_score=i)
+            for i in range(30)
+        )
+        generate_churn_predictions(self.tenant)
+        self.user = User.objects.create_user("owner", password="x", tenant=self.tenant)
+        self.client.force_login(self.user)
+
+    def query_plans(self, func):
+        with CaptureQueriesContext(connection) as ctx:
+            func()
+
+        plans = {}
+        for query in ctx.captured_queries:
+            sql = query["sql"]
+            if "customers_churnprediction" not in sql or sql.startswith("INSERT"):
+                continue
+            with connection.cursor() as cursor:
+                cursor.execute("EXPLAIN QUERY PLAN " + sql)
+                plans[sql] = [row[-1] for row in cursor.fetchall()]
+
+        self.assertTrue(plans)
+        return plans
+
+    def assertNoFullScans(self, func):
+        for sql, plan in self.query_plans(func).items():
+            with self.subTest(sql=sql[:120]):
+                self.assertTrue(any(step.startswith("SEARCH") for step in plan), plan)
+                self.assertFalse(any(step.startswith("SCAN") for step in plan), plan)
+
+    def test_churn_dashboard_uses_indexes(self):
+        self.assertNoFullScans(lambda: self.client.get(reverse("churn_dashboard")))
+
+    def test_high_risk_focus_uses_indexes(self):
+        self.assertNoFullScans(lambda: self.client.get(reverse("high_risk_focus")))
+
+    def test_generate_churn_predictions_uses_indexes(self):
+        self.assertNoFullScans(lambda: generate_churn_predictions(self.tenant))
+
+    def test_incremental_scoring_uses_indexes(self):
+        Customer.objects.filter(external_id="1").update(input_fingerprint="changed")
+        self.assertNoFullScans(lambda: generate_churn_predictions(self.tenant, incremental=True))
+
+
+class DashboardAggregateTests(TestCase):
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="Acme", slug="acme")
+        make_customer_grid(self.tenant)
+        generate_churn_predictions(self.tenant)
+
+    def test_summary_matches_python_totals(self):
+        current = current_predictions(self.tenant)
+        rows = list(current)
+
+        summary = summarize_predictions(current)
+
+        self.assertEqual(summary["total"], len(rows))
+        self.assertAlmostEqual(summary["revenue_at_risk"], sum(p.revenue_at_risk for p in rows))
+        self.assertEqual(summary["has_early_warnings"], any(p.early_warning for p in rows))
+        for level, count in summary["levels"].items():
+            self.assertEqual(count, sum(p.risk_level == level for p in rows))
+        self.assertEqual(summary["trends"]["new"], len(rows))
+
+    def test_top_revenue_at_risk_is_sorted_and_limited(self):
+        top = top_revenue_at_risk(current_predictions(self.tenant), limit=5)
+
+        self.assertEqual(len(top), 5)
+        self.assertEqual([value for _, value in top], sorted((value for _, value in top), reverse=True))
+
+    def test_empty_tenant(self):
+        other = Tenant.objects.create(name="Empty", slug="empty")
+
+        summary = summarize_predictions(current_predictions(other))
+
+        self.assertEqual(summary["total"], 0)
+        self.assertEqual(summary["revenue_at_risk"], 0.0)
+        self.assertFalse(summary["has_early_warnings"])
+
+
+LOCMEM_CACHE = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class DashboardChartTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.tenant = Tenant.objects.create(name="Acme", slug="acme")
+        Customer.objects.create(tenant=self.tenant, external_id="a", monthly_spend=0)
+        Customer.objects.create(tenant=self.tenant, external_id="b", monthly_spend=80, feature_usage_score=5)
+        generate_churn_predictions(self.tenant)
+        self.client.force_login(User.objects.create_user("owner", password="x", tenant=self.tenant))
+
+    def test_plotly_bundle_is_loaded_once_from_static(self):
+        response = self.client.get(reverse("churn_dashboard"))
+        html = response.content.decode()
+
+        self.assertEqual(html.count("plotly.min.js"), 1)
+        self.assertLess(len(html), 200_000)
+
+    def test_only_plotly_min_js_is_served_from_the_plotly_package(self):
+        self.assertTrue(finders.find("plotly/plotly.min.js").endswith("plotly.min.js"))
+        self.assertIsNone(finders.find("plotly/widgetbundle.js"))
+        self.assertIsNone(finders.find("plotly/package_data/plotly.min.js"))
+
+    def test_charts_are_cached_until_next_scoring_run(self):
+        self.client.get(reverse("churn_dashboard"))
+        key = tenant_cache_key(self.tenant, data_version(self.tenant), "churn_charts")
+        self.assertIsNotNone(cache.get(key))
+
+        with patch("customers.analytics.risk_level_distribution") as chart:
+            self.client.get(reverse("churn_dashboard"))
+            chart.assert_not_called()
+
+            generate_churn_predictions(self.tenant)
+            chart.return_value = "<div>chart</div>"
+            self.client.get(reverse("churn_dashboard"))
+            chart.assert_called_once()
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class TenantCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.tenant = Tenant.objects.create(name="Acme", slug="acme")
+        make_customer_grid(self.tenant)
+        generate_churn_predictions(self.tenant)
+        self.client.force_login(User.objects.create_user("owner", password="x", tenant=self.tenant))
+
+    def test_repeat_dashboard_views_skip_prediction_queries(self):
+        self.client.get(reverse("churn_dashboard"))
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse("churn_dashboard"))
+
+        self.assertContains(response, "Customers at Risk")
+        self.assertFalse(any("customers_churnprediction" in q["sql"] for q in ctx.captured_queries))
+
+    def test_sort_and_page_params_are_cached_separately(self):
+        by_score = self.client.get(reverse("churn_dashboard"), {"sort": "risk_score"})
+        by_revenue = self.client.get(reverse("churn_dashboard"), {"sort": "revenue_at_risk"})
+
+        self.assertNotEqual(by_score.content, by_revenue.content)
+
+    def test_imports_scoring_and_stripe_apply_bump_the_version(self):
+        versions = [data_version(self.tenant)]
+
+        import_customers_csv(self.tenant, io.StringIO("external_id,monthly_spend\nnew,10\n"))
+        versions.append(data_version(self.tenant))
+
+        generate_churn_predictions(self.tenant, incremental=True)
+        versions.append(data_version(self.tenant))
+
+        customer = Customer.objects.get(tenant=self.tenant, external_id="new")
+        apply_stripe_billing(self.tenant, [{"matched_customer_id": customer.pk, "mrr": 99.0, "plan": "pro"}])
+        versions.append(data_version(self.tenant))
+
+        self.assertEqual(versions, sorted(set(versions)))
+
+    def test_dashboard_shows_new_data_after_scoring(self):
+        self.client.get(reverse("high_risk_focus"))
+        Customer.objects.create(
+            tenant=self.tenant,
+            external_id="late",
+            email="late@example.com",
+            last_active_date=date.today() - timedelta(days=90),
+            feature_usage_score=0,
+            monthly_spend=900,
+        )
+        generate_churn_predictions(self.tenant, incremental=True)
+
+        response = self.client.get(reverse("high_risk_focus"))
+
+        self.assertContains(response, "late@example.com")
+
+    def test_version_bumped_by_another_process_reaches_this_one(self):
+        self.client.get(reverse("customer_list"))
+        Customer.objects.create(
+            tenant=self.tenant,
+            external_id="from-worker",
+            email="worker@example.com",
+            last_active_date=date.today() + timedelta(days=365),
+        )
+
+        # What a bump in the job worker looks like from here: the row
+        # changes in the database and nothing touches this process's cache.
+        Tenant.objects.filter(pk=self.tenant.pk).update(data_version=F("data_version") + 1)
+
+        self.assertContains(self.client.get(reverse("customer_list")), "worker@example.com")
+        self.assertContains(self.client.get(reverse("customer_list_async")), "worker@example.com")
+
+
+class SqlScoringParityTests(TestCase):
+    FIELDS = (
+        "risk_score",
+        "risk_level",
+        "reasons",
+        "revenue_at_risk",
+        "recommended_action",
+        "risk_trend",
+        "early_warning",
+        "days_in_risk",
+    )
+
+    def setUp(self):
+        self.tenants = {
+            engine: Tenant.objects.create(name=engine, slug=engine) for engine in ("python", "sql")
+        }
+        for tenant in self.tenants.values():
+            make_customer_grid(tenant)
+
+    def score(self, **kwargs):
+        for engine, tenant in self.tenants.items():
+            generate_churn_predictions(tenant, engine=engine, **kwargs)
+
+    def latest(self, engine):
+        return {
+            customer.external_id: tuple(getattr(customer.latest_prediction, f) for f in self.FIELDS)
+            for customer in Customer.objects
+            .filter(tenant=self.tenants[engine])
+            .select_related("latest_prediction")
+        }
+
+    def test_first_run_matches_python_engine(self):
+        self.score()
+
+        self.assertEqual(self.latest("sql"), self.latest("python"))
+
+    def test_trends_and_days_in_risk_match_python_engine(self):
+        self.score()
+        ChurnPrediction.objects.update(created_at=now() - timedelta(days=4))
+        # Move some customers up and some down between runs.
+        Customer.objects.filter(feature_usage_score__lt=20).update(feature_usage_score=100)
+        Customer.objects.filter(feature_usage_score__gte=40, monthly_spend=0).update(feature_usage_score=0)
+
+        self.score()
+
+        sql = self.latest("sql")
+        self.assertEqual(sql, self.latest("python"))
+        trends = {row[self.FIELDS.index("risk_trend")] for row in sql.values()}
+        self.assertEqual(trends, {"improving", "stable", "worsening"})
+
+    def test_incremental_run_matches_python_engine(self):
+        self.score()
+        Customer.objects.filter(external_id="cust-5").update(monthly_spend=0, input_fingerprint="changed")
+
+        self.score(incremental=True)
+
+        self.assertEqual(self.latest("sql"), self.latest("python"))
+        self.assertEqual(
+            ChurnPrediction.objects.filter(tenant=self.tenants["sql"]).count(),
+            ChurnPrediction.objects.filter(tenant=self.tenants["python"]).count(),
+        )
+
+    def test_sql_engine_runs_a_constant_number_of_queries(self):
+        tenant = self.tenants["sql"]
+        with CaptureQueriesContext(connection) as ctx:
+            written = generate_churn_predictions(tenant, engine="sql")
+
+        self.assertEqual(written, Customer.objects.filter(tenant=tenant).count())
+        # Includes taking and releasing the scoring lock (four queries) and
+        # refreshing TenantDailyMetrics (up to seven on the day's first run).
+        self.assertLessEqual(len(ctx.captured_queries), 17)
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="Acme", slug="acme")
+        today = date.today()
+        Customer.objects.bulk_create(
+            Customer(
+                tenant=self.tenant,
+                external_id=f"c{i}",
+                # Plenty of ties and NULLs to exercise the (value, pk) key.
+                last_active_date=today - timedelta(days=i % 7) if i % 5 else None,
+                monthly_spend=i % 4 * 10,
+                feature_usage_score=i % 50,
+            )
+            for i in range(53)
+        )
+        generate_churn_predictions(self.tenant)
+        self.client.force_login(User.objects.create_user("owner", password="x", tenant=self.tenant))
+
+    def walk(self, queryset, field, descending):
+        seen, cursor = [], None
+        while True:
+            items, cursor, _ = keyset_paginate(queryset, field, descending, cursor, page_size=10)
+            seen.extend(item.pk for item in items)
+            if not cursor:
+                return seen
+
+    def test_walks_every_row_once_in_sort_order(self):
+        customers = Customer.objects.filter(tenant=self.tenant)
+        for field in ("last_active_date", "latest_prediction__risk_score"):
+            for descending in (True, False):
+                with self.subTest(field=field, descending=descending):
+                    seen = self.walk(customers, field, descending)
+                    self.assertEqual(len(seen), len(set(seen)))
+                    self.assertEqual(len(seen), customers.count())
+
+                    by_pk = {c.pk: c for c in customers.select_related("latest_prediction")}
+                    values = [by_pk[pk] for pk in seen]
+                    keys = [
+                        c.last_active_date if field == "last_active_date" else c.latest_prediction.risk_score
+                        for c in values
+                    ]
+                    non_null = [k for k in keys if k is not None]
+                    self.assertEqual(non_null, sorted(non_null, reverse=descending))
+                    self.assertEqual(keys[len(non_null):], [None] * (len(keys) - len(non_null)))
+
+    def test_previous_cursor_returns_previous_page(self):
+        customers = Customer.objects.filter(tenant=self.tenant)
+        first, next_cursor, _ = keyset_paginate(customers, "last_active_date", True, None, 10)
+        second, _, prev_cursor = keyset_paginate(customers, "last_active_date", True, next_cursor, 10)
+        back, _, _ = keyset_paginate(customers, "last_active_date", True, prev_cursor, 10)
+
+        self.assertNotEqual([c.pk for c in first], [c.pk for c in second])
+        self.assertEqual([c.pk for c in back], [c.pk for c in first])
+
+    def test_page_query_count_does_not_depend_on_page(self):
+        url = reverse("churn_dashboard") + "?sort=revenue_at_risk&page_size=10"
+        response = self.client.get(url)
+        self.assertEqual(len(response.context["predictions"]), 10)
+
+        with CaptureQueriesContext(connection) as first_page:
+            self.client.get(url)
+        with CaptureQueriesContext(connection) as next_page:
+            response = self.client.get(
+                reverse("churn_dashboard") + response.context["predictions"].next_url
+            )
+
+        self.assertEqual(len(response.context["predictions"]), 10)
+        self.assertEqual(len(first_page), len(next_page))
+        self.assertNotIn("OFFSET", next_page.captured_queries[-1]["sql"])
+
+    def test_customer_list_sorts_and_pages(self):
+        response = self.client.get(reverse("customer_list") + "?sort=risk_score&dir=asc&page_size=5")
+
+        page = response.context["customers"]
+        scores = [c.latest_prediction.risk_score for c in page]
+        self.assertEqual(len(scores), 5)
+        self.assertEqual(scores, sorted(scores))
+        self.assertIsNotNone(page.next_url)
+
+    def test_invalid_cursor_falls_back_to_first_page(self):
+        response = self.client.get(reverse("customer_list") + "?cursor=not-a-cursor")
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_cursor_value_of_the_wrong_type_falls_back_to_first_page(self):
+        for sort, value in (("risk_score", "abc"), ("last_active", "zz")):
+            with self.subTest(sort=sort):
+                cursor = encode_cursor(value, 1)
+                response = self.client.get(reverse("customer_list"), {"sort": sort, "cursor": cursor})
+
+                self.assertEqual(response.status_code, 200)
+                self.assertIsNone(response.context["customers"].prev_url)
+
+
+class PredictionRetentionTests(TestCase):
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="Acme", slug="acme")
+        self.customer = Customer.objects.create(tenant=self.tenant, external_id="a", monthly_spend=0)
+        self.other = Customer.objects.create(tenant=self.tenant, external_id="b", feature_usage_score=5)
+        # Three runs a day for 30 days, then one run today.
+        start = (now() - timedelta(days=30)).replace(hour=0, minute=0, second=0, microsecond=0)
+        for day in range(30):
+            for hour in (1, 9, 17):
+                last_id = ChurnPrediction.objects.aggregate(Max("id"))["id__max"] or 0
+                generate_churn_predictions(self.tenant)
+                ChurnPrediction.objects.filter(id__gt=last_id).update(
+                    created_at=start + timedelta(days=day, hours=hour)
+                )
+        generate_churn_predictions(self.tenant)
+
+    def semantics(self):
+        return {
+            customer.pk: (
+                customer.latest_prediction_id,
+                customer.churn_predictions.order_by("created_at").first().created_at,
+            )
+            for customer in Customer.objects.filter(tenant=self.tenant)
+        }
+
+    def test_daily_rollup_keeps_one_snapshot_per_day(self):
+        before = self.semantics()
+
+        report = prune_prediction_history(self.tenant, detail_days=10, granularity="daily", batch_size=7)
+
+        self.assertEqual(self.semantics(), before)
+        cutoff = now() - timedelta(days=10)
+        old = ChurnPrediction.objects.filter(customer=self.customer, created_at__lt=cutoff)
+        days = [p.created_at.date() for p in old.order_by("created_at")]
+        # The first-ever row plus one snapshot (the last run) for each older day.
+        self.assertEqual(len(days), len(set(days)) + 1)
+        self.assertEqual(report["deleted"], report["scanned"] - 2 * old.count())
+
+        # Recent history is untouched.
+        recent = ChurnPrediction.objects.filter(customer=self.customer, created_at__gte=cutoff).count()
+        self.assertGreater(recent, 25)
+
+        # A second pass has nothing left to roll up.
+        self.assertEqual(prune_prediction_history(self.tenant, 10, "daily")["deleted"], 0)
+
+    def test_trend_and_days_in_risk_survive_pruning(self):
+        prune_prediction_history(self.tenant, detail_days=0, granularity="weekly")
+        generate_churn_predictions(self.tenant)
+
+        newest = self.customer.churn_predictions.order_by("-id").first()
+        self.assertEqual(newest.risk_trend, "stable")
+        self.assertEqual(newest.days_in_risk, 30)
+
+    def test_dry_run_deletes_nothing(self):
+        count = ChurnPrediction.objects.count()
+
+        out = io.StringIO()
+        call_command("prune_churn_predictions", "--detail-days=5", "--dry-run", stdout=out)
+
+        self.assertEqual(ChurnPrediction.objects.count(), count)
+        self.assertIn("Would delete", out.getvalue())
+
+
+class StripeSyncTests(TestCase):
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="Acme", slug="acme")
+
+    def test_full_sync_pages_both_listings_and_computes_mrr(self):
+        client = FakeStripeClient.generate(customers=250)
+
+        entries = fetch_stripe_customers_with_mrr(limit=100, client=client)
+
+        self.assertEqual(len(entries), 250)
+        self.assertEqual(client.Customer.requests, 3)
+        subscribed = [e for e in entries if e["plan"]]
+        self.assertEqual(len(subscribed), len(client.Subscription.objects))
+        self.assertTrue(all(e["mrr"] > 0 for e in subscribed))
+
+    def test_yearly_price_is_spread_over_twelve_months(self):
+        client = FakeStripeClient(
+            customers=[{"id": "cus_1", "name": "a", "email": "a@example.com", "created": 1}],
+            subscriptions=[
+                {
+                    "id": "sub_1",
+                    "customer": "cus_1",
+                    "status": "active",
+                    "created": 2,
+                    "items": {"data": [{"quantity": 2, "price": {
+                        "nickname": "Annual",
+                        "unit_amount": 120000,
+                        "recurring": {"interval": "year", "interval_count": 1},
+                    }}]},
+                }
+            ],
+        )
+
+        [entry] = fetch_stripe_customers_with_mrr(client=client)
+
+        self.assertEqual(entry["mrr"], 200.0)
+        self.assertEqual(entry["plan"], "Annual")
+
+    def test_listings_are_fetched_concurrently(self):
+        client = FakeStripeClient.generate(customers=40)
+        # Each listing's first page waits for the other's; fetched one after
+        # the other, the first wait would time out.
+        barrier = threading.Barrier(2, timeout=5)
+        for resource in (client.Customer, client.Subscription):
+            def list_together(list_page=resource.list, **params):
+                if not params.get("starting_after"):
+                    barrier.wait()
+                return list_page(**params)
+            resource.list = list_together
+
+        entries = fetch_stripe_customers_with_mrr(limit=10, client=client)
+
+        self.assertEqual(len(entries), 40)
+        self.assertFalse(barrier.broken)
+
+    def test_incremental_sync_fetches_only_new_objects(self):
+        client = FakeStripeClient.generate(customers=30)
+        checkpoint = StripeSyncCheckpoint(tenant=self.tenant)
+
+        self.assertEqual(len(fetch_stripe_customers_with_mrr(client=client, checkpoint=checkpoint)), 30)
+        checkpoint.save()
+        self.assertEqual(fetch_stripe_customers_with_mrr(client=client, checkpoint=checkpoint), [])
+
+        client.add_customer({"id": "cus_new", "name": "new", "email": "new@example.com", "created": 2_000_000_000})
+        entries = fetch_stripe_customers_with_mrr(client=client, checkpoint=checkpoint)
+
+        self.assertEqual([e["stripe_customer_id"] for e in entries], ["cus_new"])
+        self.assertEqual(checkpoint.customers_created_after, 2_000_000_000)
+
+    def test_incremental_sync_keeps_objects_created_in_the_checkpoint_second(self):
+        client = FakeStripeClient(
+            customers=[{"id": "cus_1", "name": "a", "email": "a@example.com", "created": 100}]
+        )
+        checkpoint = StripeSyncCheckpoint(tenant=self.tenant)
+        fetch_stripe_customers_with_mrr(client=client, checkpoint=checkpoint)
+
+        client.add_customer({"id": "cus_2", "name": "b", "email": "b@example.com", "created": 100})
+        entries = fetch_stripe_customers_with_mrr(client=client, checkpoint=checkpoint)
+
+        self.assertEqual([e["stripe_customer_id"] for e in entries], ["cus_2"])
+        self.assertEqual(checkpoint.customers_seen_ids, ["cus_1", "cus_2"])
+        self.assertEqual(fetch_stripe_customers_with_mrr(client=client, checkpoint=checkpoint), [])
+
+    def test_incremental_sync_fetches_older_customers_of_new_subscriptions(self):
+        client = FakeStripeClient.generate(customers=3)
+        checkpoint = StripeSyncCheckpoint(tenant=self.tenant)
+        fetch_stripe_customers_with_mrr(client=client, checkpoint=checkpoint)
+
+        client.add_subscription({
+            "id": "sub_new",
+            "customer": "cus_00000000",
+            "status": "active",
+            "created": 2_000_000_000,
+            "items": {"data": [{"quantity": 1, "price": {"nickname": "Pro", "unit_amount": 5000}}]},
+        })
+        [entry] = fetch_stripe_customers_with_mrr(client=client, checkpoint=checkpoint)
+
+        self.assertEqual(entry["email"], "customer0@example.com")
+        self.assertEqual(entry["mrr"], 50.0)
+
+
+class StripeMatchingTests(TestCase):
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="Acme", slug="acme")
+        self.other = Tenant.objects.create(name="Other", slug="other")
+        self.by_email = Customer.objects.create(tenant=self.tenant, external_id="x1", email="Ann@Example.com")
+        self.by_name = Customer.objects.create(tenant=self.tenant, external_id="Bob-Co")
+        Customer.objects.create(tenant=self.other, external_id="zed", email="zed@example.com")
+
+    def test_matches_case_insensitively_within_tenant(self):
+        entries = [
+            {"stripe_customer_id": "cus_1", "email": "ann@EXAMPLE.com", "name": "", "mrr": 10.0},
+            {"stripe_customer_id": "cus_2", "email": "nobody@example.com", "name": "bob-co", "mrr": 0.0},
+            {"stripe_customer_id": "cus_3", "email": "zed@example.com", "name": "zed", "mrr": 0.0},
+        ]
+
+        mapped = map_stripe_customers_to_internal(entries, self.tenant)
+
+        self.assertEqual(mapped[0]["matched_customer_id"], self.by_email.id)
+        self.assertEqual(mapped[0]["matched_customer_name"], "x1 (Acme)")
+        self.assertEqual(mapped[1]["matched_customer_id"], self.by_name.id)
+        self.assertIsNone(mapped[2]["matched_customer_id"])
+
+    def test_query_count_is_constant(self):
+        entries = [
+            {"stripe_customer_id": f"cus_{i}", "email": f"u{i}@example.com", "name": f"n{i}"}
+            for i in range(200)
+        ]
+
+        with CaptureQueriesContext(connection) as ctx:
+            map_stripe_customers_to_internal(entries, self.tenant)
+
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+
+class StripeApplyTests(TestCase):
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="Acme", slug="acme")
+        self.paying = Customer.objects.create(
+            tenant=self.tenant, external_id="paying", email="paying@example.com",
+            monthly_spend=29.0, subscription_type="Monthly",
+        )
+        self.downgraded = Customer.objects.create(
+            tenant=self.tenant, external_id="downgraded", email="down@example.com",
+            monthly_spend=99.0, subscription_type="Pro",
+        )
+        self.untouched = Customer.objects.create(tenant=self.tenant, external_id="untouched")
+        generate_churn_predictions(self.tenant)
+
+    def test_apply_writes_only_changed_rows_and_rescores_them(self):
+        mapped = [
+            {"matched_customer_id": self.paying.id, "mrr": 29.0, "plan": "Monthly"},
+            {"matched_customer_id": self.downgraded.id, "mrr": 0.0, "plan": None},
+            {"matched_customer_id": None, "mrr": 50.0, "plan": "Monthly"},
+        ]
+        before = ChurnPrediction.objects.aggregate(Max("id"))["id__max"]
+
+        summary = apply_stripe_billing(self.tenant, mapped)
+
+        self.assertEqual(summary, {"matched": 2, "updated": 1, "rescored": 1})
+        self.downgraded.refresh_from_db()
+        self.assertEqual(self.downgraded.monthly_spend, 0.0)
+        self.assertEqual(self.downgraded.subscription_type, "Pro")
+        new = ChurnPrediction.objects.filter(id__gt=before)
+        self.assertEqual(list(new.values_list("customer_id", flat=True)), [self.downgraded.id])
+        self.assertIn("Free plan user", new.get().reasons)
+
+    def test_command_apply(self):
+        client = FakeStripeClient(
+            customers=[{"id": "cus_1", "name": "", "email": "PAYING@example.com", "created": 1}],
+            subscriptions=[{
+                "id": "sub_1", "customer": "cus_1", "status": "active", "created": 2,
+                "items": {"data": [{"price": {"nickname": "Annual", "unit_amount": 60000,
+                                              "recurring": {"interval": "year"}}}]},
+            }],
+        )
+        out = io.StringIO()
+
+        with patch("customers.stripe_sync._get_stripe_client", return_value=client):
+            call_command("sync_stripe_customers", "--tenant=acme", "--apply", "--incremental", stdout=out)
+
+        self.paying.refresh_from_db()
+        self.assertEqual(self.paying.monthly_spend, 50.0)
+        self.assertEqual(self.paying.subscription_type, "Annual")
+        self.assertIn("1 updated, 1 rescored", out.getvalue())
+        self.assertEqual(StripeSyncCheckpoint.objects.get(tenant=self.tenant).customers_created_after, 1)
+
+
+    def test_incremental_apply_counts_every_active_subscription(self):
+        def subscription(id, created, unit_amount):
+            return {
+                "id": id, "customer": "cus_1", "status": "active", "created": created,
+                "items": {"data": [{"price": {"nickname": "Monthly", "unit_amount": unit_amount,
+                                              "recurring": {"interval": "month"}}}]},
+            }
+
+        client = FakeStripeClient(
+            customers=[{"id": "cus_1", "name": "", "email": "paying@example.com", "created": 1}],
+            subscriptions=[subscription("sub_1", 2, 10000)],
+        )
+        with patch("customers.stripe_sync._get_stripe_client", return_value=client):
+            call_command("sync_stripe_customers", "--tenant=acme", "--apply", "--incremental", stdout=io.StringIO())
+            client.add_subscription(subscription("sub_2", 3, 500))
+            call_command("sync_stripe_customers", "--tenant=acme", "--apply", "--incremental", stdout=io.StringIO())
+
+        self.paying.refresh_from_db()
+        self.assertEqual(self.paying.monthly_spend, 105.0)
+        latest = self.paying.latest_prediction
+        self.assertAlmostEqual(latest.revenue_at_risk, latest.risk_score * 105.0)
+
+
+class BenchmarkCommandTests(TestCase):
+    def test_generate_and_benchmark_synthetic_tenant(self):
+        call_command("generate_synthetic_tenant", "--slug=bench", "--customers=40", "--runs=2", stdout=io.StringIO())
+
+        tenant = Tenant.objects.get(slug="bench")
+        self.assertEqual(Customer.objects.filter(tenant=tenant).count(), 40)
+        self.assertEqual(ChurnPrediction.objects.filter(tenant=tenant).count(), 80)
+
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, "bench.json")
+            call_command("run_benchmarks", "--tenant=bench", f"--output={output}", stdout=io.StringIO())
+            with open(output) as handle:
+                report = json.load(handle)
+
+        names = [result["name"] for result in report["results"]]
+        self.assertEqual(names, [
+            "csv_import",
+            "generate_churn_predictions",
+            "generate_churn_predictions_sql",
+            "churn_dashboard_view",
+            "high_risk_focus_view",
+            "stripe_mapping",
+        ])
+        for result in report["results"]:
+            self.assertGreater(result["queries"], 0)
+            self.assertGreater(result["peak_memory_bytes"], 0)
+
+
+class ScoreAllTenantsTests(TestCase):
+    def setUp(self):
+        self.small = Tenant.objects.create(name="Small", slug="small")
+        self.large = Tenant.objects.create(name="Large", slug="large")
+        Customer.objects.create(tenant=self.small, external_id="s1")
+        make_customer_grid(self.large)
+
+    def test_scores_every_tenant_largest_first(self):
+        out = io.StringIO()
+        call_command("score_all_tenants", "--workers=1", stdout=out)
+
+        lines = out.getvalue().splitlines()
+        self.assertTrue(lines[0].startswith("large"))
+        self.assertTrue(lines[1].startswith("small"))
+        self.assertIn("2 of 2 tenants scored", lines[-1])
+        for tenant in (self.small, self.large):
+            self.assertEqual(
+                ChurnPrediction.objects.filter(tenant=tenant).count(),
+                Customer.objects.filter(tenant=tenant).count(),
+            )
+        self.assertFalse(ScoringLock.objects.exists())
+
+    def test_locked_tenants_are_skipped(self):
+        self.assertTrue(acquire_scoring_lock(self.large.pk, "other-run"))
+
+        results = score_all_tenants(workers=1)
+
+        self.assertEqual([r["status"] for r in results], ["locked", "scored"])
+        self.assertFalse(ChurnPrediction.objects.filter(tenant=self.large).exists())
+        self.assertEqual(ScoringLock.objects.get().owner, "other-run")
+
+    def test_stale_locks_are_taken_over(self):
+        acquire_scoring_lock(self.large.pk, "crashed-run")
+        ScoringLock.objects.update(heartbeat_at=now() - timedelta(hours=2))
+
+        results = score_all_tenants(workers=1, slugs=["large"])
+
+        self.assertEqual(results[0]["status"], "scored")
+
+    def test_long_runs_with_a_heartbeat_keep_their_lock(self):
+        acquire_scoring_lock(self.large.pk, "long-run")
+        ScoringLock.objects.update(acquired_at=now() - timedelta(hours=2))
+        self.assertTrue(refresh_scoring_lock(self.large.pk, "long-run"))
+
+        results = score_all_tenants(workers=1, slugs=["large"])
+
+        self.assertEqual(results[0]["status"], "locked")
+
+    def test_heartbeat_interval_does_not_depend_on_the_holders_threshold(self):
+        with patch("customers.scoring_locks.LockHeartbeat") as heartbeat:
+            generate_churn_predictions(self.small, lock_stale_after=timedelta(hours=6))
+
+        self.assertEqual(heartbeat.call_args.args[2], LOCK_HEARTBEAT_INTERVAL.total_seconds())
+        self.assertLess(LOCK_HEARTBEAT_INTERVAL * 4, MIN_STALE_LOCK_AFTER)
+
+    def test_stale_thresholds_below_the_minimum_are_rejected(self):
+        with self.assertRaises(ValueError):
+            generate_churn_predictions(self.small, lock_stale_after=timedelta(minutes=1))
+        with self.assertRaises(CommandError):
+            call_command("score_all_tenants", "--workers=1", "--stale-lock-minutes=1", stdout=io.StringIO())
+
+        self.assertFalse(ChurnPrediction.objects.exists())
+
+    def test_every_scoring_run_takes_the_lock(self):
+        acquire_scoring_lock(self.large.pk, "other-run")
+
+        with self.assertRaises(ScoringLockHeld):
+            generate_churn_predictions(self.large, lock_wait=timedelta(0))
+        with self.assertRaises(ScoringLockHeld):
+            generate_churn_predictions(self.large, engine="sql", lock_wait=timedelta(0))
+
+        self.assertFalse(ChurnPrediction.objects.filter(tenant=self.large).exists())
+        generate_churn_predictions(self.small)
+        self.assertEqual(ScoringLock.objects.get().owner, "other-run")
+
+    def test_process_pool(self):
+        # Forked workers score their own copy of the in-memory test
+        # database, so only the returned results can be checked here.
+        results = score_all_tenants(workers=2)
+
+        self.assertEqual([r["slug"] for r in results], ["large", "small"])
+        self.assertEqual([r["status"] for r in results], ["scored", "scored"])
+        self.assertEqual(
+            [r["predictions"] for r in results],
+            [Customer.objects.filter(tenant=tenant).count() for tenant in (self.large, self.small)],
+        )
+
+
+def normalize_page(response):
+    """
+    Page HTML without the per-response parts: plotly's random chart div
+    ids and the CSRF token.
+    """
+    html = response.content.decode()
+    html = re.sub(r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}", "", html)
+    return re.sub(r'name="csrfmiddlewaretoken" value="[^"]+"', "", html)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.tenant = Tenant.objects.create(name="Acme", slug="acme")
+        make_customer_grid(self.tenant)
+        generate_churn_predictions(self.tenant)
+        self.user = User.objects.create_user("owner", password="x", tenant=self.tenant)
+
+    async def test_async_pages_match_sync_pages(self):
+        await self.async_client.aforce_login(self.user)
+        await sync_to_async(self.client.force_login)(self.user)
+        params = {"sort": "revenue_at_risk", "page_size": "7"}
+
+        for name in ("churn_dashboard", "high_risk_focus", "customer_list"):
+            await cache.aclear()
+            async_response = await self.async_client.get(reverse(f"{name}_async"), params)
+            await cache.aclear()
+            sync_response = await sync_to_async(self.client.get)(reverse(name), params)
+
+            self.assertEqual(async_response.status_code, 200)
+            self.assertEqual(normalize_page(async_response), normalize_page(sync_response))
+
+    async def test_async_views_require_login(self):
+        response = await self.async_client.get(reverse("churn_dashboard_async"))
+
+        self.assertEqual(response.status_code, 302)
+
+
+class PredictionExportTests(TestCase):
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="Acme", slug="acme")
+        make_customer_grid(self.tenant)
+        generate_churn_predictions(self.tenant)
+        generate_churn_predictions(self.tenant)
+        Customer.objects.create(tenant=self.tenant, external_id="unscored")
+        other = Tenant.objects.create(name="Other", slug="other")
+        Customer.objects.create(tenant=other, external_id="other-1")
+        generate_churn_predictions(other)
+        self.client.force_login(User.objects.create_user("owner", password="x", tenant=self.tenant))
+
+    def read_csv(self, text):
+        return list(csv.DictReader(io.StringIO(text)))
+
+    def test_csv_export_streams_current_predictions(self):
+        response = self.client.get(reverse("export_predictions_csv"))
+
+        self.assertTrue(response.streaming)
+        self.assertIn("attachment;", response["Content-Disposition"])
+        rows = self.read_csv(b"".join(response.streaming_content).decode())
+        current = {
+            c.external_id: c.latest_prediction
+            for c in Customer.objects.filter(tenant=self.tenant, latest_prediction__isnull=False)
+            .select_related("latest_prediction")
+        }
+        self.assertEqual({row["external_id"] for row in rows}, set(current))
+        for row in rows:
+            prediction = current[row["external_id"]]
+            self.assertEqual(float(row["risk_score"]), prediction.risk_score)
+            self.assertEqual(row["reasons"], "; ".join(prediction.reasons))
+
+    def test_gzip_export_matches_csv_export(self):
+        plain = b"".join(self.client.get(reverse("export_predictions_csv")).streaming_content)
+
+        response = self.client.get(reverse("export_predictions_csv_gz"))
+
+        self.assertEqual(response["Content-Type"], "application/gzip")
+        self.assertTrue(response["Content-Disposition"].endswith('.csv.gz"'))
+        self.assertEqual(gzip.decompress(b"".join(response.streaming_content)), plain)
+
+    def test_large_exports_are_sent_in_chunks(self):
+        rows = [("c",) * len(EXPORT_COLUMNS)] * 20000
+        chunks = list(csv_chunks(iter(rows)))
+
+        self.assertGreater(len(chunks), 1)
+        self.assertTrue(all(len(chunk) < EXPORT_BUFFER_SIZE * 2 for chunk in chunks))
+
+
+@skipUnless(pa is not None, "pyarrow is not installed")
+class ColumnarImportTests(TestCase):
+    CSV = (
+        "External_ID,email,signup_date,last_active_date,monthly_spend,feature_usage_score,churned\n"
+        "a,a@example.com,2024-01-02,2024-03-04,49.5,12,yes\n"
+        "b,b@example.com,not-a-date,,abc,,0\n"
+        " ,missing@example.com,,,,,\n"
+        "c,c@example.com,,,,,\n"
+        "c,c2@example.com,,,,,true\n"
+    )
+
+    def setUp(self):
+        use_temporary_media_root(self)
+        self.tenant = Tenant.objects.create(name="Acme", slug="acme")
+        self.directory = temporary_directory(self)
+        self.table = pa_csv.read_csv(
+            io.BytesIO(self.CSV.encode()),
+            convert_options=pa_csv.ConvertOptions(column_types={
+                name: pa.string() for name in ("signup_date", "monthly_spend", "churned")
+            }),
+        )
+
+    def write(self, table, fmt):
+        path = os.path.join(self.directory, f"customers.{fmt}")
+        if fmt == "parquet":
+            pq.write_table(table, path)
+        else:
+            with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        return path
+
+    def customers(self, tenant):
+        fields = ("external_id", "email", "signup_date", "last_active_date", "monthly_spend", "feature_usage_score", "churned")
+        return sorted(Customer.objects.filter(tenant=tenant).values_list(*fields))
+
+    def test_parquet_and_arrow_match_csv_import(self):
+        csv_tenant = Tenant.objects.create(name="Csv", slug="csv")
+        csv_report = import_customers_csv(csv_tenant, io.StringIO(self.CSV))
+
+        for fmt in ("parquet", "arrow"):
+            with self.subTest(fmt=fmt):
+                Customer.objects.filter(tenant=self.tenant).delete()
+                report = import_customers_columnar(self.tenant, self.write(self.table, fmt), fmt, chunk_size=2)
+
+                self.assertEqual(report, csv_report)
+                self.assertEqual(self.customers(self.tenant), self.customers(csv_tenant))
+
+    def test_typed_columns_are_used_as_is(self):
+        table = pa.table({
+            "external_id": pa.array([1, 2]),
+            "last_active_date": pa.array([date(2024, 5, 6), None], pa.date32()),
+            "monthly_spend": pa.array([10, None], pa.int64()),
+            "churned": pa.array([True, None]),
+        })
+
+        import_customers_columnar(self.tenant, self.write(table, "parquet"), "parquet")
+
+        first = Customer.objects.get(tenant=self.tenant, external_id="1")
+        self.assertEqual(first.last_active_date, date(2024, 5, 6))
+        self.assertEqual(first.monthly_spend, 10.0)
+        self.assertTrue(first.churned)
+        self.assertFalse(Customer.objects.get(tenant=self.tenant, external_id="2").churned)
+
+    def test_missing_required_columns(self):
+        path = self.write(pa.table({"email": ["x@example.com"]}), "arrow")
+
+        with self.assertRaises(CustomerImportError):
+            import_customers_columnar(self.tenant, path, "arrow")
+
+    def test_unconvertible_column_types_raise_import_errors(self):
+        table = pa.table({"external_id": pa.array([{"id": 1}, {"id": 2}])})
+
+        for fmt in ("parquet", "arrow"):
+            with self.subTest(fmt=fmt):
+                with self.assertRaises(CustomerImportError):
+                    import_customers_columnar(self.tenant, self.write(table, fmt), fmt)
+
+    def test_memory_mapped_file_is_closed_after_the_import(self):
+        path = self.write(self.table, "arrow")
+        memory_map = pa.memory_map
+        opened = []
+
+        def recording_memory_map(*args, **kwargs):
+            opened.append(memory_map(*args, **kwargs))
+            return opened[-1]
+
+        with patch.object(pa, "memory_map", recording_memory_map):
+            import_customers_columnar(self.tenant, path, "arrow")
+
+        self.assertEqual(len(opened), 1)
+        self.assertTrue(opened[0].closed)
+
+    def test_parquet_upload_runs_through_the_job_queue(self):
+        self.client.force_login(User.objects.create_user("owner", password="x", tenant=self.tenant))
+        with open(self.write(self.table, "parquet"), "rb") as handle:
+            upload = SimpleUploadedFile("warehouse.parquet", handle.read())
+        self.client.post(reverse("customer_upload"), {"file": upload})
+
+        job = run_next_job()
+
+        self.assertEqual(job.status, Job.STATUS_SUCCEEDED)
+        self.assertEqual(job.result, {"created": 3, "updated": 1, "unchanged": 0, "skipped": 1})
+
+    def test_unknown_upload_types_are_rejected(self):
+        self.client.force_login(User.objects.create_user("owner", password="x", tenant=self.tenant))
+
+        response = self.client.post(
+            reverse("customer_upload"), {"file": SimpleUploadedFile("customers.xlsx", b"x")}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Job.objects.exists())
+
+
+class ChunkedUploadTests(TestCase):
+    CSV = b"external_id,monthly_spend\na,0\nb,99\n,1\n"
+
+    def setUp(self):
+        use_temporary_media_root(self)
+        self.tenant = Tenant.objects.create(name="Acme", slug="acme")
+        self.client.force_login(User.objects.create_user("owner", password="x", tenant=self.tenant))
+
+    def start(self, filename="customers.csv", total_size=len(CSV)):
+        return self.client.post(
+            reverse("chunked_upload_start"), {"filename": filename, "total_size": total_size}
+        )
+
+    def send(self, upload_id, offset, part):
+        return self.client.put(
+            reverse("chunked_upload_detail", args=[upload_id]),
+            part,
+            content_type="application/octet-stream",
+            headers={"Upload-Offset": str(offset)},
+        )
+
+    def complete(self, upload_id):
+        return self.client.post(reverse("chunked_upload_complete", args=[upload_id]))
+
+    def test_parts_are_assembled_and_imported(self):
+        upload_id = self.start().json()["id"]
+
+        self.assertEqual(self.send(upload_id, 0, self.CSV[:10]).json()["offset"], 10)
+        self.assertEqual(self.send(upload_id, 10, self.CSV[10:]).json()["offset"], len(self.CSV))
+        response = self.complete(upload_id)
+
+        job = Job.objects.get(tenant=self.tenant)
+        self.assertEqual(response.json()["job_url"], reverse("job_status", args=[job.id]))
+        with job.upload.open("rb") as stored:
+            self.assertEqual(stored.read(), self.CSV)
+
+        job = run_next_job()
+
+        self.assertEqual(job.status, Job.STATUS_SUCCEEDED)
+        self.assertEqual(job.result, {"created": 2, "updated": 0, "unchanged": 0, "skipped": 1})
+        self.assertFalse(job.upload)
+
+    def test_resume_after_a_lost_part(self):
+        upload_id = self.start().json()["id"]
+        self.send(upload_id, 0, self.CSV[:10])
+
+        # The client missed the response for this part and retries from 0.
+        response = self.send(upload_id, 0, self.CSV[:10])
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()["offset"], 10)
+        state = self.client.get(reverse("chunked_upload_detail", args=[upload_id])).json()
+        self.assertEqual(state["offset"], 10)
+
+        self.send(upload_id, state["offset"], self.CSV[10:])
+        self.complete(upload_id)
+        with Job.objects.get(tenant=self.tenant).upload.open("rb") as stored:
+            self.assertEqual(stored.read(), self.CSV)
+
+    def test_incomplete_upload_cannot_be_completed(self):
+        upload_id = self.start().json()["id"]
+        self.send(upload_id, 0, self.CSV[:10])
+
+        response = self.complete(upload_id)
+
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(Job.objects.exists())
+
+    @override_settings(CHUNKED_UPLOAD_MAX_PART_SIZE=8)
+    def test_oversized_parts_are_rejected(self):
+        upload_id = self.start().json()["id"]
+
+        response = self.send(upload_id, 0, self.CSV[:10])
+
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(response.json()["offset"], 0)
+
+    def test_unknown_file_types_are_rejected(self):
+        response = self.start(filename="customers.xlsx")
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_uploads_are_tenant_scoped(self):
+        upload_id = self.start().json()["id"]
+        other = Tenant.objects.create(name="Other", slug="other")
+        self.client.force_login(User.objects.create_user("intruder", password="x", tenant=other))
+
+        self.assertEqual(self.send(upload_id, 0, self.CSV).status_code, 404)
+
+    def test_concurrent_part_for_the_same_offset_is_rejected(self):
+        upload = ChunkedUpload.objects.get(pk=self.start().json()["id"])
+        self.send(upload.pk, 0, self.CSV[:10])
+
+        # upload still says offset 0, like a request that read the row
+        # before the part above was recorded.
+        with self.assertRaises(ChunkedUploadError) as raised:
+            append_part(upload, 0, io.BytesIO(self.CSV[:5]), 5)
+
+        self.assertEqual(raised.exception.status, 409)
+        upload.refresh_from_db()
+        self.assertEqual(upload.received_bytes, 10)
+
+    def test_prune_removes_stale_uploads_and_their_files(self):
+        stale = ChunkedUpload.objects.get(pk=self.start().json()["id"])
+        self.send(stale.pk, 0, self.CSV[:10])
+        fresh_id = self.start().json()["id"]
+        ChunkedUpload.objects.filter(pk=stale.pk).update(updated_at=now() - timedelta(days=2))
+
+        call_command("prune_chunked_uploads", stdout=io.StringIO())
+
+        self.assertEqual(list(ChunkedUpload.objects.values_list("pk", flat=True)), [fresh_id])
+        self.assertFalse(os.path.exists(stale.file.path))
+
+
+class TenantDailyMetricsTests(TestCase):
+    def setUp(self):
+        self.tenant = Tenant.objects.create(name="Acme", slug="acme")
+        make_customer_grid(self.tenant)
+
+    def test_scoring_engines_record_the_same_metrics(self):
+        other = Tenant.objects.create(name="Other", slug="other")
+        make_customer_grid(other)
+
+        generate_churn_predictions(self.tenant, engine="python")
+        generate_churn_predictions(other, engine="sql")
+
+        fields = [
+            field.name for field in TenantDailyMetrics._meta.fields
+            if field.name not in ("id", "tenant", "updated_at")
+        ]
+        python_metrics, sql_metrics = (
+            TenantDailyMetrics.objects.filter(tenant=tenant).values(*fields).get()
+            for tenant in (self.tenant, other)
+        )
+        self.assertEqual(python_metrics, sql_metrics)
+
+        summary = summarize_predictions(current_predictions(self.tenant))
+        self.assertEqual(python_metrics["scored_customers"], summary["total"])
+        self.assertEqual(python_metrics["level_high"], summary["levels"]["high"])
+        at_risk = summary["levels"]["high"] + summary["levels"]["medium"]
+        self.assertEqual(python_metrics["customers_at_risk"], at_risk)
+        self.assertEqual(python_metrics["new_risks"], at_risk)
+        self.assertEqual(python_metrics["resolved_risks"], 0)
+
+    def test_new_and_resolved_risks_add_up_over_the_day(self):
+        generate_churn_predictions(self.tenant)
+        first = TenantDailyMetrics.objects.get(tenant=self.tenant)
+        recovering = (
+            Customer.objects
+            .filter(tenant=self.tenant, latest_prediction__risk_level__in=("medium", "high"))
+            .first()
+        )
+        slipping = Customer.objects.filter(tenant=self.tenant, latest_prediction__risk_level="low").first()
+        for customer, active, usage, spend in (
+            (recovering, date.today(), 100, 100),
+            (slipping, date.today() - timedelta(days=60), 0, 0),
+        ):
+            customer.last_active_date = active
+            customer.feature_usage_score = usage
+            customer.monthly_spend = spend
+            customer.signup_date = date.today() - timedelta(days=400)
+            customer.save()
+
+        for engine in ("python", "sql"):
+            with self.subTest(engine=engine):
+                generate_churn_predictions(self.tenant, incremental=True, engine=engine)
+
+        metrics = TenantDailyMetrics.objects.get(tenant=self.tenant)
+        # The second incremental run rescores nothing.
+        self.assertEqual(metrics.new_risks, first.new_risks + 1)
+        self.assertEqual(metrics.resolved_risks, 1)
+        self.assertEqual(metrics.customers_at_risk, first.customers_at_risk)
+
+    def test_run_racing_the_first_insert_of_the_day_adds_to_its_row(self):
+        generate_churn_predictions(self.tenant)
+        TenantDailyMetrics.objects.filter(tenant=self.tenant).delete()
+        get_or_create = TenantDailyMetrics.objects.get_or_create
+
+        def other_run_inserts_first(**kwargs):
+            # Another run creates the row between our UPDATE and INSERT.
+            TenantDailyMetrics.objects.create(**kwargs, new_risks=2, resolved_risks=1)
+            return get_or_create(**kwargs)
+
+        with patch.object(TenantDailyMetrics.objects, "get_or_create", other_run_inserts_first):
+            record_daily_metrics(self.tenant, new_risks=3, resolved_risks=4)
+
+        metrics = TenantDailyMetrics.objects.get(tenant=self.tenant)
+        self.assertEqual((metrics.new_risks, metrics.resolved_risks), (5, 5))
+        self.assertEqual(metrics.scored_customers, Customer.objects.filter(tenant=self.tenant).count())
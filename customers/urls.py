@@ -1,14 +1,27 @@
 from django.urls import path
-from .views import upload_customers_view, customer_list_view, run_risk_scoring_view, churn_dashboard_view, high_risk_focus_view, customer_detail_view, at_risk_customers_view
+from .async_views import churn_dashboard_async_view, customer_list_async_view, high_risk_focus_async_view
+from .views import chunked_upload_start_view, chunked_upload_detail_view, chunked_upload_complete_view
+from .views import upload_customers_view, customer_list_view, run_risk_scoring_view, churn_dashboard_view, high_risk_focus_view, export_predictions_view, customer_detail_view, at_risk_customers_view, job_status_view, job_progress_view
 
 
 urlpatterns = [
     path('upload/', upload_customers_view, name='customer_upload'),
+    path("upload/chunked/", chunked_upload_start_view, name="chunked_upload_start"),
+    path("upload/chunked/<int:upload_id>/", chunked_upload_detail_view, name="chunked_upload_detail"),
+    path("upload/chunked/<int:upload_id>/complete/", chunked_upload_complete_view, name="chunked_upload_complete"),
     path('list/', customer_list_view, name='customer_list'),
     path("churn/run/", run_risk_scoring_view, name="run_churn_scoring"),
     path("churn/", churn_dashboard_view, name="churn_dashboard"),
     path("churn/high-risk/", high_risk_focus_view, name="high_risk_focus"),
+    path("churn/export.csv", export_predictions_view, name="export_predictions_csv"),
+    path("churn/export.csv.gz", export_predictions_view, {"compress": True}, name="export_predictions_csv_gz"),
+    # Async versions of the read-heavy pages, for ASGI deployments.
+    path("async/list/", customer_list_async_view, name="customer_list_async"),
+    path("async/churn/", churn_dashboard_async_view, name="churn_dashboard_async"),
+    path("async/churn/high-risk/", high_risk_focus_async_view, name="high_risk_focus_async"),
     path("at-risk/", at_risk_customers_view, name="at_risk_customers"),
+    path("jobs/<int:job_id>/", job_status_view, name="job_status"),
+    path("jobs/<int:job_id>/progress/", job_progress_view, name="job_progress"),
     path("<int:customer_id>/", customer_detail_view, name="customer_detail"),
 
 ]
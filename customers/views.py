@@ -1,64 +1,40 @@
-import csv
-import io
-from datetime import datetime
-
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.cache import never_cache
 
-from django.shortcuts import render, redirect
+from django.http import HttpResponseNotAllowed, JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404, render, redirect
+from django.template.loader import render_to_string
+from django.urls import reverse
 from django.contrib import messages
 from django.utils.timezone import now
+from django.views.decorators.http import require_POST
 
 from .forms import CustomerUploadForm
-from .models import Customer, ChurnPrediction
-from .risk_engine import calculate_churn_risk
-from .recommendations import recommend_action
-from .trends import analyze_trend, calculate_days_in_risk
-from .analytics import risk_level_distribution, revenue_at_risk_chart, trend_overview
-
-
-def generate_churn_predictions(tenant):
-    customers = Customer.objects.filter(tenant=tenant)
-
-    for customer in customers:
-        score, level, reasons = calculate_churn_risk(customer)
-        monthly_spend = customer.monthly_spend or 0
-        revenue_at_risk = score * monthly_spend
-        action = recommend_action(customer, level, reasons)
-
-        last_prediction = (
-            ChurnPrediction.objects
-            .filter(customer=customer)
-            .order_by("-created_at")
-            .first()
-        )
-
-        prev_score = last_prediction.risk_score if last_prediction else None
-        trend, early_warning = analyze_trend(prev_score, score)
+from .models import Customer, ChurnPrediction, ChunkedUpload, Job
+from .chunked_uploads import ChunkedUploadError, append_part, complete_upload, start_upload
+from .jobs import enqueue_import_job, enqueue_scoring_job
+from .caching import request_data_version, tenant_cached
+from .exports import csv_chunks, export_rows, gzip_chunks
+from .predictions import current_predictions
+from .analytics import dashboard_charts, summarize_predictions
+from .pagination import paginate_request
+
+
+# Server-side sort options: public name -> indexed field path.
+PREDICTION_SORTS = {
+    "risk_score": "risk_score",
+    "revenue_at_risk": "revenue_at_risk",
+    "days_in_risk": "days_in_risk",
+    "last_active": "customer__last_active_date",
+}
+
+CUSTOMER_SORTS = {
+    "last_active": "last_active_date",
+    "risk_score": "latest_prediction__risk_score",
+    "revenue_at_risk": "latest_prediction__revenue_at_risk",
+    "days_in_risk": "latest_prediction__days_in_risk",
+}
 
-        first_seen = (
-            ChurnPrediction.objects
-            .filter(customer=customer)
-            .order_by("created_at")
-            .first()
-        )
-
-        days_in_risk = calculate_days_in_risk(
-            first_seen.created_at if first_seen else None
-        )
-
-        ChurnPrediction.objects.create(
-            customer=customer,
-            tenant=tenant,
-            risk_score=score,
-            risk_level=level,
-            reasons=reasons,
-            revenue_at_risk=revenue_at_risk,
-            recommended_action=action,
-            risk_trend=trend,
-            early_warning=early_warning,
-            days_in_risk=days_in_risk,
-        )
 
 @never_cache
 @login_required
@@ -66,141 +42,262 @@ def upload_customers_view(request):
     if request.method == "POST":
         form = CustomerUploadForm(request.POST, request.FILES)
         if form.is_valid():
-            file = form.cleaned_data['file']
-
-            try:
-                decoded = file.read().decode('utf-8')
-                reader = csv.DictReader(io.StringIO(decoded))
-                raw_fieldnames = reader.fieldnames or []
-                normalized_fieldnames = [normalize_csv_header(name) for name in raw_fieldnames]
-                required_columns = {"external_id"}
-                missing_columns = required_columns - set(normalized_fieldnames)
-                if missing_columns:
-                    messages.error(
-                        request,
-                        "Missing required columns: "
-                        + ", ".join(sorted(missing_columns))
-                    )
-                    return render(request, "customers/upload.html", {"form": form})
-
-                count = 0
-                skipped = 0
-
-                for row in reader:
-                    normalized_row = {
-                        normalize_csv_header(key): value
-                        for key, value in row.items()
-                    }
-                    external_id = (normalized_row.get("external_id") or "").strip()
-                    if not external_id:
-                        skipped += 1
-                        continue
-
-                    Customer.objects.update_or_create(
-                        tenant=request.tenant,
-                        external_id=external_id,
-                        defaults={
-                            "email": normalized_row.get("email"),
-                            "signup_date": parse_date(normalized_row.get("signup_date")),
-                            "last_active_date": parse_date(normalized_row.get("last_active_date")),
-                            "subscription_type": normalized_row.get("subscription_type"),
-                            "monthly_spend": safe_float(normalized_row.get("monthly_spend")),
-                            "feature_usage_score": safe_float(
-                                normalized_row.get("feature_usage_score")
-                            ),
-                            "churned": parse_bool(normalized_row.get("churned")),
-                        }
-                    )
-                    count += 1
-
-                generate_churn_predictions(request.tenant)
-                if skipped:
-                    messages.warning(
-                        request,
-                        f"Skipped {skipped} rows missing external_id."
-                    )
-                messages.success(
-                    request,
-                    f"Successfully imported {count} customers and updated churn risk."
-                )
-                return redirect("churn_dashboard")
-
-            except Exception as e:
-                messages.error(request, f"Error parsing CSV: {e}")
+            job = enqueue_import_job(request.tenant, form.cleaned_data['file'])
+
+            messages.info(request, "Upload received. Your customers are being imported.")
+            return redirect("job_status", job_id=job.id)
 
     else:
         form = CustomerUploadForm()
 
     return render(request, "customers/upload.html", {"form": form})
 
+def chunked_upload_state(upload):
+    return JsonResponse(
+        {
+            "id": upload.pk,
+            "filename": upload.filename,
+            "offset": upload.received_bytes,
+            "total_size": upload.total_size,
+            "status": upload.status,
+        }
+    )
+
+
+def chunked_upload_error(exc, upload=None):
+    payload = {"error": str(exc)}
+    if upload is not None:
+        payload["offset"] = upload.received_bytes
+    return JsonResponse(payload, status=exc.status)
+
+
+def header_int(request, name):
+    value = request.headers.get(name)
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ChunkedUploadError(f"Missing or invalid {name} header.")
+
+
+@never_cache
+@login_required
+@require_POST
+def chunked_upload_start_view(request):
+    """
+    Start a resumable upload. POST filename and (optionally) total_size.
+    """
+    try:
+        total_size = request.POST.get("total_size")
+        upload = start_upload(
+            request.tenant,
+            request.POST.get("filename", ""),
+            int(total_size) if total_size else None,
+        )
+    except ValueError as exc:
+        if not isinstance(exc, ChunkedUploadError):
+            exc = ChunkedUploadError("total_size must be a number of bytes.")
+        return chunked_upload_error(exc)
+
+    response = chunked_upload_state(upload)
+    response.status_code = 201
+    return response
+
+
+@never_cache
+@login_required
+def chunked_upload_detail_view(request, upload_id):
+    """
+    GET: how many bytes have been received, i.e. where to resume.
+    PUT: append the request body, which must start at the Upload-Offset header.
+    """
+    upload = get_object_or_404(ChunkedUpload, pk=upload_id, tenant=request.tenant)
+    if request.method == "GET":
+        return chunked_upload_state(upload)
+    if request.method != "PUT":
+        return HttpResponseNotAllowed(["GET", "PUT"])
+
+    try:
+        offset = header_int(request, "Upload-Offset")
+        length = header_int(request, "Content-Length")
+        upload = append_part(upload, offset, request, length)
+    except ChunkedUploadError as exc:
+        upload.refresh_from_db()
+        return chunked_upload_error(exc, upload)
+    return chunked_upload_state(upload)
+
+
+@never_cache
+@login_required
+@require_POST
+def chunked_upload_complete_view(request, upload_id):
+    upload = get_object_or_404(ChunkedUpload, pk=upload_id, tenant=request.tenant)
+    try:
+        job = complete_upload(upload)
+    except ChunkedUploadError as exc:
+        upload.refresh_from_db()
+        return chunked_upload_error(exc, upload)
+
+    return JsonResponse(
+        {"job_id": job.pk, "job_url": reverse("job_status", kwargs={"job_id": job.pk})}
+    )
+
+
 @never_cache
 @login_required
 def run_risk_scoring_view(request):
-    generate_churn_predictions(request.tenant)
+    job = enqueue_scoring_job(request.tenant)
 
-    messages.success(request, "Churn trends updated successfully.")
-    return redirect("churn_dashboard")
+    messages.info(request, "Churn scoring started.")
+    return redirect("job_status", job_id=job.id)
 
 
 @never_cache
 @login_required
-def churn_dashboard_view(request):
-    from django.db.models import Max
+def job_status_view(request, job_id):
+    job = get_object_or_404(Job, pk=job_id, tenant=request.tenant)
+    return render(request, "customers/job_status.html", {"job": job})
 
-    latest_ids = (
-        ChurnPrediction.objects
-        .filter(tenant=request.tenant)
-        .values("customer_id")
-        .annotate(latest_id=Max("id"))
-        .values_list("latest_id", flat=True)
+
+@never_cache
+@login_required
+def job_progress_view(request, job_id):
+    job = get_object_or_404(
+        Job.objects.only(
+            "status", "message", "progress_current", "progress_total", "result", "error"
+        ),
+        pk=job_id,
+        tenant=request.tenant,
     )
 
-    predictions = (
-        ChurnPrediction.objects
-        .filter(id__in=latest_ids)
-        .select_related("customer")
-        .order_by("-risk_score")
+    return JsonResponse(
+        {
+            "status": job.status,
+            "finished": job.is_finished,
+            "message": job.message,
+            "progress_current": job.progress_current,
+            "progress_total": job.progress_total,
+            "result": job.result,
+            "error": job.error,
+        }
     )
 
-    total_revenue_at_risk = sum(p.revenue_at_risk for p in predictions)
-    has_early_warnings = any(p.early_warning for p in predictions)
 
+def render_churn_dashboard(request, version):
+    current = current_predictions(request.tenant)
+    predictions = paginate_request(
+        request,
+        current.select_related("customer"),
+        PREDICTION_SORTS,
+        default_sort="risk_score",
+    )
+    summary = summarize_predictions(current)
+    charts = dashboard_charts(request.tenant, version, current, summary)
+    return render_churn_dashboard_content(predictions, summary, charts)
+
+
+def render_churn_dashboard_content(predictions, summary, charts):
     context = {
         "predictions": predictions,
-        "total_revenue_at_risk": total_revenue_at_risk,
-        "risk_chart": risk_level_distribution(predictions),
-        "revenue_chart": revenue_at_risk_chart(predictions),
-        "trend_chart": trend_overview(predictions),
+        "summary": summary,
+        "total_revenue_at_risk": summary["revenue_at_risk"],
+        **charts,
         "last_updated": now(),
-        "has_early_warnings": has_early_warnings
+        "has_early_warnings": summary["has_early_warnings"]
     }
 
-    return render(request, "customers/churn_dashboard.html", context)
+    return render_to_string("customers/_churn_dashboard_content.html", context)
+
 
 @never_cache
 @login_required
-def high_risk_focus_view(request):
-    predictions = (
+def churn_dashboard_view(request):
+    # The page body only changes when the tenant's data version does.
+    version = request_data_version(request)
+    content = tenant_cached(
+        request.tenant,
+        "churn_dashboard",
+        lambda: render_churn_dashboard(request, version),
+        params=request.GET.dict(),
+        version=version,
+    )
+
+    return render(request, "customers/churn_dashboard.html", {"content": content})
+
+@never_cache
+@login_required
+def export_predictions_view(request, compress=False):
+    """
+    The tenant's current predictions as a streamed CSV download
+    (gzip-compressed when compress is set).
+    """
+    chunks = csv_chunks(export_rows(request.tenant))
+    filename = f"churn-predictions-{request.tenant.slug}-{now():%Y-%m-%d}.csv"
+    if compress:
+        chunks = gzip_chunks(chunks)
+        filename += ".gz"
+        content_type = "application/gzip"
+    else:
+        content_type = "text/csv; charset=utf-8"
+
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+def high_risk_predictions(tenant):
+    return (
         ChurnPrediction.objects
         .filter(
-            tenant=request.tenant,
+            tenant=tenant,
             risk_level="high"
         )
         .select_related("customer")
         .order_by("-revenue_at_risk")
     )
 
+def render_high_risk_list(tenant):
+    return render_to_string(
+        "customers/_high_risk_list.html", {"predictions": high_risk_predictions(tenant)}
+    )
+
+@never_cache
+@login_required
+def high_risk_focus_view(request):
+    predictions = tenant_cached(
+        request.tenant,
+        "high_risk_focus",
+        lambda: render_high_risk_list(request.tenant),
+        version=request_data_version(request),
+    )
+
     return render(
         request,
         "customers/high_risk_focus.html",
         {"predictions": predictions}
     )
 
+def tenant_customers(tenant):
+    return Customer.objects.filter(tenant=tenant).select_related("latest_prediction")
+
+def render_customer_table(request):
+    customers = paginate_request(
+        request,
+        tenant_customers(request.tenant),
+        CUSTOMER_SORTS,
+        default_sort="last_active",
+    )
+    return render_to_string("customers/_customer_table.html", {"customers": customers})
+
 @never_cache
 @login_required
 def customer_list_view(request):
-    customers = Customer.objects.filter(tenant=request.tenant)
-    return render(request, "customers/list.html", {"customers": customers})
+    table = tenant_cached(
+        request.tenant,
+        "customer_list",
+        lambda: render_customer_table(request),
+        params=request.GET.dict(),
+        version=request_data_version(request),
+    )
+    return render(request, "customers/list.html", {"table": table})
 
 
 @never_cache
@@ -305,30 +402,3 @@ def at_risk_customers_view(request):
     context = {"customers": customers}
     return render(request, "customers/at_risk_customers.html", context)
 
-
-def parse_date(value):
-    if not value:
-        return None
-    try:
-        return datetime.strptime(value, "%Y-%m-%d").date()
-    except:
-        return None
-
-
-def safe_float(value):
-    try:
-        return float(value)
-    except:
-        return None
-
-
-def parse_bool(value):
-    if not value:
-        return False
-    return value.lower() in ("1", "true", "yes")
-
-
-def normalize_csv_header(value):
-    if value is None:
-        return ""
-    return value.strip().lstrip("\ufeff").lower()